@@ -0,0 +1,100 @@
+"""JWT authentication without a user query per request.
+
+``JWTAuthentication`` loads the ``User`` row on every authenticated
+request. ``ClaimsJWTAuthentication`` instead returns a ``ClaimsUser`` built
+from the token, whose id and ``tokens.CLAIMS`` are all the watchlist,
+rating and content views read. To keep revoked tokens out it checks a
+cached copy of the account state: whether the user still exists and is
+active, and the password digest that ``CHECK_REVOKE_TOKEN`` compares with
+the token's, so changing the password revokes earlier tokens.
+
+States live for ``JWT_USER_STATE_TIMEOUT`` seconds in the cache named by
+``JWT_USER_STATE_CACHE``. Saving or deleting a user drops its entry, which
+makes revocation immediate with a shared cache and bounds it by the
+timeout with per-process ones.
+
+Views that need the model itself, such as the profile and password
+views, set ``authentication_classes = [JWTAuthentication]``. Tokens issued
+before the claims existed are authenticated the same way.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .tokens import CLAIMS
+
+
+def get_cache():
+    return caches[getattr(settings, 'JWT_USER_STATE_CACHE', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'JWT_USER_STATE_TIMEOUT', 60)
+
+
+def state_key(user_id):
+    return f'accounts:user-state:{user_id}'
+
+
+def get_user_state(user_id):
+    """Return ``(is_active, password digest)`` of a user, or ``None`` if
+    there is no such user"""
+    cache = get_cache()
+    state = cache.get(state_key(user_id))
+    if state is None:
+        row = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).values_list('is_active', 'password').first()
+        # An empty tuple caches the user's absence
+        state = (row[0], get_md5_hash_password(row[1])) if row else ()
+        cache.set(state_key(user_id), state, get_timeout())
+    return state or None
+
+
+def forget_user_state(user_id):
+    get_cache().delete(state_key(user_id))
+
+
+class ClaimsUser(TokenUser):
+    """``TokenUser`` exposing the account fields of ``tokens.CLAIMS``"""
+
+    @cached_property
+    def subscription_plan(self):
+        return self.token['subscription_plan']
+
+    @cached_property
+    def is_active_subscription(self):
+        return self.token['is_active_subscription']
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` returning a ``ClaimsUser`` for tokens that carry
+    the account claims"""
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in CLAIMS):
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        state = get_user_state(user_id)
+        if state is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        is_active, password_digest = state
+        if api_settings.CHECK_USER_IS_ACTIVE and not is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and \
+                validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_digest:
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code='password_changed'
+            )
+        return api_settings.TOKEN_USER_CLASS(validated_token)
@@ -0,0 +1,145 @@
+"""Google ID token verification and account upserts.
+
+``id_token.verify_oauth2_token`` downloads Google's signing certificates
+through the request object it is given, so calling it with a new
+``google_requests.Request()`` per login opens a new HTTP session and
+fetches the certificates every time. ``GoogleTokenVerifier`` keeps one
+pooled session and holds the certificates for as long as the response's
+``Cache-Control: max-age`` allows. Google rotates its keys, so a token
+signed with a key id the verifier has not seen triggers an early refetch,
+at most once every ``REFETCH_INTERVAL`` seconds.
+"""
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from google.auth import exceptions, jwt
+from requests.adapters import HTTPAdapter
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+# Shortest time between two fetches triggered by unknown key ids
+REFETCH_INTERVAL = 60
+
+# Profile fields refreshed from the token on every login
+PROFILE_FIELDS = ('profile_picture',)
+
+_verifiers = {}
+
+
+def get_max_age(headers):
+    """Return how many more seconds a response may be reused for"""
+    directives = [
+        directive.strip() for directive in headers.get('Cache-Control', '').lower().split(',')
+    ]
+    if 'no-store' in directives or 'no-cache' in directives:
+        return 0
+    for directive in directives:
+        if directive.startswith('max-age='):
+            try:
+                return max(0, int(directive[8:]) - int(headers.get('Age', 0)))
+            except ValueError:
+                return 0
+    return 0
+
+
+class GoogleTokenVerifier:
+    """Verify Google ID tokens against cached signing certificates"""
+
+    def __init__(self, client_id, certs_url=GOOGLE_CERTS_URL, pool_size=10, timeout=5,
+                 clock_skew=0):
+        self.client_id = client_id
+        self.certs_url = certs_url
+        self.timeout = timeout
+        self.clock_skew = clock_skew
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.lock = threading.Lock()
+        self.certs = {}
+        self.expires_at = 0
+        self.fetched_at = None
+
+    def is_fresh(self, key_id):
+        now = time.monotonic()
+        if now >= self.expires_at:
+            return False
+        if key_id is None or key_id in self.certs:
+            return True
+        # An unknown key may be a new one, but forged key ids must not make
+        # every login refetch
+        return now - self.fetched_at < REFETCH_INTERVAL
+
+    def fetch_certs(self):
+        response = self.session.get(self.certs_url, timeout=self.timeout)
+        if response.status_code != 200:
+            raise exceptions.TransportError(
+                f'Could not fetch certificates at {self.certs_url}'
+            )
+        self.fetched_at = time.monotonic()
+        self.certs = response.json()
+        self.expires_at = self.fetched_at + get_max_age(response.headers)
+
+    def get_certs(self, key_id=None):
+        """Return ``{key id: certificate}``, fetching it when stale or
+        missing ``key_id``"""
+        if not self.is_fresh(key_id):
+            with self.lock:
+                # Another thread may have fetched them while this one waited
+                if not self.is_fresh(key_id):
+                    self.fetch_certs()
+        return self.certs
+
+    def verify(self, token):
+        """Return the claims of a valid ID token, raising ``ValueError`` for
+        invalid ones"""
+        certs = self.get_certs(jwt.decode_header(token).get('kid'))
+        claims = jwt.decode(
+            token, certs=certs, audience=self.client_id,
+            clock_skew_in_seconds=self.clock_skew
+        )
+        if claims.get('iss') not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer {claims.get('iss')}")
+        return claims
+
+
+def get_verifier():
+    """Return the process-wide verifier for the configured client"""
+    key = (
+        settings.GOOGLE_OAUTH2_CLIENT_ID,
+        getattr(settings, 'GOOGLE_OAUTH2_CERTS_URL', GOOGLE_CERTS_URL),
+    )
+    verifier = _verifiers.get(key)
+    if verifier is None:
+        verifier = _verifiers[key] = GoogleTokenVerifier(*key)
+    return verifier
+
+
+def upsert_user(claims):
+    """Return ``(user, created)`` for the account of verified ``claims``.
+
+    New accounts are inserted with their profile; existing ones only write
+    the ``PROFILE_FIELDS`` that changed, so a login costs at most one write.
+    """
+    profile = {'profile_picture': claims.get('picture', '')}
+    user, created = get_user_model().objects.get_or_create(
+        google_id=claims['sub'],
+        defaults={
+            'username': claims['email'],
+            'email': claims['email'],
+            'first_name': claims.get('given_name', ''),
+            'last_name': claims.get('family_name', ''),
+            **profile,
+        }
+    )
+    if not created:
+        changed = [name for name in PROFILE_FIELDS if getattr(user, name) != profile[name]]
+        for name in changed:
+            setattr(user, name, profile[name])
+        if changed:
+            user.save(update_fields=[*changed, 'updated_at'])
+    return user, created
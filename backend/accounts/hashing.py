@@ -0,0 +1,102 @@
+"""Password hashing off the request thread.
+
+Hashing a password costs a few hundred milliseconds of CPU by design, so a
+burst of logins would keep every worker busy hashing. Logins, registrations
+and password changes instead hash in a bounded thread pool of
+``PASSWORD_HASHING_WORKERS`` threads (``hashlib`` and ``argon2`` release
+the GIL while hashing). Up to ``PASSWORD_HASHING_QUEUE`` more hashes may
+wait for a thread; beyond that requests fail fast with a 503 instead of
+queueing behind the burst. The login throttles in ``throttling`` run
+before any of this.
+
+Passwords stored with any hasher other than the first of
+``PASSWORD_HASHERS``, or with weaker parameters, are rehashed on the next
+successful login, as ``User.check_password`` does.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, hashers, password_validation
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-ins in progress, try again shortly.'
+    default_code = 'hashing_unavailable'
+
+
+def get_pool():
+    """Return ``(executor, slots)`` for the configured pool size"""
+    workers = getattr(settings, 'PASSWORD_HASHING_WORKERS', None) or os.cpu_count() or 1
+    queue = getattr(settings, 'PASSWORD_HASHING_QUEUE', 32)
+    key = (workers, queue)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = (
+                    ThreadPoolExecutor(workers, thread_name_prefix='password-hashing'),
+                    threading.BoundedSemaphore(workers + queue),
+                )
+    return pool
+
+
+def run(function, *args):
+    """Call ``function(*args)`` on the hashing pool and return its result"""
+    executor, slots = get_pool()
+    if not slots.acquire(blocking=False):
+        raise HashingUnavailable()
+    try:
+        future = executor.submit(function, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda future: slots.release())
+    return future.result()
+
+
+def make_password(password):
+    return run(hashers.make_password, password)
+
+
+def check_password(user, password):
+    """``user.check_password`` hashing on the pool"""
+    is_correct, must_update = run(hashers.verify_password, password, user.password)
+    if is_correct and must_update:
+        user.password = make_password(password)
+        user.save(update_fields=['password'])
+    return is_correct
+
+
+def set_password(user, password):
+    """``user.set_password`` followed by ``user.save``, hashing on the pool.
+
+    Runs the password validators' ``password_changed`` hooks, as saving
+    after ``set_password`` does.
+    """
+    user.password = make_password(password)
+    user.save()
+    password_validation.password_changed(password, user)
+
+
+def authenticate(username, password):
+    """Return the active user with these credentials, or ``None``, as
+    ``ModelBackend`` would"""
+    User = get_user_model()
+    try:
+        user = User._default_manager.get_by_natural_key(username)
+    except User.DoesNotExist:
+        # Hash anyway, so response times do not tell which usernames exist
+        make_password(password)
+        return None
+    if check_password(user, password) and user.is_active:
+        return user
+    return None
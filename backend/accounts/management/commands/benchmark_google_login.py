@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from accounts import google
+from accounts.testing import GoogleKeyServer
+from content.benchmarking import format_row, isolated_database, summarize
+
+CLIENT_ID = 'benchmark-client'
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure Google login latency with a cold verifier (new session and '
+        'certificate fetch per login, as before) and a warm one, against a '
+        'local stand-in for the certificate endpoint'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200, help='Logins per scenario')
+        parser.add_argument('--users', type=int, default=20,
+                            help='Distinct Google accounts the logins cycle through')
+        parser.add_argument('--latency', type=float, default=30,
+                            help='Milliseconds the key server waits before answering')
+
+    def handle(self, *args, **options):
+        with isolated_database(), GoogleKeyServer(latency=options['latency'] / 1000) as key_server, \
+                override_settings(GOOGLE_OAUTH2_CLIENT_ID=CLIENT_ID,
+                                  GOOGLE_OAUTH2_CERTS_URL=key_server.certs_url):
+            client = Client()
+            url = reverse('accounts:google-oauth')
+            users = options['users']
+
+            def login(index):
+                # Every other round changes the profile picture
+                token = key_server.sign(
+                    CLIENT_ID, f'google-{index % users}', f'user{index % users}@example.com',
+                    picture=f'https://example.com/{index // users % 2}.jpg',
+                )
+                started = time.perf_counter()
+                response = client.post(url, {'access_token': token},
+                                       content_type='application/json')
+                elapsed = time.perf_counter() - started
+                if response.status_code != 200:
+                    raise RuntimeError(f'Login returned {response.status_code}')
+                return elapsed
+
+            for index in range(users):
+                login(index)
+            for name, cold in [('cold verifier', True), ('warm verifier', False)]:
+                google._verifiers.clear()
+                key_server.fetches = 0
+                samples = []
+                for index in range(options['logins']):
+                    if cold:
+                        google._verifiers.clear()
+                    samples.append(login(index))
+                self.stdout.write(
+                    f'{format_row(name, summarize(samples))}  {key_server.fetches:4d} fetches'
+                )
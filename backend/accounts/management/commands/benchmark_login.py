@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from content.benchmarking import isolated_database, percentile
+
+PASSWORD = 'benchmark-password-1'
+
+
+def get_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def run_logins(usernames, logins, concurrency):
+    """Log in ``logins`` times from ``concurrency`` threads, returning
+    ``(elapsed seconds, latencies, status counts)``"""
+    url = reverse('accounts:login')
+    remaining = iter(range(logins))
+    lock = threading.Lock()
+    latencies = []
+    statuses = {}
+
+    def client():
+        http = Client()
+        try:
+            for index in remaining:
+                started = time.perf_counter()
+                response = http.post(
+                    url, {'username': usernames[index % len(usernames)], 'password': PASSWORD},
+                    content_type='application/json'
+                )
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, statuses
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure password logins per second per core with each hasher at '
+        'rising concurrency, hashing on the bounded pool'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hashers', nargs='+', default=['pbkdf2', 'scrypt', 'argon2'],
+                            help='Hashers to measure, by PASSWORD_HASHER_CLASSES name')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+        parser.add_argument('--logins', type=int, default=40,
+                            help='Logins per hasher and concurrency level')
+        parser.add_argument('--users', type=int, default=20)
+
+    def handle(self, *args, **options):
+        unknown = set(options['hashers']) - set(settings.PASSWORD_HASHER_CLASSES)
+        if unknown:
+            raise CommandError(f"Unknown hashers: {', '.join(sorted(unknown))}")
+        cores = get_cores()
+        self.stdout.write(
+            f'{cores} cores, {settings.PASSWORD_HASHING_WORKERS or os.cpu_count()} hashing '
+            f'threads, queue of {settings.PASSWORD_HASHING_QUEUE}'
+        )
+        with isolated_database(), override_settings(LOGIN_THROTTLE_RATES={}):
+            usernames = [f'login{index}' for index in range(options['users'])]
+            for name in options['hashers']:
+                path = settings.PASSWORD_HASHER_CLASSES[name]
+                with override_settings(PASSWORD_HASHERS=[path]):
+                    try:
+                        # One hash shared by every user keeps seeding quick
+                        encoded = make_password(PASSWORD)
+                    except ValueError as exc:
+                        self.stdout.write(f'{name:<8} skipped: {exc}')
+                        continue
+                    User = get_user_model()
+                    User.objects.all().delete()
+                    User.objects.bulk_create([
+                        User(username=username, password=encoded) for username in usernames
+                    ])
+                    for concurrency in options['concurrency']:
+                        elapsed, latencies, statuses = run_logins(
+                            usernames, options['logins'], concurrency
+                        )
+                        rate = len(latencies) / elapsed
+                        self.stdout.write(
+                            f'{name:<8} {concurrency:4d} clients  {rate:8.1f} logins/s  '
+                            f'{rate / cores:8.1f}/s/core  '
+                            f'p50 {percentile(latencies, 0.50) * 1000:8.1f}ms  '
+                            f'p95 {percentile(latencies, 0.95) * 1000:8.1f}ms  '
+                            f'{statuses}'
+                        )
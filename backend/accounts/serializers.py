@@ -1,7 +1,14 @@
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 
+from . import hashing
+from .tokens import UserRefreshToken, add_claims
+
 User = get_user_model()
 
 
@@ -28,7 +35,11 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data.pop('password_confirm')
-        user = User.objects.create_user(**validated_data)
+        # create_user would hash on the request thread
+        validated_data['password'] = hashing.make_password(validated_data['password'])
+        validated_data['username'] = User.normalize_username(validated_data['username'])
+        validated_data['email'] = User.objects.normalize_email(validated_data.get('email', ''))
+        user = User.objects.create(**validated_data)
         return user
 
 
@@ -72,4 +83,37 @@ class ChangePasswordSerializer(serializers.Serializer):
     def validate(self, attrs):
         if attrs['new_password'] != attrs['new_password_confirm']:
             raise serializers.ValidationError("New passwords don't match")
-        return attrs 
\ No newline at end of file
+        return attrs 
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """Serializer refreshing access tokens with the user's current claims"""
+    token_class = UserRefreshToken
+    
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh.get(api_settings.USER_ID_CLAIM)}
+        ).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user) or (
+            api_settings.CHECK_REVOKE_TOKEN and
+            refresh.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise AuthenticationFailed(
+                self.error_messages['no_active_account'], 'no_active_account'
+            )
+        
+        # Access tokens copy the refresh token's claims
+        add_claims(refresh, user)
+        data = {'access': str(refresh.access_token)}
+        
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            # The used token is retired and its replacement recorded, as
+            # TokenRefreshSerializer does
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+        return data
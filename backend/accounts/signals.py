@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import authentication
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_state(sender, instance, **kwargs):
+    """Make token checks reread an edited or deleted account"""
+    authentication.forget_user_state(instance.pk)
+    # Again after commit, in case a request cached the old row meanwhile
+    transaction.on_commit(lambda: authentication.forget_user_state(instance.pk))
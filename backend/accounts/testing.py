@@ -0,0 +1,87 @@
+"""A local stand-in for Google's signing certificate endpoint.
+
+``GoogleKeyServer`` serves ``{key id: public key}`` with the cache headers
+Google sends and signs ID tokens with the matching private key, so Google
+logins can be tested and benchmarked offline by pointing
+``GOOGLE_OAUTH2_CERTS_URL`` at its ``certs_url``.
+"""
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import rsa
+from google.auth import crypt, jwt
+
+
+class GoogleKeyServer:
+    """Serve a generated RSA key over HTTP on localhost.
+
+    ``max_age`` is the ``Cache-Control`` lifetime of the response and
+    ``latency`` seconds are slept before answering, to stand in for the
+    round trip to Google. ``fetches`` counts the requests served.
+    """
+
+    def __init__(self, max_age=3600, latency=0.0, bits=1024):
+        self.max_age = max_age
+        self.latency = latency
+        self.bits = bits
+        self.fetches = 0
+        self.rotate()
+
+    def rotate(self):
+        """Replace the signing key, as Google does periodically"""
+        public_key, private_key = rsa.newkeys(self.bits)
+        self.key_id = secrets.token_hex(20)
+        self.signer = crypt.RSASigner.from_string(
+            private_key.save_pkcs1().decode(), self.key_id
+        )
+        self.certs = {self.key_id: public_key.save_pkcs1().decode()}
+
+    def __enter__(self):
+        key_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                key_server.fetches += 1
+                time.sleep(key_server.latency)
+                body = json.dumps(key_server.certs).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header(
+                    'Cache-Control', f'public, max-age={key_server.max_age}, must-revalidate'
+                )
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def certs_url(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}/oauth2/v1/certs'
+
+    def sign(self, audience, subject, email, lifetime=3600, **claims):
+        """Return an ID token for the given account"""
+        now = int(time.time())
+        payload = {
+            'iss': 'https://accounts.google.com',
+            'aud': audience,
+            'sub': subject,
+            'email': email,
+            'email_verified': True,
+            'iat': now,
+            'exp': now + lifetime,
+            **claims,
+        }
+        return jwt.encode(self.signer, payload).decode()
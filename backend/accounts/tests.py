@@ -1,3 +1,301 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from content.models import Movie
+
+from . import google, hashing
+from .testing import GoogleKeyServer
+from .tokens import UserRefreshToken
+
+User = get_user_model()
+
+
+class ClaimsAuthenticationTests(TestCase):
+    """Tokens with account claims authenticate without loading the user"""
+
+    def setUp(self):
+        # Cached account states outlive the rows of a test
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.movie = Movie.objects.create(
+            title='Movie', description='About', release_date=timezone.now().date(),
+            duration=90, rating='PG', poster_url='https://example.com/poster.jpg',
+            backdrop_url='https://example.com/backdrop.jpg', director='Director',
+        )
+        self.user = User.objects.create_user(
+            username='viewer', password='old-secret-1', subscription_plan='premium'
+        )
+        self.refresh = UserRefreshToken.for_user(self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {self.refresh.access_token}'}
+
+    def get_watchlist(self, **auth):
+        return self.client.get(reverse('content:user-watchlist'), **(auth or self.auth))
+
+    def test_requests_skip_the_user_row(self):
+        self.assertEqual(self.refresh.access_token['subscription_plan'], 'premium')
+        response = self.client.post(
+            reverse('content:user-watchlist'), {'movie_id': self.movie.id},
+            content_type='application/json', **self.auth
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['user'], self.user.id)
+        self.assertEqual(self.get_watchlist().status_code, 200)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.get_watchlist()
+        self.assertEqual(response.json()['count'], 1)
+        self.assertFalse([q for q in ctx.captured_queries if '"users"' in q['sql']])
+        # Tokens issued without the claims still load the user
+        old = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.get_watchlist(**old).json()['count'], 1)
+        self.assertTrue([q for q in ctx.captured_queries if '"users"' in q['sql']])
+
+    def test_deactivated_and_deleted_users_are_refused(self):
+        self.assertEqual(self.get_watchlist().status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        response = self.get_watchlist()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'user_inactive')
+        self.user.delete()
+        self.assertEqual(self.get_watchlist().json()['code'], 'user_not_found')
+
+    def test_password_changes_revoke_tokens(self):
+        self.assertNotIn('hash_password', self.refresh)
+        # simplejwt modules hold on to one api_settings object, which
+        # override_settings would replace rather than change
+        revoking = mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True)
+        revoking.start()
+        self.addCleanup(revoking.stop)
+        # Tokens issued without the digest are refused once the check is on
+        self.assertEqual(self.get_watchlist().json()['code'], 'password_changed')
+        self.refresh = UserRefreshToken.for_user(self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {self.refresh.access_token}'}
+
+        self.assertEqual(self.get_watchlist().status_code, 200)
+        response = self.client.post(reverse('accounts:change-password'), {
+            'old_password': 'old-secret-1',
+            'new_password': 'new-secret-2',
+            'new_password_confirm': 'new-secret-2',
+        }, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_watchlist().json()['code'], 'password_changed')
+        refresh_url = reverse('accounts:token_refresh')
+        self.assertEqual(
+            self.client.post(refresh_url, {'refresh': str(self.refresh)}).status_code, 401
+        )
+
+        tokens = response.json()['tokens']
+        auth = {'HTTP_AUTHORIZATION': f"Bearer {tokens['access']}"}
+        self.assertEqual(self.get_watchlist(**auth).status_code, 200)
+        self.assertEqual(
+            self.client.get(reverse('accounts:user-info'), **auth).json()['user']['id'],
+            self.user.id
+        )
+
+    def test_refresh_reissues_current_claims(self):
+        User.objects.filter(pk=self.user.pk).update(subscription_plan='basic')
+        response = self.client.post(
+            reverse('accounts:token_refresh'), {'refresh': str(self.refresh)}
+        )
+        self.assertEqual(response.status_code, 200)
+        access = UserRefreshToken.access_token_class(response.json()['access'])
+        self.assertEqual(access['subscription_plan'], 'basic')
+
+    def test_rotation_blacklists_the_used_refresh_token(self):
+        rotating = mock.patch.object(api_settings, 'ROTATE_REFRESH_TOKENS', True)
+        rotating.start()
+        self.addCleanup(rotating.stop)
+        refresh_url = reverse('accounts:token_refresh')
+        response = self.client.post(refresh_url, {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 200)
+        rotated = UserRefreshToken(response.json()['refresh'])
+        self.assertEqual(rotated['subscription_plan'], 'premium')
+        self.assertTrue(OutstandingToken.objects.filter(jti=rotated['jti']).exists())
+
+        response = self.client.post(refresh_url, {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.client.post(refresh_url, {'refresh': str(rotated)}).status_code, 200)
+
+
+class GoogleOAuthTests(TestCase):
+    """Google logins verify against cached certificates from a local key server"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.key_server = GoogleKeyServer().__enter__()
+        cls.addClassCleanup(cls.key_server.__exit__)
+
+    def setUp(self):
+        google._verifiers.clear()
+        self.key_server.fetches = 0
+        settings = override_settings(
+            GOOGLE_OAUTH2_CLIENT_ID='client', GOOGLE_OAUTH2_CERTS_URL=self.key_server.certs_url
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def login(self, token):
+        return self.client.post(
+            reverse('accounts:google-oauth'), {'access_token': token},
+            content_type='application/json'
+        )
+
+    def test_logins_upsert_the_account(self):
+        token = self.key_server.sign('client', 'g-1', 'viewer@example.com', picture='a.jpg')
+        response = self.login(token)
+        self.assertEqual(response.status_code, 200)
+        user = User.objects.get(google_id='g-1')
+        self.assertEqual((user.username, user.profile_picture), ('viewer@example.com', 'a.jpg'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.login(token).status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'UPDATE' in q['sql']])
+        token = self.key_server.sign('client', 'g-1', 'viewer@example.com', picture='b.jpg')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.login(token).status_code, 200)
+        updates = [q['sql'] for q in ctx.captured_queries if 'UPDATE' in q['sql']]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"bio"', updates[0])
+        self.assertEqual(User.objects.get(google_id='g-1').profile_picture, 'b.jpg')
+        self.assertEqual(self.key_server.fetches, 1)
+
+    def test_invalid_tokens_are_refused(self):
+        for token in [
+            self.key_server.sign('other-client', 'g-2', 'other@example.com'),
+            self.key_server.sign('client', 'g-2', 'other@example.com', iss='example.com'),
+            self.key_server.sign('client', 'g-2', 'other@example.com', lifetime=-600),
+            'not-a-token',
+        ]:
+            self.assertEqual(self.login(token).status_code, 401)
+        self.assertFalse(User.objects.filter(google_id='g-2').exists())
+
+    def test_rotated_keys_are_refetched_once(self):
+        sign = self.key_server.sign
+        self.assertEqual(self.login(sign('client', 'g-3', 'c@example.com')).status_code, 200)
+        old_signer = self.key_server.signer
+        self.key_server.rotate()
+        with mock.patch.object(google, 'REFETCH_INTERVAL', 0):
+            self.assertEqual(self.login(sign('client', 'g-3', 'c@example.com')).status_code, 200)
+        self.assertEqual(self.key_server.fetches, 2)
+        # Unknown key ids right after a fetch do not refetch
+        self.key_server.signer, new_signer = old_signer, self.key_server.signer
+        try:
+            self.assertEqual(self.login(sign('client', 'g-3', 'c@example.com')).status_code, 401)
+        finally:
+            self.key_server.signer = new_signer
+        self.assertEqual(self.key_server.fetches, 2)
+
+    def test_certificates_follow_cache_headers(self):
+        self.assertEqual(google.get_max_age({'Cache-Control': 'public, max-age=600'}), 600)
+        self.assertEqual(google.get_max_age({'Cache-Control': 'max-age=600', 'Age': '100'}), 500)
+        self.assertEqual(google.get_max_age({'Cache-Control': 'no-cache, max-age=600'}), 0)
+        self.assertEqual(google.get_max_age({}), 0)
+        self.key_server.max_age = 0
+        self.addCleanup(setattr, self.key_server, 'max_age', 3600)
+        for _ in range(2):
+            token = self.key_server.sign('client', 'g-4', 'd@example.com')
+            self.assertEqual(self.login(token).status_code, 200)
+        self.assertEqual(self.key_server.fetches, 2)
+
+
+class PasswordLoginTests(TestCase):
+    """Logins hash on the pool behind throttles and rehash old passwords"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='viewer', password='secret-pass-1')
+
+    def login(self, username='viewer', password='secret-pass-1'):
+        return self.client.post(
+            reverse('accounts:login'), {'username': username, 'password': password},
+            content_type='application/json'
+        )
+
+    def test_logins_hash_on_the_pool(self):
+        with mock.patch.object(hashing, 'run', wraps=hashing.run) as run:
+            self.assertEqual(self.login().status_code, 200)
+            self.assertEqual(self.login(password='wrong').status_code, 401)
+            # Unknown usernames are hashed too
+            self.assertEqual(self.login(username='nobody').status_code, 401)
+        self.assertEqual(run.call_count, 3)
+        response = self.client.post(reverse('accounts:register'), {
+            'username': 'newcomer', 'email': 'New@EXAMPLE.com',
+            'password': 'another-pass-2', 'password_confirm': 'another-pass-2',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get(username='newcomer')
+        self.assertEqual(user.email, 'New@example.com')
+        self.assertTrue(user.check_password('another-pass-2'))
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1, PASSWORD_HASHING_QUEUE=0)
+    def test_full_pool_refuses_logins(self):
+        _, slots = hashing.get_pool()
+        slots.acquire()
+        try:
+            response = self.login()
+        finally:
+            slots.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_throttles_run_before_hashing(self):
+        rates = {'login_ip': '5/min', 'login_username': '2/min'}
+        with override_settings(LOGIN_THROTTLE_RATES=rates), \
+                mock.patch.object(hashing, 'run', wraps=hashing.run) as run:
+            self.assertEqual(self.login(password='wrong').status_code, 401)
+            self.assertEqual(self.login(username='VIEWER', password='wrong').status_code, 401)
+            response = self.login()
+            self.assertEqual(response.status_code, 429)
+            self.assertIn('Retry-After', response)
+            self.assertEqual(run.call_count, 2)
+            self.assertEqual(self.login(username='other').status_code, 401)
+            self.assertEqual(self.login(username='other').status_code, 401)
+            self.assertEqual(self.login(username='third').status_code, 429)
+
+    def test_password_changes_hash_on_the_pool(self):
+        token = UserRefreshToken.for_user(self.user).access_token
+        hashers = [
+            'django.contrib.auth.hashers.Argon2PasswordHasher',
+            'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        ]
+        with override_settings(PASSWORD_HASHERS=hashers), \
+                mock.patch.object(hashing, 'run', wraps=hashing.run) as run, \
+                mock.patch('django.contrib.auth.password_validation.password_changed') as changed:
+            response = self.client.post(reverse('accounts:change-password'), {
+                'old_password': 'secret-pass-1',
+                'new_password': 'another-pass-2',
+                'new_password_confirm': 'another-pass-2',
+            }, content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        # The old password is checked and rehashed, then the new one hashed
+        self.assertEqual(run.call_count, 3)
+        changed.assert_called_once()
+        self.assertEqual(changed.call_args.args[0], 'another-pass-2')
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('argon2$'))
+        self.assertTrue(self.user.check_password('another-pass-2'))
+
+    def test_passwords_are_rehashed_with_the_preferred_hasher(self):
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+        hashers = [
+            'django.contrib.auth.hashers.ScryptPasswordHasher',
+            'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        ]
+        with override_settings(PASSWORD_HASHERS=hashers):
+            self.assertEqual(self.login().status_code, 200)
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith('scrypt$'))
+            self.assertEqual(self.login().status_code, 200)
@@ -0,0 +1,41 @@
+"""Throttles for the endpoints that hash passwords.
+
+DRF checks throttles before the view runs, so requests over these rates are
+refused before any password is hashed. Rates are read from
+``LOGIN_THROTTLE_RATES`` by scope; a missing rate turns a throttle off.
+"""
+import hashlib
+
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class PasswordRateThrottle(SimpleRateThrottle):
+    """Throttle keyed on the client's IP address"""
+
+    def get_rate(self):
+        return getattr(settings, 'LOGIN_THROTTLE_RATES', {}).get(self.scope)
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginIPRateThrottle(PasswordRateThrottle):
+    scope = 'login_ip'
+
+
+class RegistrationIPRateThrottle(PasswordRateThrottle):
+    scope = 'register_ip'
+
+
+class LoginUsernameRateThrottle(PasswordRateThrottle):
+    """Throttle keyed on the username being signed in to, whatever the IP"""
+    scope = 'login_username'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not isinstance(username, str) or not username:
+            return None
+        # Digested, as usernames may hold characters cache keys cannot
+        ident = hashlib.sha256(username.lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
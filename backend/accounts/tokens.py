@@ -0,0 +1,25 @@
+"""JWTs that carry the account fields most requests need.
+
+``UserRefreshToken.for_user`` adds the ``CLAIMS`` below to the tokens it
+issues, and access tokens copy them from their refresh token, so
+``authentication.ClaimsJWTAuthentication`` can answer a request without
+loading the user row.
+"""
+from rest_framework_simplejwt.tokens import RefreshToken
+
+CLAIMS = ('subscription_plan', 'is_active_subscription')
+
+
+def add_claims(token, user):
+    for claim in CLAIMS:
+        token[claim] = getattr(user, claim)
+
+
+class UserRefreshToken(RefreshToken):
+    """``RefreshToken`` embedding the user's ``CLAIMS``"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        add_claims(token, user)
+        return token
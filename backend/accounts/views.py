@@ -1,36 +1,37 @@
 from django.shortcuts import render
 from rest_framework import status, generics, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate, login
+from django.contrib.auth import login
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.conf import settings
 import requests
 import json
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token
-import os
 
 from .serializers import (
     UserRegistrationSerializer, UserProfileSerializer, GoogleOAuthSerializer,
     LoginSerializer, ChangePasswordSerializer
 )
-from .models import User
+from . import google, hashing
+from .throttling import LoginIPRateThrottle, LoginUsernameRateThrottle, RegistrationIPRateThrottle
+from .tokens import UserRefreshToken
 
 
 class UserRegistrationView(generics.CreateAPIView):
     """View for user registration"""
     serializer_class = UserRegistrationSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [RegistrationIPRateThrottle]
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = UserRefreshToken.for_user(user)
             return Response({
                 'message': 'User registered successfully',
                 'user': UserProfileSerializer(user).data,
@@ -45,16 +46,17 @@ class UserRegistrationView(generics.CreateAPIView):
 class UserLoginView(APIView):
     """View for user login"""
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LoginIPRateThrottle, LoginUsernameRateThrottle]
     
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
             username = serializer.validated_data['username']
             password = serializer.validated_data['password']
-            user = authenticate(username=username, password=password)
+            user = hashing.authenticate(username, password)
             
             if user:
-                refresh = RefreshToken.for_user(user)
+                refresh = UserRefreshToken.for_user(user)
                 return Response({
                     'message': 'Login successful',
                     'user': UserProfileSerializer(user).data,
@@ -80,40 +82,13 @@ class GoogleOAuthView(APIView):
             credential = serializer.validated_data['access_token']  # This is actually the ID token
             
             try:
-                # Verify the Google ID token
-                idinfo = id_token.verify_oauth2_token(
-                    credential, 
-                    google_requests.Request(), 
-                    os.environ.get('GOOGLE_OAUTH2_CLIENT_ID', '')
-                )
+                # Verify the Google ID token against cached certificates
+                idinfo = google.get_verifier().verify(credential)
                 
-                # Get user info from the verified token
-                google_user_data = {
-                    'id': idinfo['sub'],
-                    'email': idinfo['email'],
-                    'given_name': idinfo.get('given_name', ''),
-                    'family_name': idinfo.get('family_name', ''),
-                    'picture': idinfo.get('picture', ''),
-                }
-                
-                # Get or create user
-                user, created = User.objects.get_or_create(
-                    google_id=google_user_data['id'],
-                    defaults={
-                        'username': google_user_data['email'],
-                        'email': google_user_data['email'],
-                        'first_name': google_user_data.get('given_name', ''),
-                        'last_name': google_user_data.get('family_name', ''),
-                        'profile_picture': google_user_data.get('picture', ''),
-                    }
-                )
-                
-                # Update profile picture if it changed
-                if user.profile_picture != google_user_data.get('picture', ''):
-                    user.profile_picture = google_user_data.get('picture', '')
-                    user.save()
+                # Create the user, or update their profile picture if it changed
+                user, created = google.upsert_user(idinfo)
                 
-                refresh = RefreshToken.for_user(user)
+                refresh = UserRefreshToken.for_user(user)
                 return Response({
                     'message': 'Google OAuth successful',
                     'user': UserProfileSerializer(user).data,
@@ -138,6 +113,7 @@ class GoogleOAuthView(APIView):
 class UserProfileView(generics.RetrieveUpdateAPIView):
     """View for user profile management"""
     serializer_class = UserProfileSerializer
+    authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
@@ -146,6 +122,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 
 class ChangePasswordView(APIView):
     """View for changing user password"""
+    authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request):
@@ -155,7 +132,7 @@ class ChangePasswordView(APIView):
             old_password = serializer.validated_data['old_password']
             new_password = serializer.validated_data['new_password']
             
-            if not user.check_password(old_password):
+            if not hashing.check_password(user, old_password):
                 return Response({
                     'error': 'Current password is incorrect'
                 }, status=status.HTTP_400_BAD_REQUEST)
@@ -167,11 +144,16 @@ class ChangePasswordView(APIView):
                     'error': e.messages[0]
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            user.set_password(new_password)
-            user.save()
+            hashing.set_password(user, new_password)
             
+            # With CHECK_REVOKE_TOKEN, tokens issued before the change are revoked
+            refresh = UserRefreshToken.for_user(user)
             return Response({
-                'message': 'Password changed successfully'
+                'message': 'Password changed successfully',
+                'tokens': {
+                    'access': str(refresh.access_token),
+                    'refresh': str(refresh),
+                }
             }, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -195,6 +177,7 @@ def logout_view(request):
 
 
 @api_view(['GET'])
+@authentication_classes([JWTAuthentication])
 @permission_classes([permissions.IsAuthenticated])
 def user_info_view(request):
     """View for getting current user information"""
@@ -12,5 +12,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Serve the read-only content endpoints from their async views
+os.environ.setdefault('CONTENT_ASYNC_VIEWS', 'True')
+# Sync code runs on per-request executor threads, each of which would keep
+# a persistent connection of its own; pool them with DATABASE_POOL instead
+os.environ.setdefault('DATABASE_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
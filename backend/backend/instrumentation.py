@@ -0,0 +1,365 @@
+"""Per-route request metrics, Server-Timing headers and sampled profiles.
+
+``PerformanceMiddleware`` times every request and, through an execute
+wrapper installed on each database connection, counts its queries and the
+time they took. Code that serializes responses wraps the work in
+``span('serializer')``; query time inside a span is not counted twice.
+Each request is recorded under its URL name (``content:content-search``)
+and method in Prometheus histograms, which ``metrics_view`` exposes in the
+text format at ``/metrics``.
+
+With ``PERFORMANCE_SERVER_TIMING`` on, responses carry a ``Server-Timing``
+header with the same figures. ``PERFORMANCE_PROFILE_ROUTES`` maps URL names
+to the fraction of their requests to run under cProfile; each profiled
+request is dumped to ``PERFORMANCE_PROFILE_DIR`` for ``pstats`` or
+snakeviz. Under ASGI the profiler runs on the thread the view runs on: the
+request's executor thread for a sync view, the event loop for an async one,
+whose profile then also holds whatever other requests ran on the loop
+meanwhile.
+
+Alongside the request metrics, ``/metrics`` counts the database connections
+each alias opened (or took from its pool) and, for aliases served by a
+psycopg pool, reports the pool's size, idle connections and the requests
+waiting for one: a pool whose available count sits at zero while requests
+queue is saturated.
+
+Metrics are kept per process. Under a multi-worker server each scrape
+reads the worker that answered it.
+"""
+import cProfile
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+_current = ContextVar('request_timings', default=None)
+
+
+class Timings:
+    """What one request spent, filled in while it runs"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.spans = {}
+
+
+def record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db_time += time.perf_counter() - started
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def count_connection(connection, **kwargs):
+    registry.count_connection(connection.alias)
+
+
+connection_created.connect(install_query_recorder)
+connection_created.connect(count_connection)
+
+
+@contextmanager
+def span(name):
+    """Add the block's run time, less its queries, to the request's ``name``"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    db_time = timings.db_time
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started - (timings.db_time - db_time)
+        timings.spans[name] = timings.spans.get(name, 0.0) + elapsed
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+# name: (psycopg_pool statistic, type, help text)
+POOL_METRICS = {
+    'db_pool_max_size': ('pool_max', 'gauge', 'Most connections the pool may open'),
+    'db_pool_size': ('pool_size', 'gauge', 'Connections open, in use or idle'),
+    'db_pool_available': ('pool_available', 'gauge', 'Idle connections'),
+    'db_pool_requests_waiting': ('requests_waiting', 'gauge', 'Requests waiting for a connection'),
+    'db_pool_requests_total': ('requests_num', 'counter', 'Connections requested'),
+    'db_pool_requests_queued_total': (
+        'requests_queued', 'counter', 'Requests that waited for a connection'
+    ),
+    'db_pool_requests_errors_total': (
+        'requests_errors', 'counter', 'Requests that timed out waiting for a connection'
+    ),
+}
+
+
+def get_pool_stats():
+    """Return ``{alias: stats}`` of the aliases served by a psycopg pool"""
+    pools = {}
+    for alias in connections:
+        connection = connections[alias]
+        if connection.settings_dict['OPTIONS'].get('pool'):
+            pools[alias] = connection.pool.get_stats()
+    return pools
+
+
+def render_pools(pools):
+    lines = []
+    for name, (statistic, kind, help_text) in POOL_METRICS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for alias, stats in sorted(pools.items()):
+            lines.append(f'{name}{{alias="{escape(alias)}"}} {stats.get(statistic, 0)}')
+    name = 'db_pool_request_wait_seconds_total'
+    lines += [f'# HELP {name} Time requests spent waiting for a connection',
+              f'# TYPE {name} counter']
+    for alias, stats in sorted(pools.items()):
+        lines.append(f'{name}{{alias="{escape(alias)}"}} {stats.get("requests_wait_ms", 0) / 1000}')
+    return lines
+
+
+class Registry:
+    """Histograms and counters keyed by ``(route, method)``"""
+
+    # name: (help text, buckets)
+    HISTOGRAMS = {
+        'http_request_duration_seconds': ('Request latency', DURATION_BUCKETS),
+        'http_request_db_queries': ('Database queries per request', QUERY_BUCKETS),
+        'http_request_db_duration_seconds': ('Database time per request', DURATION_BUCKETS),
+        'http_request_serializer_duration_seconds': (
+            'Serializer time per request, excluding its queries', DURATION_BUCKETS
+        ),
+        'http_response_size_bytes': ('Response body size', SIZE_BUCKETS),
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {name: {} for name in self.HISTOGRAMS}
+        self.responses = {}
+        self.connections = {}
+
+    def count_connection(self, alias):
+        with self.lock:
+            self.connections[alias] = self.connections.get(alias, 0) + 1
+
+    def observe(self, route, method, status, values):
+        key = (route, method)
+        with self.lock:
+            for name, value in values.items():
+                histograms = self.histograms[name]
+                if key not in histograms:
+                    histograms[key] = Histogram(self.HISTOGRAMS[name][1])
+                histograms[key].observe(value)
+            self.responses[key + (status,)] = self.responses.get(key + (status,), 0) + 1
+
+    def render(self):
+        """Return the metrics in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for name, (help_text, _) in self.HISTOGRAMS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for (route, method), histogram in sorted(self.histograms[name].items()):
+                    labels = f'route="{escape(route)}",method="{method}"'
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+            lines += ['# HELP http_responses_total Responses by status code',
+                      '# TYPE http_responses_total counter']
+            for (route, method, status), count in sorted(self.responses.items()):
+                lines.append(
+                    f'http_responses_total{{route="{escape(route)}",method="{method}",'
+                    f'status="{status}"}} {count}'
+                )
+            lines += ['# HELP db_connections_opened_total Connections opened, or taken from a pool',
+                      '# TYPE db_connections_opened_total counter']
+            for alias, count in sorted(self.connections.items()):
+                lines.append(f'db_connections_opened_total{{alias="{escape(alias)}"}} {count}')
+        lines += render_pools(get_pool_stats())
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+def get_route(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+def get_profile_rate(route):
+    return getattr(settings, 'PERFORMANCE_PROFILE_ROUTES', {}).get(route, 0)
+
+
+def is_sampled(request):
+    rate = get_profile_rate(get_route(request))
+    return bool(rate) and random.random() < rate
+
+
+def start_profile():
+    """Return a profiler running on the calling thread, or ``None``"""
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is running on this thread
+        return None
+    return profile
+
+
+def dump_profile(profile, route):
+    directory = Path(getattr(settings, 'PERFORMANCE_PROFILE_DIR', 'profiles'))
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{route.replace(':', '.')}-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-" \
+        f'{threading.get_ident()}.prof'
+    profile.dump_stats(directory / name)
+
+
+class PerformanceMiddleware:
+    """Records latency, queries, database and serializer time and response
+    size per route"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFORMANCE_METRICS', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django calls a sync process_view on the request's executor
+            # thread, which never runs an async view
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        timings = Timings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+            profile = getattr(request, '_performance_profile', None)
+            if profile is not None:
+                profile.disable()
+                dump_profile(profile, get_route(request))
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = Timings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+            profile = getattr(request, '_performance_profile', None)
+            if profile is not None:
+                # Stopped on the thread it was started on
+                if request._performance_profile_on_loop:
+                    profile.disable()
+                else:
+                    await sync_to_async(profile.disable)()
+                await sync_to_async(dump_profile)(profile, get_route(request))
+        return self.finish(request, response, timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if is_sampled(request):
+            request._performance_profile = start_profile()
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if not is_sampled(request):
+            return None
+        request._performance_profile_on_loop = iscoroutinefunction(view_func)
+        if request._performance_profile_on_loop:
+            request._performance_profile = start_profile()
+        else:
+            request._performance_profile = await sync_to_async(start_profile)()
+        return None
+
+    def finish(self, request, response, timings):
+        elapsed = time.perf_counter() - timings.started
+        serializer_time = timings.spans.get('serializer', 0.0)
+        values = {
+            'http_request_duration_seconds': elapsed,
+            'http_request_db_queries': timings.queries,
+            'http_request_db_duration_seconds': timings.db_time,
+            'http_request_serializer_duration_seconds': serializer_time,
+        }
+        if not response.streaming:
+            values['http_response_size_bytes'] = len(response.content)
+        registry.observe(get_route(request), request.method, response.status_code, values)
+        if getattr(settings, 'PERFORMANCE_SERVER_TIMING', False):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={timings.db_time * 1000:.2f};desc="{timings.queries} queries"',
+                f'serializer;dur={serializer_time * 1000:.2f}',
+                f'total;dur={elapsed * 1000:.2f}',
+            ])
+        return response
+
+
+def may_scrape(request):
+    """Return whether ``request`` may read the metrics: it must carry
+    ``METRICS_TOKEN`` as a bearer token, or without a token come from one
+    of ``INTERNAL_IPS`` or reach a ``DEBUG`` server"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        return constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    return settings.DEBUG or request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+
+
+def metrics_view(request):
+    """Serve the metrics in the Prometheus text format"""
+    if not may_scrape(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
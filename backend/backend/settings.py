@@ -14,6 +14,8 @@ from pathlib import Path
 import os
 from datetime import timedelta
 
+from .database import get_database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +45,7 @@ INSTALLED_APPS = [
     # Third party apps
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'django_filters',
     
@@ -52,6 +55,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.instrumentation.PerformanceMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -86,13 +90,54 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DATABASE_URL (or SQLITE_PATH), persistent connections, the PostgreSQL
+# pool and SQLite pragmas are read from the environment, see database.py
 DATABASES = {
+    'default': get_database(BASE_DIR),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'netflix-clone'),
     }
 }
 
+# Per-user watchlist and rating cache. USER_LIBRARY_CACHE_BACKEND picks a
+# local memory, file based or Redis cache; each has a default location.
+# locmem is per process, so servers with several workers need file or redis
+USER_LIBRARY_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'user-library'),
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        str(BASE_DIR / 'cache' / 'user-library'),
+    ),
+    'redis': (
+        'django.core.cache.backends.redis.RedisCache',
+        os.environ.get('REDIS_URL', 'redis://localhost:6379/1'),
+    ),
+}
+_library_backend, _library_location = USER_LIBRARY_CACHE_BACKENDS[
+    os.environ.get('USER_LIBRARY_CACHE_BACKEND', 'locmem')
+]
+CACHES['user_library'] = {
+    'BACKEND': _library_backend,
+    'LOCATION': os.environ.get('USER_LIBRARY_CACHE_LOCATION', _library_location),
+}
+USER_LIBRARY_CACHE = 'user_library'
+USER_LIBRARY_TIMEOUT = int(os.environ.get('USER_LIBRARY_TIMEOUT', 86400))
+
+# Home page rows: cache alias and lifetime of the precomputed payload. The
+# new releases row is date based, so entries also expire on their own.
+HOME_ROWS_CACHE = 'default'
+HOME_ROWS_TIMEOUT = int(os.environ.get('HOME_ROWS_TIMEOUT', 3600))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -112,6 +157,33 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing. PASSWORD_HASHER picks the hasher of new passwords:
+# pbkdf2, scrypt or argon2. Passwords stored by the others are rehashed
+# with it on the next login
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+}
+_password_hasher = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CLASSES[_password_hasher],
+    *(path for name, path in PASSWORD_HASHER_CLASSES.items() if name != _password_hasher),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Threads hashing passwords (default: one per CPU), and how many more
+# hashes may wait for one before sign-ins are refused with a 503
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 0)) or None
+PASSWORD_HASHING_QUEUE = int(os.environ.get('PASSWORD_HASHING_QUEUE', 32))
+
+# Login and registration throttles, checked before a password is hashed
+LOGIN_THROTTLE_RATES = {
+    'login_ip': os.environ.get('LOGIN_RATE_PER_IP', '30/min'),
+    'login_username': os.environ.get('LOGIN_RATE_PER_USERNAME', '10/min'),
+    'register_ip': os.environ.get('REGISTER_RATE_PER_IP', '10/min'),
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -138,7 +210,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -173,10 +245,23 @@ SIMPLE_JWT = {
 
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    'TOKEN_USER_CLASS': 'accounts.authentication.ClaimsUser',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.UserTokenRefreshSerializer',
 
     'JTI_CLAIM': 'jti',
+
+    # Tokens carry a digest of the password hash; changing it revokes them.
+    # Tokens issued while this is off carry no digest and are refused once
+    # it is turned on, so enable it with a deploy that may sign users out
+    'CHECK_REVOKE_TOKEN': os.environ.get('JWT_CHECK_REVOKE_TOKEN', 'False') == 'True',
 }
 
+# Cache alias and lifetime, in seconds, of the account states that
+# ClaimsJWTAuthentication checks tokens against. Saving a user clears its
+# entry; with per-process caches other processes notice within the timeout
+JWT_USER_STATE_CACHE = 'default'
+JWT_USER_STATE_TIMEOUT = int(os.environ.get('JWT_USER_STATE_TIMEOUT', 60))
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -189,6 +274,72 @@ CORS_ALLOW_CREDENTIALS = True
 # Google OAuth settings
 GOOGLE_OAUTH2_CLIENT_ID = os.environ.get('GOOGLE_OAUTH2_CLIENT_ID', '')
 GOOGLE_OAUTH2_CLIENT_SECRET = os.environ.get('GOOGLE_OAUTH2_CLIENT_SECRET', '')
+# Google's signing certificates, cached as long as their Cache-Control allows
+GOOGLE_OAUTH2_CERTS_URL = os.environ.get(
+    'GOOGLE_OAUTH2_CERTS_URL', 'https://www.googleapis.com/oauth2/v1/certs'
+)
 
 # Custom user model
 AUTH_USER_MODEL = 'accounts.User'
+
+# Full-text search: maximum number of ranked matches considered per query
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 1000))
+
+# Largest number of operations accepted by one watchlist or rating batch write
+BATCH_MAX_OPERATIONS = int(os.environ.get('BATCH_MAX_OPERATIONS', 500))
+
+# Recommendations: how many of a user's best genres seed the candidate pool
+# and how many title/genre rows are scored per request
+RECOMMENDATION_TOP_GENRES = 5
+RECOMMENDATION_CANDIDATES = 1000
+
+# Item-item similarity model written by build_similarity_model: where the
+# arrays live and how many neighbors are kept per title
+RECOMMENDATION_MODEL_DIR = os.environ.get(
+    'RECOMMENDATION_MODEL_DIR', str(BASE_DIR / 'recommendation_model')
+)
+RECOMMENDATION_NEIGHBORS = int(os.environ.get('RECOMMENDATION_NEIGHBORS', 50))
+
+# Cache-Control max-age, in seconds, of the public catalog endpoints. They
+# also send an ETag, so clients revalidate once it runs out
+CONTENT_CACHE_LIFETIMES = {
+    'genres': 3600,
+    'detail': 300,
+    'featured': 60,
+    'trending': 60,
+    'new_releases': 300,
+    'home': 60,
+}
+
+# Serialize the content list, featured, trending, new release, search and
+# home rows straight from column tuples instead of model instances. The
+# parity tests cover each of them, on SQLite only; off by default so the DRF
+# serializers stay the reference until it has run against PostgreSQL
+CONTENT_FAST_SERIALIZATION = os.environ.get('CONTENT_FAST_SERIALIZATION', 'False') == 'True'
+
+# Route featured, trending, new releases, search and title details to the
+# async views. backend/asgi.py turns it on for ASGI servers
+CONTENT_ASYNC_VIEWS = os.environ.get('CONTENT_ASYNC_VIEWS', 'False') == 'True'
+
+# Request instrumentation: per-route latency, query, database and serializer
+# time and response size histograms, served in the Prometheus text format
+# at /metrics. Scrapers send METRICS_TOKEN as a bearer token; without one
+# only INTERNAL_IPS (comma separated) and DEBUG servers are answered
+PERFORMANCE_METRICS = os.environ.get('PERFORMANCE_METRICS', 'True') == 'True'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+INTERNAL_IPS = [ip for ip in os.environ.get('INTERNAL_IPS', '').split(',') if ip]
+# Add a Server-Timing header to every response
+PERFORMANCE_SERVER_TIMING = os.environ.get('PERFORMANCE_SERVER_TIMING', str(DEBUG)) == 'True'
+# URL name: fraction of its requests profiled with cProfile, for example
+# PERFORMANCE_PROFILE_ROUTES=content:content-search=0.01,content:content-recommendations=0.1
+PERFORMANCE_PROFILE_ROUTES = {
+    route: float(rate) for route, _, rate in (
+        item.rpartition('=') for item in os.environ.get('PERFORMANCE_PROFILE_ROUTES', '').split(',')
+        if item
+    )
+}
+PERFORMANCE_PROFILE_DIR = os.environ.get('PERFORMANCE_PROFILE_DIR', str(BASE_DIR / 'profiles'))
+
+# Trending: hours of hourly activity buckets kept, and how fast they decay
+TRENDING_WINDOW_HOURS = int(os.environ.get('TRENDING_WINDOW_HOURS', 168))
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 24))
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Genre, Movie, TVShow, UserWatchlist, UserRating
+from .models import Genre, Movie, TVShow, UserWatchlist, UserRating, UserTasteProfile
 
 
 @admin.register(Genre)
@@ -161,3 +161,11 @@ class UserRatingAdmin(admin.ModelAdmin):
     )
     
     ordering = ['-created_at']
+
+
+@admin.register(UserTasteProfile)
+class UserTasteProfileAdmin(admin.ModelAdmin):
+    """Admin interface for UserTasteProfile model"""
+    list_display = ['user', 'updated_at']
+    search_fields = ['user__username', 'user__email']
+    readonly_fields = ['user', 'genre_weights', 'updated_at']
@@ -0,0 +1,283 @@
+"""Endpoint suite of the ``benchmark_api`` command.
+
+``ENDPOINTS`` builds the requests of every URL in ``content.urls`` and
+``accounts.urls``; ``check_coverage`` fails when one is added without an
+entry. ``Fixture`` holds the seeded users, titles and tokens the requests
+refer to. Each endpoint's requests are timed through the Django test
+client (``run_client``, counting queries directly) or against a real
+server process (``run_on_server``, reading query counts from the server's
+``/metrics``), and ``compare`` checks results against a stored baseline.
+Latencies only compare between runs on one machine, so a baseline records
+``get_machine()`` and is generated locally rather than committed.
+"""
+import asyncio
+import json
+import os
+import platform
+import re
+import time
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.urls import get_resolver, reverse
+
+from accounts.tokens import UserRefreshToken
+
+from .benchmarking import load, send, summarize
+from .models import Movie, TVShow, UserRating, UserWatchlist
+
+User = get_user_model()
+
+PASSWORD = 'benchmark-password'
+NEW_PASSWORD = 'benchmark-password-2'
+GOOGLE_CLIENT_ID = 'benchmark-client'
+BATCH_SIZE = 20
+
+# label, URL name, method, ``build(fixture, index)`` returning ``(URL
+# arguments, JSON body, user to authenticate as)``, and whether it writes
+Endpoint = namedtuple('Endpoint', 'label url_name method build writes')
+Request = namedtuple('Request', 'method path body headers')
+
+
+def endpoint(url_name, method='GET', build=None, label=None, writes=False):
+    return Endpoint(
+        label or url_name, url_name, method, build or (lambda fx, i: ((), None, None)), writes
+    )
+
+
+ENDPOINTS = [
+    endpoint('content:genre-list'),
+    endpoint('content:movie-list'),
+    endpoint('content:movie-list', label='content:movie-list (signed in)',
+             build=lambda fx, i: ((), None, fx.viewer)),
+    endpoint('content:tv-show-list'),
+    endpoint('content:movie-detail', build=lambda fx, i: ((fx.movie(i),), None, None)),
+    endpoint('content:tv-show-detail', build=lambda fx, i: ((fx.tv_show(i),), None, None)),
+    endpoint('content:home-rows'),
+    endpoint('content:featured-content'),
+    endpoint('content:new-releases'),
+    endpoint('content:trending-content'),
+    endpoint('content:content-search', 'POST',
+             lambda fx, i: ((), {'query': ['drama', 'action', 'comedy', 'thriller'][i % 4]}, None)),
+    endpoint('content:content-recommendations', 'POST',
+             lambda fx, i: ((), {'limit': 10}, fx.viewer)),
+    endpoint('content:user-watchlist', build=lambda fx, i: ((), None, fx.viewer)),
+    endpoint('content:user-watchlist', 'POST', label='content:user-watchlist (add)',
+             build=lambda fx, i: ((), {'movie_id': fx.movie(i)}, fx.writer), writes=True),
+    endpoint('content:user-watchlist-batch', 'POST', lambda fx, i: ((), {'operations': [
+        {'op': 'mark_watched', 'movie_id': fx.movie(i * BATCH_SIZE + j), 'is_watched': i % 2 == 0}
+        for j in range(BATCH_SIZE)
+    ]}, fx.viewer), writes=True),
+    endpoint('content:user-watchlist-detail',
+             build=lambda fx, i: ((fx.watchlist_id,), None, fx.viewer)),
+    endpoint('content:user-ratings', build=lambda fx, i: ((), None, fx.viewer)),
+    endpoint('content:user-ratings', 'POST', label='content:user-ratings (rate)',
+             build=lambda fx, i: ((), {'movie_id': fx.movie(i), 'rating': 4}, fx.writer),
+             writes=True),
+    endpoint('content:user-ratings-batch', 'POST', lambda fx, i: ((), {'operations': [
+        {'op': 'rate', 'movie_id': fx.movie(i * BATCH_SIZE + j), 'rating': 1 + (i + j) % 5}
+        for j in range(BATCH_SIZE)
+    ]}, fx.viewer), writes=True),
+    endpoint('content:user-rating-detail', build=lambda fx, i: ((fx.rating_id,), None, fx.viewer)),
+    endpoint('accounts:register', 'POST', lambda fx, i: ((), {
+        'username': f'registered{i}', 'email': f'registered{i}@example.com',
+        'password': NEW_PASSWORD, 'password_confirm': NEW_PASSWORD,
+    }, None), writes=True),
+    endpoint('accounts:login', 'POST',
+             lambda fx, i: ((), {'username': fx.viewer.username, 'password': PASSWORD}, None)),
+    endpoint('accounts:logout', 'POST', lambda fx, i: ((), {}, fx.viewer)),
+    endpoint('accounts:google-oauth', 'POST', lambda fx, i: ((), {
+        'access_token': fx.key_server.sign(
+            GOOGLE_CLIENT_ID, f'google{i % 50}', f'google{i % 50}@example.com'
+        ),
+    }, None), writes=True),
+    endpoint('accounts:token_refresh', 'POST', lambda fx, i: ((), {'refresh': fx.refresh}, None)),
+    endpoint('accounts:profile', build=lambda fx, i: ((), None, fx.viewer)),
+    endpoint('accounts:profile', 'PATCH', label='accounts:profile (update)',
+             build=lambda fx, i: ((), {'bio': f'Benchmark bio {i}'}, fx.viewer), writes=True),
+    # Every request changes the password of a user of its own
+    endpoint('accounts:change-password', 'POST', lambda fx, i: ((), {
+        'old_password': PASSWORD, 'new_password': NEW_PASSWORD,
+        'new_password_confirm': NEW_PASSWORD,
+    }, fx.password_user(i)), writes=True),
+    endpoint('accounts:user-info', build=lambda fx, i: ((), None, fx.viewer)),
+]
+
+
+def check_coverage(endpoints=ENDPOINTS):
+    """Return the URL names of ``content.urls`` and ``accounts.urls`` that
+    no endpoint requests"""
+    covered = {endpoint.url_name for endpoint in endpoints}
+    missing = []
+    for namespace in ['content', 'accounts']:
+        for pattern in get_resolver(f'{namespace}.urls').url_patterns:
+            name = f'{namespace}:{pattern.name}'
+            if pattern.name and name not in covered:
+                missing.append(name)
+    return missing
+
+
+class Fixture:
+    """The users, titles and tokens endpoint requests refer to.
+
+    ``requests`` is the most requests any endpoint will send, which sizes
+    the pool of users whose password is changed.
+    """
+
+    def __init__(self, viewer, key_server, requests):
+        self.viewer = viewer
+        self.key_server = key_server
+        self.movie_ids = list(Movie.objects.order_by('id').values_list('id', flat=True))
+        self.tv_show_ids = list(TVShow.objects.order_by('id').values_list('id', flat=True))
+        if len(self.movie_ids) < requests:
+            raise ValueError(f'Writes need at least {requests} movies')
+        password = make_password(PASSWORD)
+        self.writer = User.objects.create(username='benchmark-writer', password=password)
+        self.password_users = User.objects.bulk_create([
+            User(username=f'password{i}', password=password) for i in range(requests)
+        ])
+        self.watchlist_id = UserWatchlist.objects.filter(user=viewer).values_list(
+            'id', flat=True
+        ).first()
+        self.rating_id = UserRating.objects.filter(user=viewer).values_list(
+            'id', flat=True
+        ).first()
+        self.refresh = str(UserRefreshToken.for_user(viewer))
+        self.tokens = {}
+
+    def movie(self, index):
+        return self.movie_ids[index % len(self.movie_ids)]
+
+    def tv_show(self, index):
+        return self.tv_show_ids[index % len(self.tv_show_ids)]
+
+    def password_user(self, index):
+        return self.password_users[index]
+
+    def get_headers(self, user):
+        if user is None:
+            return {}
+        if user.pk not in self.tokens:
+            self.tokens[user.pk] = str(UserRefreshToken.for_user(user).access_token)
+        return {'Authorization': f'Bearer {self.tokens[user.pk]}'}
+
+    def build(self, endpoint, index):
+        args, body, user = endpoint.build(self, index)
+        return Request(
+            endpoint.method, reverse(endpoint.url_name, args=args), body, self.get_headers(user)
+        )
+
+
+def check_response(endpoint, status, body):
+    if status >= 400:
+        raise RuntimeError(
+            f'{endpoint.method} {endpoint.label} returned {status}: {body[:300]!r}'
+        )
+
+
+def run_client(endpoints, requests):
+    """Time each endpoint's ``Request`` list through the test client; the
+    first request of each is a warm-up"""
+    client = Client()
+    results = {}
+    for endpoint in endpoints:
+        samples = []
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        for index, request in enumerate(requests[endpoint.label]):
+            kwargs = {'headers': request.headers}
+            if request.body is not None:
+                kwargs.update(data=json.dumps(request.body), content_type='application/json')
+            started = time.perf_counter()
+            if index:
+                with connection.execute_wrapper(count_query):
+                    response = client.generic(request.method, request.path, **kwargs)
+            else:
+                response = client.generic(request.method, request.path, **kwargs)
+            elapsed = time.perf_counter() - started
+            check_response(endpoint, response.status_code, response.content)
+            if index:
+                samples.append(elapsed)
+        results[endpoint.label] = {**summarize(samples), 'queries': len(queries) / len(samples)}
+    return results
+
+
+async def scrape_queries(port, token):
+    """Return ``{(route, method): (queries, requests)}`` from ``/metrics``"""
+    status, body = await send(
+        port, 'GET', reverse('metrics'), headers={'Authorization': f'Bearer {token}'}
+    )
+    if status != 200:
+        raise RuntimeError(f'/metrics returned {status}')
+    totals = {}
+    for kind, route, method, value in re.findall(
+        r'^http_request_db_queries_(sum|count)\{route="([^"]*)",method="([^"]*)"\} (\S+)$',
+        body.decode(), re.MULTILINE
+    ):
+        queries, count = totals.get((route, method), (0, 0))
+        totals[route, method] = (
+            (float(value), count) if kind == 'sum' else (queries, float(value))
+        )
+    return totals
+
+
+def run_on_server(endpoints, requests, port, concurrency, metrics_token):
+    """Send each endpoint's requests to the server on ``port``, writes one
+    at a time; the first request of each is a warm-up. ``metrics_token``
+    is the server's ``METRICS_TOKEN``."""
+    results = {}
+    for endpoint in endpoints:
+        warmup, *timed = requests[endpoint.label]
+        status, body = asyncio.run(send(port, *warmup))
+        check_response(endpoint, status, body)
+        key = (endpoint.url_name, endpoint.method)
+        before = asyncio.run(scrape_queries(port, metrics_token)).get(key, (0, 0))
+        elapsed, latencies, errors = asyncio.run(
+            load(port, timed, 1 if endpoint.writes else concurrency, len(timed))
+        )
+        after = asyncio.run(scrape_queries(port, metrics_token)).get(key, (0, 0))
+        if errors:
+            raise RuntimeError(f'{endpoint.method} {endpoint.label}: {errors} failed requests')
+        stats = summarize(latencies)
+        stats['rps'] = len(latencies) / elapsed
+        requests_seen = after[1] - before[1]
+        stats['queries'] = (after[0] - before[0]) / requests_seen if requests_seen else None
+        results[endpoint.label] = stats
+    return results
+
+
+def get_machine():
+    """Describe the machine and interpreter a baseline's timings come from"""
+    return {
+        'node': platform.node(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+    }
+
+
+def compare(results, baseline, tolerance, timings=True):
+    """Yield ``(mode, label, description, regressed)`` for every result the
+    baseline also has. A result regresses when it runs more queries or,
+    with ``timings``, when its p95 latency grows by more than ``tolerance``
+    (a fraction)."""
+    for mode, mode_results in results.items():
+        for label, stats in mode_results.items():
+            base = baseline.get(mode, {}).get(label)
+            if base is None:
+                continue
+            change = stats['p95_ms'] / base['p95_ms'] - 1 if base['p95_ms'] else 0.0
+            regressed = timings and change > tolerance
+            description = f"p95 {base['p95_ms']:8.2f} -> {stats['p95_ms']:8.2f}ms ({change:+6.1%})"
+            if stats.get('queries') is not None and base.get('queries') is not None:
+                regressed = regressed or stats['queries'] > base['queries'] + 0.5
+                description += f"  queries {base['queries']:5.1f} -> {stats['queries']:5.1f}"
+            yield mode, label, description, regressed
@@ -0,0 +1,238 @@
+"""Async views for the read-only content endpoints.
+
+Under ASGI a synchronous view holds a worker thread for its whole run,
+database waits included. These views answer featured, trending, new
+releases, search and title details with the same JSON as their DRF
+counterparts in ``views`` but read through Django's async ORM, so the
+event loop keeps serving other requests while one waits on the database.
+The async ORM runs every query on Django's one thread-sensitive executor,
+so a request's own queries still run one after another. GET and HEAD are
+answered here; OPTIONS and the 405 for other methods come from the DRF
+view, so the allowed methods and metadata match.
+
+``backend/asgi.py`` turns on ``CONTENT_ASYNC_VIEWS``, which makes
+``content.urls`` route these endpoints here; WSGI deployments keep the
+sync views.
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from . import compiled, conditional, stats, trending, views
+from .models import Genre, Movie, TVShow
+from .renderers import FastJSONRenderer
+from .serializers import ContentSearchSerializer, MovieSerializer, TVShowSerializer
+from .views import SEARCH_TYPES, get_search_payload, get_user_state_context, run_search
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def render(data, status=200, renderer_class=FastJSONRenderer):
+    return HttpResponse(
+        renderer_class().render(data), status=status, content_type='application/json'
+    )
+
+
+def render_exception(request, exc, authenticator=None):
+    """Render an ``APIException`` the way DRF's exception handler does"""
+    detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = render(detail, exc.status_code)
+    if authenticator is not None and exc.status_code == 401:
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+    return response
+
+
+async def authenticate(request):
+    """Set ``request.user`` from the configured header authenticators.
+
+    Returns an error response when a credential is present but invalid, as
+    the DRF views do, else ``None``.
+    """
+    request.user = AnonymousUser()
+    for authenticator_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        authenticator = authenticator_class()
+        try:
+            result = await sync_to_async(authenticator.authenticate)(request)
+        except exceptions.APIException as exc:
+            return render_exception(request, exc, authenticator)
+        if result is not None:
+            request.user = result[0]
+            return None
+    return None
+
+
+def handles(methods, sync_view):
+    """Answer ``methods`` with the decorated async view and every other
+    method, OPTIONS included, with the DRF view it stands in for"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method in methods:
+                return await view(request, *args, **kwargs)
+
+            def respond():
+                return sync_view(request, *args, **kwargs).render()
+            return await sync_to_async(respond)()
+        return wrapper
+    return decorator
+
+
+async def serialize_titles(serializer_class, ids, context=None):
+    """Return ``{id: serialized title}`` for those of ``ids`` that exist"""
+    if not ids:
+        return {}
+    if not compiled.is_enabled():
+        return await sync_to_async(views.serialize_titles)(serializer_class, ids, context)
+    row_serializer = compiled.get_row_serializer(serializer_class)
+    rows = row_serializer.get_rows(serializer_class.Meta.model.objects.filter(pk__in=ids))
+    return {data['id']: data for data in await row_serializer.aserialize(rows, context)}
+
+
+async def serialize_rows(request, rows):
+    """``views.serialize_rows`` for async views"""
+    context = await sync_to_async(get_user_state_context)(request)
+    data = {}
+    for model, serializer_class in [(Movie, MovieSerializer), (TVShow, TVShowSerializer)]:
+        names = [name for name in rows if ('movies' in name) == (model is Movie)]
+        titles = await serialize_titles(
+            serializer_class,
+            {object_id for name in names for object_id in conditional.get_ids(rows[name])},
+            context
+        )
+        for name in names:
+            data[name] = [
+                titles[object_id] for object_id in conditional.get_ids(rows[name])
+                if object_id in titles
+            ]
+    return render(data)
+
+
+async def respond_with_rows(request, name, rows):
+    """Await ``{name: versions coroutine}`` rows, then answer conditionally"""
+    versions = [await row for row in rows.values()]
+    rows = dict(zip(rows, versions))
+    return await conditional.arespond(
+        request, name, versions, lambda: serialize_rows(request, rows)
+    )
+
+
+@handles(SAFE_METHODS, views.FeaturedContentView.as_view())
+async def featured_content(request):
+    error = await authenticate(request)
+    if error is not None:
+        return error
+    return await respond_with_rows(request, 'featured', {
+        'featured_movies': conditional.aget_versions(Movie.objects.filter(is_featured=True), 5),
+        'featured_tv_shows': conditional.aget_versions(TVShow.objects.filter(is_featured=True), 5),
+        'trending_movies': trending.aget_trending(
+            Movie.objects.values_list(*conditional.VERSION_FIELDS), 5
+        ),
+        'trending_tv_shows': trending.aget_trending(
+            TVShow.objects.values_list(*conditional.VERSION_FIELDS), 5
+        ),
+    })
+
+
+@handles(SAFE_METHODS, views.new_releases_view)
+async def new_releases(request):
+    error = await authenticate(request)
+    if error is not None:
+        return error
+    thirty_days_ago = timezone.now().date() - timezone.timedelta(days=30)
+    return await respond_with_rows(request, 'new_releases', {
+        'new_movies': conditional.aget_versions(
+            Movie.objects.filter(release_date__gte=thirty_days_ago), 10
+        ),
+        'new_tv_shows': conditional.aget_versions(
+            TVShow.objects.filter(first_air_date__gte=thirty_days_ago), 10
+        ),
+    })
+
+
+@handles(SAFE_METHODS, views.trending_content_view)
+async def trending_content(request):
+    error = await authenticate(request)
+    if error is not None:
+        return error
+    movies = Movie.objects.values_list(*conditional.VERSION_FIELDS)
+    tv_shows = TVShow.objects.values_list(*conditional.VERSION_FIELDS)
+    genre_name = request.GET.get('genre_name')
+    if genre_name:
+        genre_ids = [
+            genre_id async for genre_id in
+            Genre.objects.filter(name__icontains=genre_name).values_list('id', flat=True)
+        ]
+        movies = stats.filter_by_genres(movies, genre_ids)
+        tv_shows = stats.filter_by_genres(tv_shows, genre_ids)
+    return await respond_with_rows(request, 'trending', {
+        'trending_movies': trending.aget_trending(movies, 10),
+        'trending_tv_shows': trending.aget_trending(tv_shows, 10),
+    })
+
+
+async def content_detail(request, serializer_class, pk):
+    error = await authenticate(request)
+    if error is not None:
+        return error
+    model = serializer_class.Meta.model
+    not_found = {'detail': f'No {model._meta.object_name} matches the given query.'}
+    versions = await conditional.aget_versions(model.objects.filter(pk=pk))
+    if not versions:
+        return render(not_found, 404)
+
+    async def build():
+        context = await sync_to_async(get_user_state_context)(request)
+        titles = await serialize_titles(serializer_class, [pk], context)
+        if pk not in titles:
+            return render(not_found, 404)
+        return render(titles[pk])
+    return await conditional.arespond(request, 'detail', [versions], build)
+
+
+@handles(SAFE_METHODS, views.MovieDetailView.as_view())
+async def movie_detail(request, pk):
+    return await content_detail(request, MovieSerializer, pk)
+
+
+@handles(SAFE_METHODS, views.TVShowDetailView.as_view())
+async def tv_show_detail(request, pk):
+    return await content_detail(request, TVShowSerializer, pk)
+
+
+@csrf_exempt
+@handles(('POST',), views.ContentSearchView.as_view())
+async def content_search(request):
+    error = await authenticate(request)
+    if error is not None:
+        return error
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body) if request.body else {}
+        except ValueError as exc:
+            return render({'detail': f'JSON parse error - {exc}'}, 400, JSONRenderer)
+    else:
+        data = request.POST
+    serializer = ContentSearchSerializer(data=data)
+    if not serializer.is_valid():
+        return render(serializer.errors, 400, JSONRenderer)
+
+    result_page = await sync_to_async(run_search)(serializer.validated_data)
+    context = await sync_to_async(get_user_state_context)(request)
+    serialized = {}
+    for type_code, (_, serializer_class) in SEARCH_TYPES.items():
+        titles = await serialize_titles(
+            serializer_class,
+            [object_id for code, object_id, _ in result_page.matches if code == type_code],
+            context
+        )
+        serialized.update(((type_code, object_id), data) for object_id, data in titles.items())
+    # Rank scores are tiny floats, which only DRF's renderer spells the same
+    return render(get_search_payload(result_page, serialized), renderer_class=JSONRenderer)
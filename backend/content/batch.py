@@ -0,0 +1,266 @@
+"""Batch writes to a user's watchlist and ratings.
+
+A batch is a list of operations on titles named by ``movie_id`` or
+``tv_show_id``. Every operation gets its own result, so an invalid
+operation or an unknown title is reported without failing the others.
+The valid operations run in one transaction with a fixed number of
+queries however long the batch is: one to check that the titles exist,
+one to lock the user's existing rows, then one delete, one bulk update
+and one bulk insert for the net changes. A row another request inserts
+between the lock and the insert fails the unique constraint; the
+transaction then rolls back and the batch is applied again on top of it.
+
+Bulk writes skip the model signals, so the net change of each row's
+taste profile contribution is applied here, the user's cached library is
+refreshed, the touched titles' rating and watchlist aggregates are
+recomputed and new activity is added to the trending buckets.
+"""
+import copy
+from abc import ABC, abstractmethod
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q, Value
+from django.utils import timezone
+
+from . import library, stats, taste, trending
+from .models import Movie, TVShow, UserRating, UserWatchlist
+from .serializers import RatingOperationSerializer, WatchlistOperationSerializer
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+INVALID = 'invalid'
+
+# Times a batch is applied before a unique constraint conflict is raised
+WRITE_ATTEMPTS = 3
+
+CONTENT_MODELS = {
+    'movie': Movie,
+    'tv_show': TVShow,
+}
+
+
+def get_target(data):
+    """Return the ``(field, id)`` an operation applies to"""
+    if data.get('movie_id'):
+        return 'movie', data['movie_id']
+    return 'tv_show', data['tv_show_id']
+
+
+def get_existing_targets(targets):
+    """Return the subset of ``(field, id)`` targets whose title exists"""
+    querysets = []
+    for field, model in CONTENT_MODELS.items():
+        ids = {object_id for target_field, object_id in targets if target_field == field}
+        if ids:
+            querysets.append(
+                model.objects.filter(id__in=ids)
+                .annotate(field=Value(field)).values_list('field', 'id').order_by()
+            )
+    if not querysets:
+        return set()
+    return set(querysets[0].union(*querysets[1:], all=True))
+
+
+class BatchWriter(ABC):
+    """Apply a list of operations to one of a user's tables"""
+    model = None
+    operation_serializer = None
+    update_fields = []
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+    @abstractmethod
+    def get_weight(self, row):
+        """Return a row's taste profile contribution"""
+
+    @abstractmethod
+    def get_trending_events(self, row, created, previous):
+        """Return the trending events of a written row.
+
+        ``previous`` is a copy of the row as it was before the batch.
+        """
+
+    @abstractmethod
+    def apply(self, data, row, existing):
+        """Return ``(row or None, status)`` after applying one operation.
+
+        ``row`` is the title's current row, or a new unsaved one when the
+        user has none (``existing`` is then ``None``).
+        """
+
+    def get_rows(self, targets):
+        condition = Q()
+        for field in CONTENT_MODELS:
+            ids = [object_id for target_field, object_id in targets if target_field == field]
+            if ids:
+                condition |= Q(**{f'{field}_id__in': ids})
+        rows = self.model.objects.select_for_update().filter(condition, user_id=self.user_id)
+        return {
+            ('movie', row.movie_id) if row.movie_id else ('tv_show', row.tv_show_id): row
+            for row in rows
+        }
+
+    def build(self, target):
+        field, object_id = target
+        return self.model(user_id=self.user_id, **{f'{field}_id': object_id})
+
+    def run(self, operations):
+        """Apply ``operations`` and return one result dict per operation"""
+        results = [None] * len(operations)
+        valid = []
+        for index, operation in enumerate(operations):
+            serializer = self.operation_serializer(data=operation)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data, get_target(serializer.validated_data)))
+            else:
+                results[index] = {'index': index, 'status': INVALID, 'errors': serializer.errors}
+
+        targets = get_existing_targets({target for _, _, target in valid})
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            if not targets:
+                break
+            try:
+                with transaction.atomic():
+                    self.write(valid, targets, results)
+                break
+            except IntegrityError:
+                # A concurrent insert for one of the titles committed after
+                # the rows were locked; the next attempt reads it back
+                if attempt == WRITE_ATTEMPTS:
+                    raise
+                for index, _, _ in valid:
+                    results[index] = None
+
+        for index, data, target in valid:
+            if results[index] is None:
+                results[index] = {
+                    'index': index, 'status': NOT_FOUND, 'errors': {f'{target[0]}_id': ['Not found.']}
+                }
+        for result in results:
+            row = result.pop('row', None)
+            if row is not None:
+                result['id'] = row.pk
+        return results
+
+    def write(self, valid, targets, results):
+        original = self.get_rows(targets)
+        # Operations change existing rows in place, so weigh and copy them first
+        weights = {target: self.get_weight(row) for target, row in original.items()}
+        previous = {target: copy.copy(row) for target, row in original.items()}
+        state = dict(original)
+        changed = set()
+        for index, data, target in valid:
+            if target not in targets:
+                continue
+            existing = state.get(target)
+            row, status = self.apply(data, existing or self.build(target), existing)
+            state[target] = row
+            if status in (CREATED, UPDATED):
+                changed.add(target)
+            results[index] = {'index': index, 'status': status, 'row': row}
+
+        # Rows removed, or removed and added again, go first so the unique
+        # constraints never see two rows for one title
+        deleted = [row.pk for target, row in original.items() if state[target] is not row]
+        if deleted:
+            # A plain delete() would send post_delete per row and apply each
+            # row's taste and stats change a second time
+            quote = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {quote(self.model._meta.db_table)} '
+                    f'WHERE {quote(self.model._meta.pk.column)} IN '
+                    f"({', '.join(['%s'] * len(deleted))})",
+                    deleted
+                )
+        updated = [
+            row for target, row in original.items()
+            if state[target] is row and target in changed
+        ]
+        if updated:
+            self.model.objects.bulk_update(updated, self.update_fields)
+        created = [row for row in state.values() if row is not None and row.pk is None]
+        if created:
+            self.model.objects.bulk_create(created)
+
+        changes = []
+        for target in set(original) | changed:
+            after = state.get(target)
+            delta = (self.get_weight(after) if after else 0.0) - weights.get(target, 0.0)
+            if delta:
+                field, object_id = target
+                changes.append((
+                    object_id if field == 'movie' else None,
+                    object_id if field == 'tv_show' else None,
+                    delta,
+                ))
+        taste.apply_changes(self.user_id, changes)
+        events = []
+        for target in changed:
+            row = state[target]
+            if row is not None:
+                is_new = row is not original.get(target)
+                events += self.get_trending_events(row, is_new, previous.get(target))
+        trending.record_events(events)
+        if deleted or updated or created:
+            library.library_changed(self.user_id)
+            stats.refresh_targets(
+                (object_id if field == 'movie' else None, object_id if field == 'tv_show' else None)
+                for field, object_id in set(original) | changed
+            )
+
+
+class WatchlistBatchWriter(BatchWriter):
+    """Batch ``add``, ``remove`` and ``mark_watched`` on a user's watchlist"""
+    model = UserWatchlist
+    operation_serializer = WatchlistOperationSerializer
+    update_fields = ['is_watched', 'watched_at']
+
+    def get_weight(self, row):
+        return taste.watchlist_weight(row.is_watched)
+
+    def get_trending_events(self, row, created, previous):
+        was_watched = not created and previous.is_watched
+        return trending.get_watchlist_events(row, created, was_watched)
+
+    def apply(self, data, row, existing):
+        if data['op'] == 'remove':
+            return None, DELETED if existing else NOT_FOUND
+        is_watched = data.get('is_watched', data['op'] == 'mark_watched')
+        if existing is None:
+            row.is_watched = is_watched
+            row.watched_at = timezone.now() if is_watched else None
+            return row, CREATED
+        if (data['op'] == 'add' and 'is_watched' not in data) or row.is_watched == is_watched:
+            return row, UNCHANGED
+        row.is_watched = is_watched
+        row.watched_at = timezone.now() if is_watched else None
+        return row, UPDATED
+
+
+class RatingBatchWriter(BatchWriter):
+    """Batch ``rate`` and ``remove`` on a user's ratings"""
+    model = UserRating
+    operation_serializer = RatingOperationSerializer
+    update_fields = ['rating', 'review', 'updated_at']
+
+    def get_weight(self, row):
+        return taste.rating_weight(row.rating)
+
+    def get_trending_events(self, row, created, previous):
+        return trending.get_rating_events(row) if created else []
+
+    def apply(self, data, row, existing):
+        if data['op'] == 'remove':
+            return None, DELETED if existing else NOT_FOUND
+        review = data.get('review', row.review if existing else '')
+        if existing is not None and (row.rating, row.review) == (data['rating'], review):
+            return row, UNCHANGED
+        row.rating = data['rating']
+        row.review = review
+        row.updated_at = timezone.now()
+        return row, CREATED if existing is None else UPDATED
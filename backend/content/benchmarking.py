@@ -0,0 +1,323 @@
+"""Helpers shared by the benchmark management commands.
+
+Benchmarks run against a throwaway test database so they never touch the
+development data, seed it in bulk and time requests through the Django
+test client, or against a temporary SQLite file served by a real server
+process.
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import search, stats
+from .models import Genre, Movie, TVShow, UserRating, UserWatchlist
+
+User = get_user_model()
+
+GENRE_NAMES = [
+    'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary',
+    'Drama', 'Family', 'Fantasy', 'Horror', 'Romance', 'Sci-Fi', 'Thriller',
+]
+
+
+@contextmanager
+def isolated_database():
+    """Run the block against a freshly migrated test database"""
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_catalog(movies, tv_shows, featured_ratio=0.05, seed=0, batch_size=1000):
+    """Bulk insert a synthetic catalog of movies and TV shows with genres"""
+    rng = random.Random(seed)
+    genres = [
+        Genre.objects.get_or_create(name=name)[0] for name in GENRE_NAMES
+    ]
+    today = timezone.now().date()
+
+    def common(i):
+        return {
+            'description': f'Synthetic description {i} ' + ' '.join(
+                rng.choice(GENRE_NAMES).lower() for _ in range(12)
+            ),
+            'rating': rng.choice(['G', 'PG', 'PG-13', 'R']),
+            'poster_url': f'https://example.com/posters/{i}.jpg',
+            'backdrop_url': f'https://example.com/backdrops/{i}.jpg',
+            'cast': [f'Actor {rng.randrange(5000)}' for _ in range(4)],
+            'is_featured': rng.random() < featured_ratio,
+            'is_trending': rng.random() < featured_ratio,
+        }
+
+    for model, count, build in [
+        (Movie, movies, lambda i: Movie(
+            title=f'Movie {i}',
+            release_date=today - timedelta(days=rng.randrange(3650)),
+            duration=rng.randrange(80, 180),
+            director=f'Director {rng.randrange(500)}',
+            **common(i)
+        )),
+        (TVShow, tv_shows, lambda i: TVShow(
+            title=f'Show {i}',
+            first_air_date=today - timedelta(days=rng.randrange(3650)),
+            number_of_seasons=rng.randrange(1, 10),
+            creator=f'Creator {rng.randrange(500)}',
+            **common(i)
+        )),
+    ]:
+        through = model.genres.through
+        fk = f'{model._meta.model_name}_id'
+        for start in range(0, count, batch_size):
+            rows = model.objects.bulk_create(
+                [build(i) for i in range(start, min(start + batch_size, count))]
+            )
+            through.objects.bulk_create([
+                through(**{fk: row.pk, 'genre_id': genre.pk})
+                for row in rows
+                for genre in rng.sample(genres, rng.randint(1, 3))
+            ])
+        # bulk_create skips the signals that keep the search index and the
+        # genre masks current
+        search.rebuild_index(model)
+        stats.reconcile(model)
+
+
+def seed_users(count, watchlist_size=50, ratings=20, seed=0, prefix='user'):
+    """Bulk insert users with watchlist entries and ratings, returning them"""
+    rng = random.Random(seed)
+    password = make_password('benchmark-password')
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=password)
+        for i in range(count)
+    ])
+    movie_ids = list(Movie.objects.values_list('id', flat=True))
+    show_ids = list(TVShow.objects.values_list('id', flat=True))
+    entries = []
+    scores = []
+    for user in users:
+        movies = rng.sample(movie_ids, min(len(movie_ids), watchlist_size))
+        shows = rng.sample(show_ids, min(len(show_ids), watchlist_size // 2))
+        entries += [
+            UserWatchlist(user=user, movie_id=pk, is_watched=rng.random() < 0.5)
+            for pk in movies
+        ]
+        entries += [UserWatchlist(user=user, tv_show_id=pk) for pk in shows]
+        scores += [
+            UserRating(user=user, movie_id=pk, rating=rng.randint(1, 5))
+            for pk in movies[:ratings]
+        ]
+    UserWatchlist.objects.bulk_create(entries, batch_size=5000)
+    UserRating.objects.bulk_create(scores, batch_size=5000)
+    for model in (Movie, TVShow):
+        stats.reconcile(model)
+    return users
+
+
+def auth_header(user):
+    """Return test client kwargs authenticating as ``user`` with a JWT"""
+    token = RefreshToken.for_user(user).access_token
+    return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Return latency statistics in milliseconds for a list of seconds"""
+    return {
+        'requests': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': percentile(samples, 0.50) * 1000,
+        'p95_ms': percentile(samples, 0.95) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'rps': len(samples) / sum(samples) if sum(samples) else 0.0,
+    }
+
+
+def time_requests(requests, iterations, client=None, warmup=1):
+    """Time ``iterations`` rounds of ``requests`` through the test client.
+
+    ``requests`` is a list of ``(method, path, kwargs)``; one round issues
+    all of them, as a page load would. Returns the latency summary of a
+    round plus the number of queries one round ran.
+    """
+    client = client or Client()
+
+    def run_round():
+        for method, path, kwargs in requests:
+            response = getattr(client, method)(path, **kwargs)
+            if response.status_code >= 400:
+                raise RuntimeError(f'{method.upper()} {path} returned {response.status_code}')
+
+    for _ in range(warmup):
+        run_round()
+    # The client resets connection.queries on every request, so count with
+    # an execute wrapper instead of CaptureQueriesContext
+    queries = []
+
+    def count_query(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_query):
+        run_round()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        run_round()
+        samples.append(time.perf_counter() - started)
+    return {**summarize(samples), 'queries': len(queries)}
+
+
+def format_row(name, stats):
+    row = (
+        f"{name:<28} p50 {stats['p50_ms']:8.2f}ms  p95 {stats['p95_ms']:8.2f}ms  "
+        f"p99 {stats['p99_ms']:8.2f}ms  {stats['rps']:8.1f}/s"
+    )
+    if 'queries' in stats:
+        row += f"  {stats['queries']:4d} queries"
+    return row
+
+
+# name: (command line, environment) of each server, formatted with the
+# port, worker and thread counts
+SERVERS = {
+    'uvicorn': (
+        ['-m', 'uvicorn', 'backend.asgi:application', '--port', '{port}',
+         '--workers', '{workers}', '--log-level', 'warning', '--no-access-log'],
+        {'CONTENT_ASYNC_VIEWS': 'True'},
+    ),
+    'uvicorn-sync': (
+        ['-m', 'uvicorn', 'backend.asgi:application', '--port', '{port}',
+         '--workers', '{workers}', '--log-level', 'warning', '--no-access-log'],
+        {'CONTENT_ASYNC_VIEWS': 'False'},
+    ),
+    'gunicorn': (
+        ['-m', 'gunicorn', 'backend.wsgi:application', '--bind', '127.0.0.1:{port}',
+         '--workers', '{workers}', '--threads', '{threads}', '--worker-class', 'gthread',
+         '--log-level', 'warning'],
+        {'CONTENT_ASYNC_VIEWS': 'False'},
+    ),
+}
+
+
+@contextmanager
+def temporary_database(path):
+    """Point the default SQLite connection at ``path`` for the block"""
+    settings_dict = connection.settings_dict
+    old_name = settings_dict['NAME']
+    connection.close()
+    settings_dict['NAME'] = path
+    try:
+        yield
+    finally:
+        connection.close()
+        settings_dict['NAME'] = old_name
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def run_server(name, database, port, workers, threads, environment=None):
+    """Serve ``database`` with one of ``SERVERS`` on ``port`` for the block"""
+    arguments, server_environment = SERVERS[name]
+    arguments = [
+        argument.format(port=port, workers=workers, threads=threads) for argument in arguments
+    ]
+    env = {**os.environ, **server_environment, **(environment or {}), 'SQLITE_PATH': database}
+    env.pop('DATABASE_URL', None)
+    process = subprocess.Popen(
+        [sys.executable, *arguments], cwd=settings.BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if process.poll() is not None:
+                raise CommandError(f'{name} exited: {process.stderr.read().decode()[-2000:]}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise CommandError(f'{name} did not start listening on port {port}')
+                time.sleep(0.2)
+        yield
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def send(port, method, path, body=None, headers=None):
+    """Issue one HTTP/1.1 request, returning its status code and body"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        body = json.dumps(body).encode() if body is not None else b''
+        head = (
+            f'{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n'
+        ) + ''.join(f'{name}: {value}\r\n' for name, value in (headers or {}).items())
+        writer.write(head.encode() + b'\r\n' + body)
+        await writer.drain()
+        response = await reader.read()
+        return int(response.split(b' ', 2)[1]), response.partition(b'\r\n\r\n')[2]
+    finally:
+        writer.close()
+
+
+async def load(port, requests, concurrency, total):
+    """Send ``total`` of ``requests`` (``(method, path, body, headers)``,
+    cycled) from ``concurrency`` clients, returning ``(elapsed seconds,
+    latencies, errors)``"""
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def client():
+        nonlocal errors
+        for index in remaining:
+            started = time.perf_counter()
+            try:
+                status, _ = await send(port, *requests[index % len(requests)])
+            except (OSError, ValueError, IndexError):
+                status = 0
+            latencies.append(time.perf_counter() - started)
+            if not 200 <= status < 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return time.perf_counter() - started, latencies, errors
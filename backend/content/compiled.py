@@ -0,0 +1,216 @@
+"""Compiled serializers that build content payloads straight from columns.
+
+A ``RowSerializer`` is compiled once per ``ModelSerializer`` class: each
+readable field becomes a column of a ``values_list`` query plus a plain
+function turning the column value into what the field would output (or
+nothing at all when the database value already is that output). Nested
+many-to-many serializers become one extra ``values_list`` query keyed by
+the parent id and ordered like the serializer's ``Prefetch`` of the field,
+so a page of titles costs the same two queries as the prefetching path
+without building a model instance or walking DRF's field machinery per
+row. The resulting dicts equal the ones the serializer
+produces, key order included, so a response renders to the same bytes
+either way.
+
+``CONTENT_FAST_SERIALIZATION`` switches the hot read endpoints between the
+two paths. It is off by default; the DRF serializers stay the reference.
+"""
+from collections import defaultdict
+from datetime import date
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Prefetch
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from backend.instrumentation import span
+
+from .serializers import UserStateMixin, get_user_state
+
+# Fields whose output is the database value itself
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.FloatField,
+    serializers.BooleanField, serializers.ReadOnlyField,
+)
+
+_compiled = {}
+
+
+def is_enabled():
+    return getattr(settings, 'CONTENT_FAST_SERIALIZATION', False)
+
+
+def get_mapper(field):
+    """Return a function turning a column value into the field's output, or
+    ``None`` when the value is output as is. ``None`` values never reach it."""
+    if isinstance(field, serializers.DateTimeField):
+        if getattr(field, 'format', api_settings.DATETIME_FORMAT) != ISO_8601:
+            return field.to_representation
+
+        def to_iso(value, enforce_timezone=field.enforce_timezone):
+            value = enforce_timezone(value).isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return to_iso
+    if isinstance(field, serializers.DateField):
+        if getattr(field, 'format', api_settings.DATE_FORMAT) != ISO_8601:
+            return field.to_representation
+        return date.isoformat
+    if isinstance(field, serializers.ChoiceField):
+        # Choices are output by their key, which is the stored string
+        if all(isinstance(key, str) for key in field.choices):
+            return None
+        return field.to_representation
+    if isinstance(field, serializers.JSONField):
+        return field.to_representation if field.binary else None
+    if isinstance(field, PASSTHROUGH_FIELDS):
+        return None
+    return field.to_representation
+
+
+def get_prefetch_ordering(serializer_class, name):
+    """Return the explicit ``order_by`` of the serializer's ``Prefetch`` of ``name``"""
+    for lookup in getattr(serializer_class, 'prefetch_related_fields', []):
+        if isinstance(lookup, Prefetch) and lookup.prefetch_to == name \
+                and lookup.queryset is not None:
+            return lookup.queryset.query.order_by
+    return ()
+
+
+class RowSerializer:
+    """Serializes ``values_list`` rows the way ``serializer_class`` serializes
+    instances. Build one with ``get_row_serializer``."""
+
+    def __init__(self, serializer_class):
+        self.model = serializer_class.Meta.model
+        self.columns = ['id']
+        # (name, column index, mapper) or (name, relation, RowSerializer)
+        self.fields = []
+        # (name, relation, RowSerializer, ordering)
+        self.nested = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                relation = self.model._meta.get_field(field.source)
+                if not relation.many_to_many or relation.auto_created:
+                    raise ImproperlyConfigured(
+                        f'{serializer_class.__name__}.{name} is not a forward many-to-many field'
+                    )
+                ordering = get_prefetch_ordering(serializer_class, field.source)
+                if not ordering:
+                    raise ImproperlyConfigured(
+                        f'{serializer_class.__name__}.{name} needs a Prefetch with an explicit '
+                        'order_by so both paths list children in the same order'
+                    )
+                nested = RowSerializer(type(field.child))
+                self.nested.append((name, relation, nested, ordering))
+                self.fields.append((name, relation, nested))
+                continue
+            if isinstance(field, serializers.BaseSerializer) or field.source == '*' \
+                    or '.' in field.source:
+                raise ImproperlyConfigured(
+                    f'{serializer_class.__name__}.{name} cannot be read from a column'
+                )
+            if field.source not in self.columns:
+                self.columns.append(field.source)
+            self.fields.append((name, self.columns.index(field.source), get_mapper(field)))
+        self.user_state = issubclass(serializer_class, UserStateMixin)
+
+    def get_rows(self, queryset):
+        """Return ``queryset`` as the column tuples ``serialize`` reads"""
+        return queryset.prefetch_related(None).values_list(*self.columns)
+
+    def get_related_querysets(self, ids):
+        """Yield ``(field, nested serializer, queryset)`` for the nested fields"""
+        for name, relation, nested, ordering in self.nested:
+            lookup = relation.related_query_name()
+            yield name, nested, relation.related_model.objects.filter(
+                **{f'{lookup}__in': ids}
+            ).order_by(*ordering).values_list(lookup, *nested.columns)
+
+    def group_related(self, nested, rows):
+        children = defaultdict(list)
+        for parent_id, *row in rows:
+            children[parent_id].append(nested.to_representation(row))
+        return children
+
+    def get_related(self, ids):
+        """Return ``{field: {parent id: [child, ...]}}`` for the nested fields"""
+        return {
+            name: self.group_related(nested, queryset)
+            for name, nested, queryset in self.get_related_querysets(ids)
+        }
+
+    async def aget_related(self, ids):
+        related = {}
+        for name, nested, queryset in self.get_related_querysets(ids):
+            related[name] = self.group_related(nested, [row async for row in queryset])
+        return related
+
+    def to_representation(self, row, related=None):
+        data = {}
+        for name, index, mapper in self.fields:
+            if related is not None and name in related:
+                data[name] = related[name].get(row[0], [])
+                continue
+            value = row[index]
+            if value is not None and mapper is not None:
+                value = mapper(value)
+            data[name] = value
+        return data
+
+    def build(self, rows, related, context=None):
+        library = (context or {}).get('library') if self.user_state else None
+        results = []
+        for row in rows:
+            data = self.to_representation(row, related)
+            if library is not None:
+                data.update(get_user_state(library, self.model, row[0]))
+            results.append(data)
+        return results
+
+    def serialize(self, rows, context=None):
+        """Return the serialized dicts of column tuples, in order"""
+        with span('serializer'):
+            rows = list(rows)
+            if not rows:
+                return []
+            return self.build(rows, self.get_related([row[0] for row in rows]), context)
+
+    async def aserialize(self, rows, context=None):
+        """``serialize`` for async views, reading querysets with the async ORM"""
+        rows = [row async for row in rows] if hasattr(rows, '__aiter__') else list(rows)
+        if not rows:
+            return []
+        related = await self.aget_related([row[0] for row in rows])
+        # Only the synchronous part, as other awaits of the request overlap
+        with span('serializer'):
+            return self.build(rows, related, context)
+
+
+def get_row_serializer(serializer_class):
+    """Return the compiled ``RowSerializer`` of a serializer class"""
+    compiled = _compiled.get(serializer_class)
+    if compiled is None:
+        compiled = _compiled[serializer_class] = RowSerializer(serializer_class)
+    return compiled
+
+
+def prepare(serializer_class, queryset):
+    """Shape ``queryset`` for the active serialization path.
+
+    Returns the queryset and a ``serialize(rows, context=None)`` function
+    for what it yields: column tuples when ``CONTENT_FAST_SERIALIZATION`` is
+    on, instances eager loaded for ``serializer_class`` otherwise.
+    """
+    if is_enabled():
+        row_serializer = get_row_serializer(serializer_class)
+        return row_serializer.get_rows(queryset), row_serializer.serialize
+
+    def serialize(titles, context=None):
+        with span('serializer'):
+            return serializer_class(titles, many=True, context=context or {}).data
+    return serializer_class.setup_eager_loading(queryset), serialize
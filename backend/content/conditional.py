@@ -0,0 +1,122 @@
+"""Conditional GET for the public catalog endpoints.
+
+A view first reads the version columns of the rows it is about to return
+(``id``, ``updated_at`` and the denormalized columns that change without
+touching ``updated_at``) and hashes them, together with the genre table's
+last edit and row count, into an ETag. A request whose ``If-None-Match``
+still matches gets a 304 before any full row is loaded or serialized; any
+other request is answered by ``build`` and carries the ETag for next time.
+No ``Last-Modified`` is sent: a title leaving a list, a deleted title or a
+library change alters the response without a newer ``updated_at``, so a
+date would answer ``If-Modified-Since`` with stale 304s.
+
+Responses to signed-in users embed their watchlist and rating state, so
+their ETag also covers the user's library version and they are marked
+``private``. ``CONTENT_CACHE_LIFETIMES`` sets each endpoint's ``max-age``.
+The ``a``-prefixed functions are the same steps for async views.
+"""
+import hashlib
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+from . import library
+from .models import Genre
+
+VERSION_FIELDS = [
+    'id', 'updated_at', 'genre_mask', 'average_rating', 'rating_count', 'watchlist_count',
+]
+
+
+def get_lifetime(name):
+    return getattr(settings, 'CONTENT_CACHE_LIFETIMES', {}).get(name, 0)
+
+
+def get_versions(queryset, limit=None):
+    """Return the version rows of ``queryset``, in order"""
+    rows = queryset.values_list(*VERSION_FIELDS)
+    return list(rows if limit is None else rows[:limit])
+
+
+async def aget_versions(queryset, limit=None):
+    rows = queryset.values_list(*VERSION_FIELDS)
+    return [row async for row in (rows if limit is None else rows[:limit])]
+
+
+def get_ids(versions):
+    return [row[0] for row in versions]
+
+
+def get_genre_state():
+    return Genre.objects.aggregate(last=Max('updated_at'), count=Count('id'))
+
+
+async def aget_genre_state():
+    return await Genre.objects.aaggregate(last=Max('updated_at'), count=Count('id'))
+
+
+def make_etag(genres, versions, library_version=None):
+    """Return the ETag of the genre state and version rows.
+
+    ``library_version`` is ``(user id, library version)`` for signed-in users.
+    """
+    digest = hashlib.md5(repr((genres['last'], genres['count'])).encode())
+    for rows in versions:
+        digest.update(repr(rows).encode())
+    if library_version is not None:
+        user_id, version = library_version
+        digest.update(f'{user_id}:{version}'.encode())
+    return quote_etag(digest.hexdigest())
+
+
+def get_etag(request, versions):
+    """Return the ETag of lists of version rows"""
+    library_version = None
+    if request.user.is_authenticated:
+        library_version = (request.user.id, library.get_version(request.user.id))
+    return make_etag(get_genre_state(), versions, library_version)
+
+
+async def aget_etag(request, versions):
+    library_version = None
+    if request.user.is_authenticated:
+        library_version = (
+            request.user.id, await sync_to_async(library.get_version)(request.user.id)
+        )
+    return make_etag(await aget_genre_state(), versions, library_version)
+
+
+def add_validators(request, response, name, etag):
+    """Set the ETag and caching headers of a 200 or 304 response"""
+    if response.status_code not in (200, 304):
+        return response
+    response['ETag'] = etag
+    visibility = 'private' if request.user.is_authenticated else 'public'
+    patch_cache_control(response, **{visibility: True, 'max-age': get_lifetime(name)})
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def respond(request, name, versions, build):
+    """Answer 304 when ``versions`` still match the request, else ``build()``.
+
+    ``versions`` is a list of version row lists, one per list in the payload.
+    """
+    etag = get_etag(request, versions)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build()
+    return add_validators(request, response, name, etag)
+
+
+async def arespond(request, name, versions, build):
+    """``respond`` for async views, where ``build`` is a coroutine function"""
+    etag = await aget_etag(request, versions)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = await build()
+    return add_validators(request, response, name, etag)
@@ -0,0 +1,28 @@
+import django_filters
+
+from . import stats
+from .models import Genre, Movie, TVShow
+
+
+class ContentFilter(django_filters.FilterSet):
+    """Filters titles by genre through the denormalized genre mask"""
+    genres = django_filters.ModelMultipleChoiceFilter(
+        queryset=Genre.objects.all(), method='filter_genres'
+    )
+    
+    def filter_genres(self, queryset, name, value):
+        if not value:
+            return queryset
+        return stats.filter_by_genres(queryset, [genre.pk for genre in value])
+
+
+class MovieFilter(ContentFilter):
+    class Meta:
+        model = Movie
+        fields = ['genres', 'rating', 'is_featured', 'is_trending']
+
+
+class TVShowFilter(ContentFilter):
+    class Meta:
+        model = TVShow
+        fields = ['genres', 'rating', 'is_featured', 'is_trending', 'status']
@@ -0,0 +1,85 @@
+"""Precomputed rows for the home page.
+
+The featured, trending and new release rows are built once, rendered to
+JSON and stored in the cache named by ``HOME_ROWS_CACHE`` together with an
+ETag. Content signals rebuild the entry after the saving transaction
+commits, so requests normally only read one cache key.
+"""
+import hashlib
+import itertools
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from . import compiled, trending
+from .models import Movie, TVShow
+from .renderers import FastJSONRenderer
+from .serializers import MovieSerializer, TVShowSerializer
+
+HOME_ROWS_CACHE_KEY = 'content:home-rows'
+
+_sequence = itertools.count()
+_rebuilds = threading.local()
+
+
+def get_cache():
+    return caches[getattr(settings, 'HOME_ROWS_CACHE', 'default')]
+
+
+def build_home_rows():
+    """Return the home page payload as a dict of serialized rows"""
+    movies, serialize_movies = compiled.prepare(MovieSerializer, Movie.objects.all())
+    tv_shows, serialize_tv_shows = compiled.prepare(TVShowSerializer, TVShow.objects.all())
+    thirty_days_ago = timezone.now().date() - timezone.timedelta(days=30)
+
+    return {
+        'featured_movies': serialize_movies(movies.filter(is_featured=True)[:5]),
+        'featured_tv_shows': serialize_tv_shows(tv_shows.filter(is_featured=True)[:5]),
+        'trending_movies': serialize_movies(trending.get_trending(movies, 10)),
+        'trending_tv_shows': serialize_tv_shows(trending.get_trending(tv_shows, 10)),
+        'new_movies': serialize_movies(movies.filter(release_date__gte=thirty_days_ago)[:10]),
+        'new_tv_shows': serialize_tv_shows(
+            tv_shows.filter(first_air_date__gte=thirty_days_ago)[:10]
+        ),
+    }
+
+
+def rebuild_home_rows():
+    """Build, render and cache the home page payload, returning the entry"""
+    _rebuilds.last = next(_sequence)
+    body = FastJSONRenderer().render(build_home_rows())
+    entry = {
+        'body': body,
+        'etag': '"%s"' % hashlib.md5(body).hexdigest(),
+    }
+    get_cache().set(
+        HOME_ROWS_CACHE_KEY, entry, getattr(settings, 'HOME_ROWS_TIMEOUT', 3600)
+    )
+    return entry
+
+
+def get_home_rows():
+    """Return the cached ``{'body', 'etag'}`` entry, building it on a miss"""
+    entry = get_cache().get(HOME_ROWS_CACHE_KEY)
+    if entry is None:
+        entry = rebuild_home_rows()
+    return entry
+
+
+def schedule_rebuild():
+    """Rebuild the rows once the current transaction commits.
+
+    Several saves in one transaction (an admin form saving a movie and its
+    genres, say) queue several callbacks; once the first has rebuilt the
+    rows after the commit, the others are skipped.
+    """
+    scheduled = next(_sequence)
+
+    def rebuild():
+        if getattr(_rebuilds, 'last', -1) < scheduled:
+            rebuild_home_rows()
+
+    transaction.on_commit(rebuild)
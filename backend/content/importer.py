@@ -0,0 +1,258 @@
+"""Streaming bulk import of movies and TV shows keyed on ``tmdb_id``.
+
+Records are read one at a time from a JSON Lines or CSV file and written
+in fixed-size batches: one upsert per batch for the titles, one query to
+map their ``tmdb_id`` back to primary keys and one delete plus one insert
+to replace their genres. Each batch commits on its own, so a checkpoint
+of the number of records done lets an interrupted import resume, and
+memory use depends on the batch size, never on the file size.
+
+``bulk_create`` skips model signals, so the importer sets each title's
+genre mask and updates the search index itself, and the caller schedules
+a home rows rebuild.
+"""
+import csv
+import itertools
+import json
+import os
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+
+from . import search, stats
+from .models import Genre, Movie, TVShow
+
+MODELS = {
+    'movie': Movie,
+    'tv_show': TVShow,
+}
+SKIPPED_FIELDS = {
+    'id', 'created_at', 'updated_at',
+    'genre_mask', 'average_rating', 'rating_count', 'watchlist_count', 'trending_score',
+}
+LIST_SEPARATOR = '|'
+MAX_REPORTED_ERRORS = 100
+
+
+class InvalidRecord(ValueError):
+    """A record that cannot be imported"""
+
+
+def iter_records(handle, format):
+    """Yield one dict per record of a JSON Lines or CSV file handle.
+
+    Lines that are not a valid JSON object yield an ``InvalidRecord`` so
+    they are counted like any other record.
+    """
+    if format == 'csv':
+        yield from csv.DictReader(handle)
+        return
+    for line in handle:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            yield InvalidRecord(f'invalid JSON: {error}')
+            continue
+        if isinstance(record, dict):
+            yield record
+        else:
+            yield InvalidRecord(f'expected a JSON object, not {type(record).__name__}')
+
+
+def detect_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def get_import_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if field.name not in SKIPPED_FIELDS and not field.is_relation
+    ]
+
+
+def parse_list(value):
+    """Read a list from JSON, a ``|`` separated CSV cell or a list, raising
+    ValueError for anything else"""
+    if isinstance(value, list):
+        return value
+    if value is None:
+        return []
+    if not isinstance(value, str):
+        raise ValueError(f'expected a list, not {type(value).__name__}')
+    value = value.strip()
+    if value.startswith('['):
+        value = json.loads(value)
+        if not isinstance(value, list):
+            raise ValueError(f'expected a list, not {type(value).__name__}')
+        return value
+    return [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+
+
+def build_instance(model, record):
+    """Return ``(instance, genre names)`` for a record or raise InvalidRecord"""
+    values = {}
+    for field in get_import_fields(model):
+        value = record.get(field.name)
+        if value is None or value == '':
+            if field.has_default() or field.null:
+                continue
+            if field.blank and isinstance(field, (models.CharField, models.TextField)):
+                values[field.name] = ''
+                continue
+            raise InvalidRecord(f'missing {field.name}')
+        try:
+            if isinstance(field, models.JSONField):
+                value = parse_list(value)
+            values[field.name] = field.clean(value, None)
+        except (ValidationError, ValueError) as error:
+            raise InvalidRecord(f'invalid {field.name}: {error}')
+    if values.get('tmdb_id') is None:
+        raise InvalidRecord('missing tmdb_id')
+    return model(**values), get_genre_names(record.get('genres'))
+
+
+def get_genre_names(value):
+    """Return the genre names of a record or raise InvalidRecord"""
+    try:
+        names = parse_list(value)
+    except ValueError as error:
+        raise InvalidRecord(f'invalid genres: {error}')
+    max_length = Genre._meta.get_field('name').max_length
+    for name in names:
+        if not isinstance(name, str) or not name:
+            raise InvalidRecord(f'invalid genre {name!r}')
+        if len(name) > max_length:
+            raise InvalidRecord(f'genre {name[:20]!r}... is longer than {max_length} characters')
+    return names
+
+
+class CatalogImporter:
+    """Upsert batches of records for one content model"""
+
+    def __init__(self, model):
+        self.model = model
+        self.fields = [field.name for field in get_import_fields(model)]
+        self.genre_ids = dict(Genre.objects.values_list('name', 'id'))
+
+    def get_genre_ids(self, names):
+        missing = set(names) - set(self.genre_ids)
+        if missing:
+            Genre.objects.bulk_create(
+                [Genre(name=name) for name in missing], ignore_conflicts=True
+            )
+            self.genre_ids.update(
+                Genre.objects.filter(name__in=missing).values_list('name', 'id')
+            )
+        return self.genre_ids
+
+    def import_batch(self, rows):
+        """Upsert ``(instance, genre names)`` pairs in one transaction"""
+        # The last record wins when a batch repeats a tmdb_id
+        rows = list({instance.tmdb_id: (instance, genres) for instance, genres in rows}.values())
+        instances = [instance for instance, _ in rows]
+        through = self.model.genres.through
+        fk = f'{self.model._meta.model_name}_id'
+        with transaction.atomic():
+            genre_ids = self.get_genre_ids({name for _, genres in rows for name in genres})
+            for instance, genres in rows:
+                instance.genre_mask = 0
+                for name in genres:
+                    instance.genre_mask |= stats.genre_bit(genre_ids[name])
+            self.model.objects.bulk_create(
+                instances,
+                update_conflicts=True,
+                unique_fields=['tmdb_id'],
+                update_fields=[name for name in self.fields if name != 'tmdb_id'] + [
+                    'genre_mask', 'updated_at'
+                ],
+            )
+            ids = dict(
+                self.model.objects.filter(tmdb_id__in=[instance.tmdb_id for instance in instances])
+                .values_list('tmdb_id', 'id')
+            )
+            for instance in instances:
+                instance.pk = ids[instance.tmdb_id]
+
+            through.objects.filter(**{f'{fk}__in': list(ids.values())}).delete()
+            through.objects.bulk_create([
+                through(**{fk: instance.pk, 'genre_id': genre_ids[name]})
+                for instance, genres in rows
+                for name in set(genres)
+            ])
+            search.index_instances(self.model, instances)
+        return len(instances)
+
+
+def read_checkpoint(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(path, state):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as handle:
+        json.dump(state, handle)
+    os.replace(temporary, path)
+
+
+class ImportStats:
+    """Running totals of an import; only the first errors are kept"""
+
+    def __init__(self, records=0):
+        self.records = records
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((self.records, message))
+
+
+def import_catalog(handle, format, content_type=None, batch_size=1000, skip=0, on_batch=None):
+    """Import every record of ``handle`` and return its ``ImportStats``.
+
+    ``content_type`` forces the model; otherwise each record names it in a
+    ``content_type`` field (``movie`` or ``tv_show``). The first ``skip``
+    records are read but not imported. ``on_batch(stats)`` is called after
+    every committed batch, when every record counted so far is written.
+    """
+    importers = {}
+    pending = {}
+    stats = ImportStats(records=skip)
+    reported = [skip]
+
+    def flush():
+        if stats.records == reported[0]:
+            return
+        reported[0] = stats.records
+        for name, rows in pending.items():
+            if name not in importers:
+                importers[name] = CatalogImporter(MODELS[name])
+            stats.imported += importers[name].import_batch(rows)
+        pending.clear()
+        if on_batch:
+            on_batch(stats)
+
+    for record in itertools.islice(iter_records(handle, format), skip, None):
+        stats.records += 1
+        try:
+            if isinstance(record, InvalidRecord):
+                raise record
+            name = content_type or record.get('content_type') or record.get('type')
+            if name not in MODELS:
+                raise InvalidRecord(f'unknown content type {name!r}')
+            pending.setdefault(name, []).append(build_instance(MODELS[name], record))
+        except InvalidRecord as error:
+            stats.add_error(str(error))
+        if sum(len(rows) for rows in pending.values()) >= batch_size:
+            flush()
+    flush()
+    return stats
@@ -0,0 +1,128 @@
+"""Per-user cache of watchlist and rating state.
+
+A user's library maps title keys (``object_id * 2 + type code``, as in the
+search index) to ``(watchlist entry id, is_watched)`` and ``(rating id,
+rating)`` pairs. It lives in the cache named by ``USER_LIBRARY_CACHE`` so
+reads that only need ids and states, such as recommendation seeds and the
+per-title flags on content lists, skip the watchlist and rating tables.
+
+Entries are versioned: a write bumps the user's version, so the old entry
+is no longer read, and once its transaction commits bumps it again and
+stores a freshly loaded library under the new version's key. A slow
+writer that loaded older data can only overwrite an older version, which
+readers no longer look at.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from . import search
+from .models import UserRating, UserWatchlist
+
+# Bump when the shape of a cached library changes
+FORMAT = 1
+
+
+def get_cache():
+    return caches[getattr(settings, 'USER_LIBRARY_CACHE', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'USER_LIBRARY_TIMEOUT', 86400)
+
+
+def version_key(user_id):
+    return f'content:library:{FORMAT}:{user_id}:version'
+
+
+def entry_key(user_id, version):
+    return f'content:library:{FORMAT}:{user_id}:{version}'
+
+
+class Library:
+    """A user's watchlist and rating state keyed by title"""
+
+    def __init__(self, watchlist=None, ratings=None):
+        self.watchlist = watchlist or {}
+        self.ratings = ratings or {}
+
+    @classmethod
+    def load(cls, user_id):
+        """Read a user's library from the database"""
+        watchlist = {
+            search.get_row_key(movie_id, tv_show_id): (pk, is_watched)
+            for pk, movie_id, tv_show_id, is_watched in UserWatchlist.objects.filter(
+                user_id=user_id
+            ).values_list('pk', 'movie_id', 'tv_show_id', 'is_watched')
+        }
+        ratings = {
+            search.get_row_key(movie_id, tv_show_id): (pk, rating)
+            for pk, movie_id, tv_show_id, rating in UserRating.objects.filter(
+                user_id=user_id
+            ).values_list('pk', 'movie_id', 'tv_show_id', 'rating')
+        }
+        return cls(watchlist, ratings)
+
+    def get_watchlist_entry(self, key):
+        return self.watchlist.get(key)
+
+    def get_rating(self, key):
+        entry = self.ratings.get(key)
+        return entry[1] if entry else None
+
+    def get_ids(self, type_code):
+        """Return the ids of titles of ``type_code`` on the list or rated"""
+        return {
+            key // 2 for key in (*self.watchlist, *self.ratings) if key % 2 == type_code
+        }
+
+
+def get_version(user_id):
+    """Return a user's library version, which changes with every write"""
+    cache = get_cache()
+    version = cache.get(version_key(user_id))
+    if version is None:
+        cache.add(version_key(user_id), 1, None)
+        version = cache.get(version_key(user_id), 1)
+    return version
+
+
+def get_library(user_id):
+    """Return a user's ``Library``, loading and caching it on a miss"""
+    cache = get_cache()
+    version = get_version(user_id)
+    cached = cache.get(entry_key(user_id, version))
+    if cached is not None:
+        return Library(*cached)
+    library = Library.load(user_id)
+    cache.set(entry_key(user_id, version), (library.watchlist, library.ratings), get_timeout())
+    return library
+
+
+def bump_version(user_id):
+    cache = get_cache()
+    try:
+        return cache.incr(version_key(user_id))
+    except ValueError:
+        cache.add(version_key(user_id), 1, None)
+        return cache.incr(version_key(user_id))
+
+
+def refresh_library(user_id):
+    """Store a freshly loaded library under a new version"""
+    version = bump_version(user_id)
+    library = Library.load(user_id)
+    get_cache().set(
+        entry_key(user_id, version), (library.watchlist, library.ratings), get_timeout()
+    )
+    return library
+
+
+def library_changed(user_id):
+    """Record a write to a user's watchlist or ratings.
+
+    The cached library stops being served right away and a fresh one is
+    written through once the current transaction commits.
+    """
+    bump_version(user_id)
+    transaction.on_commit(lambda: refresh_library(user_id))
@@ -0,0 +1,178 @@
+import json
+import secrets
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from accounts.testing import GoogleKeyServer
+from content import api_benchmark, trending
+from content.benchmarking import (
+    SERVERS, format_row, free_port, isolated_database, run_server, seed_catalog, seed_users,
+    temporary_database,
+)
+from content.home import rebuild_home_rows
+
+# Titles, and ratings, seeded at each scale
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+RATINGS_PER_USER = 20
+UNTHROTTLED = '1000000/s'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every content and accounts endpoint through the test client and a '
+        'real server, comparing throughput, latency and queries with a stored baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=list(SCALES), default='10k',
+                            help='Titles and ratings to seed')
+        parser.add_argument('--titles', type=int, help='Titles to seed, half of them movies')
+        parser.add_argument('--ratings', type=int,
+                            help=f'Ratings to seed, {RATINGS_PER_USER} per user')
+        parser.add_argument('--mode', nargs='+', choices=['client', 'server'],
+                            default=['client', 'server'])
+        parser.add_argument('--server', choices=list(SERVERS), default='gunicorn')
+        parser.add_argument('--workers', type=int, default=1, help='Server processes')
+        parser.add_argument('--threads', type=int, default=4,
+                            help='Threads per gunicorn worker')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Server clients of read endpoints; writes run one at a time')
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Timed requests per endpoint')
+        parser.add_argument('--endpoints', nargs='+', metavar='LABEL',
+                            help='Only the endpoints whose label contains one of these')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'benchmarks' / 'baseline.json'),
+                            help='Baseline recorded on this machine; it is not committed')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Write the results to the baseline file')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='p95 growth over the baseline reported as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        missing = api_benchmark.check_coverage()
+        if missing:
+            raise CommandError(f"No benchmark requests for {', '.join(missing)}")
+        if 'server' in options['mode'] and connection.vendor != 'sqlite':
+            raise CommandError('The server benchmark seeds a temporary SQLite database')
+        self.titles = options['titles'] or SCALES[options['scale']]
+        self.ratings = options['ratings'] or SCALES[options['scale']]
+        self.endpoints = [
+            endpoint for endpoint in api_benchmark.ENDPOINTS
+            if not options['endpoints'] or any(
+                label in endpoint.label for label in options['endpoints']
+            )
+        ]
+        # One warm-up request per endpoint
+        self.total = options['requests'] + 1
+
+        results = {}
+        with GoogleKeyServer() as key_server, override_settings(
+            GOOGLE_OAUTH2_CLIENT_ID=api_benchmark.GOOGLE_CLIENT_ID,
+            GOOGLE_OAUTH2_CERTS_URL=key_server.certs_url,
+            LOGIN_THROTTLE_RATES={},
+        ):
+            if 'client' in options['mode']:
+                with isolated_database():
+                    requests = self.seed(key_server)
+                    results['client'] = api_benchmark.run_client(self.endpoints, requests)
+                self.report('client', results['client'])
+            if 'server' in options['mode']:
+                mode = f"server:{options['server']}"
+                results[mode] = self.run_server(key_server, options)
+                self.report(mode, results[mode])
+
+        self.check_baseline(results, options)
+
+    def seed(self, key_server):
+        """Seed the current database and return each endpoint's requests"""
+        movies = self.titles // 2
+        self.stdout.write(
+            f'Seeding {movies} movies, {self.titles - movies} TV shows and '
+            f'{self.ratings} ratings...'
+        )
+        seed_catalog(movies, self.titles - movies)
+        users = seed_users(
+            max(1, self.ratings // RATINGS_PER_USER), watchlist_size=RATINGS_PER_USER * 2,
+            ratings=RATINGS_PER_USER, prefix='user'
+        )
+        trending.rebuild_buckets()
+        trending.compute_scores()
+        rebuild_home_rows()
+        fixture = api_benchmark.Fixture(users[0], key_server, self.total)
+        return {
+            endpoint.label: [fixture.build(endpoint, index) for index in range(self.total)]
+            for endpoint in self.endpoints
+        }
+
+    def run_server(self, key_server, options):
+        with tempfile.TemporaryDirectory() as directory:
+            database = str(Path(directory) / 'benchmark.sqlite3')
+            with temporary_database(database):
+                call_command('migrate', verbosity=0)
+                requests = self.seed(key_server)
+            port = free_port()
+            metrics_token = secrets.token_urlsafe()
+            with run_server(options['server'], database, port, options['workers'],
+                            options['threads'], {
+                                'GOOGLE_OAUTH2_CLIENT_ID': api_benchmark.GOOGLE_CLIENT_ID,
+                                'GOOGLE_OAUTH2_CERTS_URL': key_server.certs_url,
+                                'LOGIN_RATE_PER_IP': UNTHROTTLED,
+                                'LOGIN_RATE_PER_USERNAME': UNTHROTTLED,
+                                'REGISTER_RATE_PER_IP': UNTHROTTLED,
+                                'PERFORMANCE_METRICS': 'True',
+                                'METRICS_TOKEN': metrics_token,
+                            }):
+                return api_benchmark.run_on_server(
+                    self.endpoints, requests, port, options['concurrency'], metrics_token
+                )
+
+    def report(self, mode, results):
+        self.stdout.write(self.style.MIGRATE_HEADING(mode))
+        for label, stats in results.items():
+            row = format_row(f'{label:<36}', {
+                name: value for name, value in stats.items() if name != 'queries'
+            })
+            if stats['queries'] is not None:
+                row += f"  {stats['queries']:6.1f} queries"
+            self.stdout.write(row)
+
+    def check_baseline(self, results, options):
+        path = Path(options['baseline'])
+        machine = api_benchmark.get_machine()
+        baseline = json.loads(path.read_text()) if path.exists() else None
+        if options['save_baseline']:
+            # Results from another machine are not comparable, so they go
+            if baseline is None or baseline.get('machine') != machine:
+                baseline = {}
+            baseline.update(results, machine=machine)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(f'Saved the baseline to {path}')
+            return
+        if baseline is None:
+            self.stdout.write(f'No baseline at {path}; rerun with --save-baseline to store one')
+            return
+        timings = baseline.get('machine') == machine
+        regressions = 0
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Compared with {path}'))
+        if not timings:
+            self.stdout.write(self.style.WARNING(
+                'The baseline was recorded on another machine; only query counts are compared'
+            ))
+        for mode, label, description, regressed in api_benchmark.compare(
+            results, baseline, options['tolerance'], timings
+        ):
+            row = f'{mode:<16} {label:<36} {description}'
+            if regressed:
+                regressions += 1
+                row = self.style.ERROR(row + '  REGRESSED')
+            self.stdout.write(row)
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'{regressions} endpoints regressed')
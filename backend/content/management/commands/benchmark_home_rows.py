@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from content.benchmarking import format_row, isolated_database, seed_catalog, time_requests
+from content.home import rebuild_home_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the precomputed home/ endpoint against the featured/, '
+        'trending/ and new-releases/ endpoints it replaces'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=5000,
+                            help='Number of movies and of TV shows to seed')
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.stdout.write(f"Seeding {options['titles']} movies and TV shows...")
+            seed_catalog(options['titles'], options['titles'])
+            etag = rebuild_home_rows()['etag']
+
+            scenarios = [
+                ('featured+trending+new', [
+                    ('get', reverse('content:featured-content'), {}),
+                    ('get', reverse('content:trending-content'), {}),
+                    ('get', reverse('content:new-releases'), {}),
+                ]),
+                ('home', [
+                    ('get', reverse('content:home-rows'), {}),
+                ]),
+                ('home (If-None-Match)', [
+                    ('get', reverse('content:home-rows'), {'HTTP_IF_NONE_MATCH': etag}),
+                ]),
+            ]
+            for name, requests in scenarios:
+                stats = time_requests(requests, options['iterations'])
+                self.stdout.write(format_row(name, stats))
@@ -0,0 +1,134 @@
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from content import search, similarity, taste
+from content.benchmarking import (
+    auth_header, format_row, isolated_database, seed_catalog, seed_users, summarize,
+)
+from content.models import Movie, TVShow, UserWatchlist
+from content.serializers import MovieSerializer, TVShowSerializer
+
+
+def legacy_recommendations(user, limit=10):
+    """The genre-name join the taste profiles replaced, kept for comparison"""
+    user_watchlist = UserWatchlist.objects.filter(user=user)
+    results = {}
+    for model, serializer_class, field in [
+        (Movie, MovieSerializer, 'movie'),
+        (TVShow, TVShowSerializer, 'tv_show'),
+    ]:
+        watched = user_watchlist.filter(**{f'{field}__isnull': False})
+        genre_names = watched.values_list(f'{field}__genres__name', flat=True)
+        queryset = model.objects.exclude(
+            id__in=watched.values_list(f'{field}_id', flat=True)
+        )
+        if genre_names:
+            queryset = queryset.filter(genres__name__in=genre_names).distinct()
+        queryset = serializer_class.setup_eager_loading(queryset)
+        results[field] = serializer_class(queryset[:limit], many=True).data
+    return results
+
+
+def profile_recommendations(user, limit=10):
+    """The taste profile path of the recommendations view, without HTTP"""
+    weights = taste.get_weights(user.id)
+    results = {}
+    for model, serializer_class, field in [
+        (Movie, MovieSerializer, 'movie'),
+        (TVShow, TVShowSerializer, 'tv_show'),
+    ]:
+        ids = taste.recommend(user.id, model, limit, weights)
+        queryset = serializer_class.setup_eager_loading(model.objects.all())
+        results[field] = serializer_class(
+            search.fetch_in_order(queryset, ids), many=True
+        ).data
+    return results
+
+
+def similarity_recommendations(user, limit=10):
+    """The item similarity path of the recommendations view, without HTTP"""
+    model_data = similarity.get_model()
+    affinities = similarity.get_user_affinities(user.id)
+    results = {}
+    for model, serializer_class, field in [
+        (Movie, MovieSerializer, 'movie'),
+        (TVShow, TVShowSerializer, 'tv_show'),
+    ]:
+        ids = similarity.recommend(model_data, affinities, search.get_type_code(model), limit)
+        queryset = serializer_class.setup_eager_loading(model.objects.all())
+        results[field] = serializer_class(
+            search.fetch_in_order(queryset, ids), many=True
+        ).data
+    return results
+
+
+def time_calls(function, users, iterations):
+    samples = []
+    for user in users:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            function(user)
+            samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+class Command(BaseCommand):
+    help = 'Measure recommendation latency of the legacy genre join, taste profiles and item similarity'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=5000,
+                            help='Number of movies and of TV shows to seed')
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--watchlist-size', type=int, default=200)
+        parser.add_argument('--iterations', type=int, default=5,
+                            help='Requests per user')
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.stdout.write('Seeding catalog and users...')
+            seed_catalog(options['titles'], options['titles'])
+            users = seed_users(options['users'], watchlist_size=options['watchlist_size'])
+            for user in users:
+                taste.rebuild_profile(user.id)
+
+            # Both paths called directly, so the difference is the ranking alone
+            iterations = options['iterations']
+            self.stdout.write(format_row(
+                'legacy genre join', time_calls(legacy_recommendations, users, iterations)
+            ))
+            self.stdout.write(format_row(
+                'taste profile', time_calls(profile_recommendations, users, iterations)
+            ))
+
+            with tempfile.TemporaryDirectory() as directory:
+                with override_settings(RECOMMENDATION_MODEL_DIR=directory):
+                    started = time.perf_counter()
+                    _, count = similarity.build_model()
+                    self.stdout.write(
+                        f'Built similarity model for {count} titles '
+                        f'in {time.perf_counter() - started:.2f}s'
+                    )
+                    self.stdout.write(format_row(
+                        'item similarity',
+                        time_calls(similarity_recommendations, users, iterations)
+                    ))
+                    self.stdout.write(format_row(
+                        'recommendations endpoint', self.time_endpoint(users, iterations)
+                    ))
+
+    def time_endpoint(self, users, iterations):
+        client = Client()
+        url = reverse('content:content-recommendations')
+        samples = []
+        for user in users:
+            headers = auth_header(user)
+            for _ in range(iterations):
+                started = time.perf_counter()
+                response = client.post(url, {}, content_type='application/json', **headers)
+                samples.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.content
+        return summarize(samples)
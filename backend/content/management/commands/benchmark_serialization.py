@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from content import compiled, library
+from content.benchmarking import isolated_database, seed_catalog, seed_users
+from content.models import Movie, TVShow
+from content.renderers import FastJSONRenderer, orjson
+from content.serializers import MovieSerializer, TVShowSerializer
+
+
+def drf_rows(serializer_class, queryset, size, context):
+    titles = serializer_class.setup_eager_loading(queryset)[:size]
+    return serializer_class(titles, many=True, context=context).data
+
+
+def compiled_rows(serializer_class, queryset, size, context):
+    row_serializer = compiled.get_row_serializer(serializer_class)
+    return row_serializer.serialize(row_serializer.get_rows(queryset)[:size], context)
+
+
+PATHS = [
+    ('DRF serializer + json', drf_rows, JSONRenderer),
+    ('DRF serializer + orjson', drf_rows, FastJSONRenderer),
+    ('compiled rows + json', compiled_rows, JSONRenderer),
+    ('compiled rows + orjson', compiled_rows, FastJSONRenderer),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure rows/sec of serializing and rendering content pages through '
+        'the DRF serializers against the compiled column tuple path'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=2000,
+                            help='Number of movies and of TV shows to seed')
+        parser.add_argument('--sizes', type=int, nargs='+', default=[20, 50, 500],
+                            help='Page sizes to measure')
+        parser.add_argument('--iterations', type=int, default=50,
+                            help='Pages serialized per path and size')
+        parser.add_argument('--signed-in', action='store_true',
+                            help="Include a user's watchlist and rating state in every row")
+
+    def handle(self, *args, **options):
+        if max(options['sizes']) > options['titles']:
+            raise CommandError('--titles must be at least the largest page size')
+        if orjson is None:
+            self.stdout.write('orjson is not installed; the orjson paths render with json')
+        with isolated_database():
+            self.stdout.write(f"Seeding {options['titles']} movies and TV shows...")
+            seed_catalog(options['titles'], options['titles'])
+            context = {}
+            if options['signed_in']:
+                user, = seed_users(1, watchlist_size=options['titles'] // 2)
+                context['library'] = library.get_library(user.id)
+
+            for model, serializer_class in [(Movie, MovieSerializer), (TVShow, TVShowSerializer)]:
+                queryset = model.objects.order_by('-id')
+                for size in options['sizes']:
+                    self.stdout.write(f'{model.__name__}, {size} rows per page')
+                    bodies = set()
+                    for name, serialize, renderer_class in PATHS:
+                        renderer = renderer_class()
+                        bodies.add(renderer.render(serialize(serializer_class, queryset, size, context)))
+                        started = time.perf_counter()
+                        for _ in range(options['iterations']):
+                            renderer.render(serialize(serializer_class, queryset, size, context))
+                        elapsed = time.perf_counter() - started
+                        self.stdout.write(
+                            f"  {name:<26} {elapsed / options['iterations'] * 1000:8.2f}ms/page"
+                            f"  {size * options['iterations'] / elapsed:10.0f} rows/s"
+                        )
+                    if len(bodies) != 1:
+                        raise CommandError(f'{model.__name__} pages of {size} rendered differently')
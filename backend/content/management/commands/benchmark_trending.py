@@ -0,0 +1,111 @@
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from django.utils import timezone
+
+from content import search, trending
+from content.benchmarking import (
+    format_row, isolated_database, seed_catalog, seed_users, summarize, time_requests,
+)
+from content.models import TrendingBucket, UserRating, UserWatchlist
+
+
+def spread_activity(seed=0):
+    """Move seeded watchlist and rating timestamps across the trending window"""
+    rng = random.Random(seed)
+    now = timezone.now()
+    hours = trending.get_window()
+
+    def moment():
+        return now - timedelta(hours=rng.randrange(hours), minutes=rng.randrange(60))
+
+    entries = list(UserWatchlist.objects.only('id', 'is_watched'))
+    for entry in entries:
+        entry.added_at = moment()
+        entry.watched_at = moment() if entry.is_watched else None
+    UserWatchlist.objects.bulk_update(entries, ['added_at', 'watched_at'], batch_size=2000)
+    ratings = list(UserRating.objects.only('id'))
+    for rating in ratings:
+        rating.created_at = moment()
+    UserRating.objects.bulk_update(ratings, ['created_at'], batch_size=2000)
+
+
+def raw_scores(now=None):
+    """Decay every watchlist and rating row of the window, without buckets"""
+    now = now or timezone.now()
+    start = trending.hour_start(trending.get_hour(now) - trending.get_window())
+    half_life = trending.get_half_life()
+    scores = defaultdict(float)
+    for model, field, weight in [
+        (UserWatchlist, 'added_at', trending.ADDED_WEIGHT),
+        (UserWatchlist, 'watched_at', trending.WATCHED_WEIGHT),
+        (UserRating, 'created_at', trending.RATED_WEIGHT),
+    ]:
+        for movie_id, tv_show_id, moment in model.objects.filter(
+            **{f'{field}__gte': start}
+        ).values_list('movie_id', 'tv_show_id', field).iterator(chunk_size=5000):
+            scores[search.get_row_key(movie_id, tv_show_id)] += (
+                weight * trending.decay((now - moment).total_seconds() / 3600, half_life)
+            )
+    return scores
+
+
+def time_function(function, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+class Command(BaseCommand):
+    help = 'Measure trending recomputation from hourly buckets against raw activity rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=5000,
+                            help='Number of movies and of TV shows to seed')
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--watchlist-size', type=int, default=100)
+        parser.add_argument('--iterations', type=int, default=5,
+                            help='Recomputations per path')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Trending endpoint requests per scenario')
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.stdout.write('Seeding catalog and activity...')
+            seed_catalog(options['titles'], options['titles'])
+            seed_users(options['users'], watchlist_size=options['watchlist_size'])
+            spread_activity()
+            events = (
+                UserWatchlist.objects.count()
+                + UserWatchlist.objects.filter(is_watched=True).count()
+                + UserRating.objects.count()
+            )
+
+            started = time.perf_counter()
+            trending.rebuild_buckets()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'Bucketed {events} events into {TrendingBucket.objects.count()} '
+                f'hourly buckets in {elapsed:.2f}s ({events / elapsed:.0f} events/s)'
+            )
+
+            iterations = options['iterations']
+            self.stdout.write(format_row(
+                'raw activity rows', time_function(raw_scores, iterations)
+            ))
+            self.stdout.write(format_row(
+                'hourly buckets', time_function(trending.compute_scores, iterations)
+            ))
+
+            url = reverse('content:trending-content')
+            for name, path in [('trending/', url), ('trending/?genre_name', url + '?genre_name=drama')]:
+                self.stdout.write(format_row(
+                    name, time_requests([('get', path, {})], options['requests'])
+                ))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from content import similarity
+
+
+class Command(BaseCommand):
+    help = 'Build the item-item similarity model served by the recommendations endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--neighbors', type=int, default=None,
+            help='Neighbors kept per title (defaults to RECOMMENDATION_NEIGHBORS)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of titles whose similarities are computed at once'
+        )
+        parser.add_argument(
+            '--directory', default=None,
+            help='Output directory (defaults to RECOMMENDATION_MODEL_DIR)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        path, count = similarity.build_model(
+            neighbors=options['neighbors'],
+            chunk_size=options['chunk_size'],
+            directory=options['directory'],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'Built neighbors for {count} titles in {elapsed:.1f}s: {path}')
+        )
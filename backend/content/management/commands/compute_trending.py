@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from content import trending
+from content.home import rebuild_home_rows
+
+
+class Command(BaseCommand):
+    help = 'Recompute trending scores from the hourly activity buckets'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Refill the buckets from the watchlist and rating tables first'
+        )
+        parser.add_argument(
+            '--interval', type=int, default=None,
+            help='Keep running, recomputing every this many seconds'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            started = time.perf_counter()
+            trending.rebuild_buckets()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'Rebuilt trending buckets in {elapsed:.2f}s')
+        while True:
+            started = time.perf_counter()
+            count = trending.compute_scores()
+            # The home rows embed the trending titles
+            rebuild_home_rows()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                self.style.SUCCESS(f'Scored {count} trending titles in {elapsed:.2f}s')
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,75 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from content import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a synthetic catalog, users, watchlists and ratings with power-law '
+        'popularity and per-user genre tastes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=list(synthetic.SCALES), default='small',
+                            help='Preset titles, users, ratings and watchlist size')
+        parser.add_argument('--titles', type=int, help='Movies and TV shows to create')
+        parser.add_argument('--users', type=int, help='Users to create')
+        parser.add_argument('--ratings', type=int, help='Ratings to create, about')
+        parser.add_argument('--watchlist', type=int,
+                            help='Mean watchlist entries per user')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--popularity', type=float, default=1.0,
+                            help='Zipf exponent of title popularity')
+        parser.add_argument('--affinity', type=float, default=0.7,
+                            help="Share of a user's titles drawn from their favourite genres")
+        parser.add_argument('--days', type=int, default=365,
+                            help='Days of activity to spread the rows over')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes building users')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Users built and written per transaction')
+
+    def handle(self, *args, **options):
+        titles, users, ratings, watchlist = synthetic.SCALES[options['scale']]
+        settings = synthetic.Options(
+            seed=options['seed'],
+            titles=options['titles'] or titles,
+            users=options['users'] or users,
+            ratings=options['ratings'] or ratings,
+            watchlist=options['watchlist'] or watchlist,
+            popularity=options['popularity'],
+            affinity=options['affinity'],
+            days=options['days'],
+            chunk_size=options['chunk_size'],
+        )
+        if settings.titles < 1 or settings.users < 1:
+            raise CommandError('--titles and --users must be positive')
+        self.stdout.write(
+            f'Generating {settings.titles} titles and {settings.users} users with about '
+            f'{settings.ratings} ratings and {settings.users * settings.watchlist} '
+            f"watchlist entries on {options['workers']} workers..."
+        )
+        started = time.perf_counter()
+
+        def on_chunk(totals):
+            rows = sum(totals.values())
+            elapsed = time.perf_counter() - started
+            titles = totals.get(synthetic.Movie, 0) + totals.get(synthetic.TVShow, 0)
+            self.stdout.write(
+                f"{titles} titles, {totals.get(synthetic.User, 0)} users, "
+                f"{totals.get(synthetic.UserRating, 0)} ratings, "
+                f"{totals.get(synthetic.UserWatchlist, 0)} watchlist entries, "
+                f'{rows / elapsed:.0f} rows/s'
+            )
+
+        totals = synthetic.generate(settings, options['workers'], on_chunk)
+        written = time.perf_counter() - started
+        self.stdout.write('Rebuilding title aggregates, the search index and trending...')
+        synthetic.finish()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {sum(totals.values())} rows in {written:.1f}s, '
+            f'finished in {time.perf_counter() - started:.1f}s'
+        ))
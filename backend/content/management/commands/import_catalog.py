@@ -0,0 +1,82 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from content import home, importer
+
+
+class Command(BaseCommand):
+    help = 'Upsert movies and TV shows keyed on tmdb_id from a JSON Lines or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSON Lines (.jsonl) or CSV (.csv) file')
+        parser.add_argument(
+            '--format', choices=['jsonl', 'csv'], default=None,
+            help='Input format (defaults to the file extension)'
+        )
+        parser.add_argument(
+            '--type', dest='content_type', choices=list(importer.MODELS), default=None,
+            help='Import every record as this type instead of reading content_type'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of records written per transaction'
+        )
+        parser.add_argument(
+            '--checkpoint', default=None,
+            help='Checkpoint file (defaults to <path>.checkpoint)'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore an existing checkpoint and import from the first record'
+        )
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        skip = 0
+        state = None if options['restart'] else importer.read_checkpoint(checkpoint)
+        if state:
+            if state.get('path') != path:
+                raise CommandError(
+                    f'{checkpoint} belongs to {state.get("path")}; pass --restart to ignore it'
+                )
+            skip = state['records']
+            self.stdout.write(f'Resuming after record {skip}')
+
+        started = time.perf_counter()
+
+        def on_batch(stats):
+            importer.write_checkpoint(checkpoint, {'path': path, 'records': stats.records})
+            elapsed = time.perf_counter() - started
+            rate = (stats.records - skip) / elapsed if elapsed else 0.0
+            self.stdout.write(
+                f'{stats.records} records, {stats.imported} imported, '
+                f'{stats.failed} failed, {rate:.0f} records/s'
+            )
+
+        with open(path, newline='', encoding='utf-8') as handle:
+            stats = importer.import_catalog(
+                handle,
+                options['format'] or importer.detect_format(path),
+                content_type=options['content_type'],
+                batch_size=options['batch_size'],
+                skip=skip,
+                on_batch=on_batch,
+            )
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        # bulk_create skips the signals that refresh the home rows
+        home.schedule_rebuild()
+        for record, message in stats.errors:
+            self.stderr.write(f'Record {record}: {message}')
+        if stats.failed > len(stats.errors):
+            self.stderr.write(f'... and {stats.failed - len(stats.errors)} more failed records')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {stats.imported} titles from {stats.records - skip} records '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
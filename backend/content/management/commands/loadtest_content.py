@@ -0,0 +1,74 @@
+import asyncio
+import random
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from content import trending
+from content.benchmarking import (
+    SERVERS, free_port, load, percentile, run_server, seed_catalog, seed_users,
+    temporary_database,
+)
+from content.models import Movie
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the read-only content endpoints under uvicorn (async views), '
+        'uvicorn with the sync views and gunicorn (WSGI) at rising concurrency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=2000,
+                            help='Number of movies and of TV shows to seed')
+        parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64])
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Requests per server and concurrency level')
+        parser.add_argument('--workers', type=int, default=1, help='Server processes')
+        parser.add_argument('--threads', type=int, default=4,
+                            help='Threads per gunicorn worker')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The load test seeds a temporary SQLite database')
+        with tempfile.TemporaryDirectory() as directory:
+            database = str(Path(directory) / 'loadtest.sqlite3')
+            with temporary_database(database):
+                self.stdout.write(f"Seeding {options['titles']} movies and TV shows...")
+                call_command('migrate', verbosity=0)
+                seed_catalog(options['titles'], options['titles'])
+                seed_users(50, watchlist_size=50)
+                trending.rebuild_buckets()
+                trending.compute_scores()
+                movie_ids = list(Movie.objects.values_list('id', flat=True))
+
+            rng = random.Random(0)
+            requests = [
+                ('GET', reverse('content:featured-content'), None, None),
+                ('GET', reverse('content:trending-content'), None, None),
+                ('GET', reverse('content:new-releases'), None, None),
+                ('POST', reverse('content:content-search'), {'query': 'drama'}, None),
+            ] + [
+                ('GET', reverse('content:movie-detail', args=[rng.choice(movie_ids)]), None, None)
+                for _ in range(4)
+            ]
+            for name in options['servers']:
+                port = free_port()
+                with run_server(name, database, port, options['workers'], options['threads']):
+                    asyncio.run(load(port, requests, 4, len(requests)))
+                    for concurrency in options['concurrency']:
+                        elapsed, latencies, errors = asyncio.run(
+                            load(port, requests, concurrency, options['requests'])
+                        )
+                        self.stdout.write(
+                            f'{name:<14} {concurrency:4d} clients  '
+                            f'{len(latencies) / elapsed:8.1f} req/s  '
+                            f'p50 {percentile(latencies, 0.50) * 1000:8.2f}ms  '
+                            f'p95 {percentile(latencies, 0.95) * 1000:8.2f}ms  '
+                            f'{errors} errors'
+                        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from content import search
+from content.models import Movie, TVShow
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for movies and TV shows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Number of rows indexed per batch'
+        )
+
+    def handle(self, *args, **options):
+        for model in [Movie, TVShow]:
+            with transaction.atomic():
+                count = search.rebuild_index(model, chunk_size=options['chunk_size'])
+            self.stdout.write(
+                self.style.SUCCESS(f'Indexed {count} {model._meta.verbose_name_plural}')
+            )
@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from content import taste
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild every user taste profile from their watchlist and ratings'
+
+    def handle(self, *args, **options):
+        count = 0
+        for user_id in User.objects.values_list('id', flat=True).iterator():
+            with transaction.atomic():
+                taste.rebuild_profile(user_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} taste profiles'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from content import stats
+from content.models import Movie, TVShow
+
+
+class Command(BaseCommand):
+    help = 'Recompute genre masks and rating and watchlist aggregates of every title'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of titles recomputed per batch'
+        )
+
+    def handle(self, *args, **options):
+        for model in [Movie, TVShow]:
+            count = stats.reconcile(model, chunk_size=options['chunk_size'])
+            self.stdout.write(
+                self.style.SUCCESS(f'Reconciled {count} {model._meta.verbose_name_plural}')
+            )
@@ -0,0 +1,69 @@
+from django.db import migrations
+
+# A frozen copy of the index content.search maintained when this migration
+# was written; later changes to that module must not alter it
+INDEX_TABLE = 'content_search'
+
+CREATE_INDEX = {
+    'sqlite': [
+        f"CREATE VIRTUAL TABLE {INDEX_TABLE} USING fts5("
+        "title, people, cast_members, description, "
+        "tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+    'postgresql': [
+        f'CREATE TABLE {INDEX_TABLE} (key bigint PRIMARY KEY, document tsvector NOT NULL)',
+        f'CREATE INDEX {INDEX_TABLE}_document_gin ON {INDEX_TABLE} USING GIN (document)',
+    ],
+}
+
+INSERT_ROW = {
+    'sqlite': (
+        f'INSERT INTO {INDEX_TABLE} (rowid, title, people, cast_members, description) '
+        'VALUES (%s, %s, %s, %s, %s)'
+    ),
+    'postgresql': (
+        f'INSERT INTO {INDEX_TABLE} (key, document) VALUES (%s, ' + ' || '.join(
+            f"setweight(to_tsvector('english', %s), '{weight}')" for weight in 'ABCD'
+        ) + ')'
+    ),
+}
+
+
+def get_rows(model, type_code, people):
+    for instance in model.objects.iterator():
+        cast = instance.cast if isinstance(instance.cast, list) else []
+        yield (
+            instance.pk * 2 + type_code,
+            instance.title,
+            getattr(instance, people),
+            ' '.join(str(member) for member in cast),
+            instance.description,
+        )
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in CREATE_INDEX:
+        return
+    for sql in CREATE_INDEX[vendor]:
+        schema_editor.execute(sql)
+    with schema_editor.connection.cursor() as cursor:
+        for model_name, type_code, people in [('Movie', 0, 'director'), ('TVShow', 1, 'creator')]:
+            model = apps.get_model('content', model_name)
+            cursor.executemany(INSERT_ROW[vendor], get_rows(model, type_code, people))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_INDEX:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {INDEX_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0002_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['release_date', 'id'], name='movies_release_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['title', 'id'], name='movies_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['duration', 'id'], name='movies_duration_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['rating', 'release_date'], name='movies_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['release_date'], name='movies_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_trending', True)), fields=['release_date'], name='movies_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshow',
+            index=models.Index(fields=['first_air_date', 'id'], name='tv_shows_air_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshow',
+            index=models.Index(fields=['title', 'id'], name='tv_shows_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshow',
+            index=models.Index(fields=['number_of_seasons', 'id'], name='tv_shows_seasons_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshow',
+            index=models.Index(fields=['rating', 'first_air_date'], name='tv_shows_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshow',
+            index=models.Index(fields=['status', 'first_air_date'], name='tv_shows_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshow',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['first_air_date'], name='tv_shows_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshow',
+            index=models.Index(condition=models.Q(('is_trending', True)), fields=['first_air_date'], name='tv_shows_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userrating',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='ratings_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userwatchlist',
+            index=models.Index(fields=['user', 'added_at', 'id'], name='watchlist_user_added_idx'),
+        ),
+    ]
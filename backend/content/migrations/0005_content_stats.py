@@ -0,0 +1,117 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:15
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Avg, Count
+
+# Genre ids past 63 have no bit in the signed 64 bit mask
+MAX_MASK_GENRE_ID = 63
+
+
+def backfill_content_stats(apps, schema_editor):
+    UserRating = apps.get_model('content', 'UserRating')
+    UserWatchlist = apps.get_model('content', 'UserWatchlist')
+    for model_name, field in [('Movie', 'movie'), ('TVShow', 'tv_show')]:
+        model = apps.get_model('content', model_name)
+        masks = defaultdict(int)
+        for object_id, genre_id in model.genres.through.objects.values_list(
+            f'{model._meta.model_name}_id', 'genre_id'
+        ):
+            if 1 <= genre_id <= MAX_MASK_GENRE_ID:
+                masks[object_id] |= 1 << (genre_id - 1)
+        ratings = {
+            row[field]: row for row in UserRating.objects.filter(**{f'{field}__isnull': False})
+            .values(field).annotate(average=Avg('rating'), count=Count('id'))
+        }
+        watchlist = dict(
+            UserWatchlist.objects.filter(**{f'{field}__isnull': False})
+            .values(field).annotate(count=Count('id')).values_list(field, 'count')
+        )
+        rows = []
+        for instance in model.objects.only('id').iterator():
+            rating = ratings.get(instance.pk, {})
+            instance.genre_mask = masks[instance.pk]
+            instance.average_rating = rating.get('average') or 0.0
+            instance.rating_count = rating.get('count', 0)
+            instance.watchlist_count = watchlist.get(instance.pk, 0)
+            rows.append(instance)
+        model.objects.bulk_update(
+            rows, ['genre_mask', 'average_rating', 'rating_count', 'watchlist_count'],
+            batch_size=500
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0004_user_taste_profiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='average_rating',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='genre_mask',
+            field=models.BigIntegerField(default=0, help_text='Bit per genre id'),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='watchlist_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tvshow',
+            name='average_rating',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tvshow',
+            name='genre_mask',
+            field=models.BigIntegerField(default=0, help_text='Bit per genre id'),
+        ),
+        migrations.AddField(
+            model_name='tvshow',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tvshow',
+            name='watchlist_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['genre_mask'], name='movies_genre_mask_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['average_rating', 'id'], name='movies_avg_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['watchlist_count', 'id'], name='movies_watchlist_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshow',
+            index=models.Index(fields=['genre_mask'], name='tv_shows_genre_mask_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshow',
+            index=models.Index(fields=['average_rating', 'id'], name='tv_shows_avg_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshow',
+            index=models.Index(fields=['watchlist_count', 'id'], name='tv_shows_watchlist_count_idx'),
+        ),
+        migrations.RunPython(backfill_content_stats, migrations.RunPython.noop),
+    ]
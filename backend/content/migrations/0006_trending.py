@@ -0,0 +1,51 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0005_content_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_key', models.BigIntegerField(help_text='object_id * 2 + type code, as in search')),
+                ('hour', models.IntegerField(help_text='Hours since the Unix epoch')),
+                ('score', models.FloatField(default=0)),
+            ],
+            options={
+                'db_table': 'trending_buckets',
+            },
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tvshow',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['trending_score', 'id'], name='movies_trending_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshow',
+            index=models.Index(fields=['trending_score', 'id'], name='tv_shows_trending_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trendingbucket',
+            index=models.Index(fields=['hour'], name='trending_buckets_hour_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trendingbucket',
+            constraint=models.UniqueConstraint(fields=('content_key', 'hour'), name='trending_bucket_unique'),
+        ),
+    ]
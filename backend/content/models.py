@@ -8,6 +8,7 @@ class Genre(models.Model):
     """Genre model for categorizing content"""
     name = models.CharField(max_length=50, unique=True)
     description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'genres'
@@ -16,7 +17,49 @@ class Genre(models.Model):
         return self.name
 
 
-class Movie(models.Model):
+class DenormalizedStatsMixin:
+    """Keeps saves of a loaded title from writing back stale stats columns.
+
+    The columns are maintained by content.stats, so a title loaded before a
+    rating or genre change holds an outdated copy. ``save()`` leaves out the
+    ones still equal to the loaded value; every other column, including a
+    stats column the caller changed, is written as usual.
+    """
+    denormalized_fields = [
+        'genre_mask', 'average_rating', 'rating_count', 'watchlist_count', 'trending_score'
+    ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_stats()
+        return instance
+    
+    def remember_stats(self):
+        self._loaded_stats = {
+            name: self.__dict__[name] for name in self.denormalized_fields if name in self.__dict__
+        }
+    
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.remember_stats()
+    
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_stats', {})
+        unchanged = {name for name, value in loaded.items() if self.__dict__.get(name) == value}
+        if unchanged and not self._state.adding and not args and not kwargs.get('force_insert') \
+                and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+                and field.name not in unchanged
+            ]
+        super().save(*args, **kwargs)
+        self.remember_stats()
+
+
+class Movie(DenormalizedStatsMixin, models.Model):
     """Movie model for Netflix movies"""
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -38,18 +81,47 @@ class Movie(models.Model):
     tmdb_id = models.IntegerField(unique=True, null=True, blank=True)
     is_featured = models.BooleanField(default=False)
     is_trending = models.BooleanField(default=False)
+    # Denormalized from genres, ratings and watchlists, see content.stats
+    genre_mask = models.BigIntegerField(default=0, help_text="Bit per genre id")
+    average_rating = models.FloatField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    watchlist_count = models.PositiveIntegerField(default=0)
+    # Time-decayed activity, recomputed from TrendingBucket by content.trending
+    trending_score = models.FloatField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'movies'
         ordering = ['-release_date']
+        indexes = [
+            # Listing order, year and new release ranges, keyset paging
+            models.Index(fields=['release_date', 'id'], name='movies_release_idx'),
+            models.Index(fields=['title', 'id'], name='movies_title_idx'),
+            models.Index(fields=['duration', 'id'], name='movies_duration_idx'),
+            models.Index(fields=['rating', 'release_date'], name='movies_rating_idx'),
+            # Genre filters without a join; counts read only this index
+            models.Index(fields=['genre_mask'], name='movies_genre_mask_idx'),
+            # Popularity sorts
+            models.Index(fields=['average_rating', 'id'], name='movies_avg_rating_idx'),
+            models.Index(fields=['watchlist_count', 'id'], name='movies_watchlist_count_idx'),
+            models.Index(fields=['trending_score', 'id'], name='movies_trending_score_idx'),
+            # Featured and trending rows only ever read the flagged titles
+            models.Index(
+                fields=['release_date'], condition=models.Q(is_featured=True),
+                name='movies_featured_idx'
+            ),
+            models.Index(
+                fields=['release_date'], condition=models.Q(is_trending=True),
+                name='movies_trending_idx'
+            ),
+        ]
     
     def __str__(self):
         return self.title
 
 
-class TVShow(models.Model):
+class TVShow(DenormalizedStatsMixin, models.Model):
     """TV Show model for Netflix series"""
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -78,12 +150,42 @@ class TVShow(models.Model):
         ('ended', 'Ended'),
         ('cancelled', 'Cancelled'),
     ], default='ongoing')
+    # Denormalized from genres, ratings and watchlists, see content.stats
+    genre_mask = models.BigIntegerField(default=0, help_text="Bit per genre id")
+    average_rating = models.FloatField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    watchlist_count = models.PositiveIntegerField(default=0)
+    # Time-decayed activity, recomputed from TrendingBucket by content.trending
+    trending_score = models.FloatField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'tv_shows'
         ordering = ['-first_air_date']
+        indexes = [
+            # Listing order, year and new release ranges, keyset paging
+            models.Index(fields=['first_air_date', 'id'], name='tv_shows_air_date_idx'),
+            models.Index(fields=['title', 'id'], name='tv_shows_title_idx'),
+            models.Index(fields=['number_of_seasons', 'id'], name='tv_shows_seasons_idx'),
+            models.Index(fields=['rating', 'first_air_date'], name='tv_shows_rating_idx'),
+            models.Index(fields=['status', 'first_air_date'], name='tv_shows_status_idx'),
+            # Genre filters without a join; counts read only this index
+            models.Index(fields=['genre_mask'], name='tv_shows_genre_mask_idx'),
+            # Popularity sorts
+            models.Index(fields=['average_rating', 'id'], name='tv_shows_avg_rating_idx'),
+            models.Index(fields=['watchlist_count', 'id'], name='tv_shows_watchlist_count_idx'),
+            models.Index(fields=['trending_score', 'id'], name='tv_shows_trending_score_idx'),
+            # Featured and trending rows only ever read the flagged titles
+            models.Index(
+                fields=['first_air_date'], condition=models.Q(is_featured=True),
+                name='tv_shows_featured_idx'
+            ),
+            models.Index(
+                fields=['first_air_date'], condition=models.Q(is_trending=True),
+                name='tv_shows_trending_idx'
+            ),
+        ]
     
     def __str__(self):
         return self.title
@@ -104,6 +206,11 @@ class UserWatchlist(models.Model):
             ('user', 'movie'),
             ('user', 'tv_show'),
         ]
+        indexes = [
+            # A user's list, newest first; (user, movie) and (user, tv_show)
+            # lookups are served by the unique constraints
+            models.Index(fields=['user', 'added_at', 'id'], name='watchlist_user_added_idx'),
+        ]
     
     def __str__(self):
         content = self.movie.title if self.movie else self.tv_show.title
@@ -134,6 +241,9 @@ class UserRating(models.Model):
             ('user', 'movie'),
             ('user', 'tv_show'),
         ]
+        indexes = [
+            models.Index(fields=['user', 'updated_at', 'id'], name='ratings_user_updated_idx'),
+        ]
     
     def __str__(self):
         content = self.movie.title if self.movie else self.tv_show.title
@@ -146,3 +256,37 @@ class UserRating(models.Model):
             raise ValidationError("Either movie or tv_show must be set")
         if self.movie and self.tv_show:
             raise ValidationError("Cannot set both movie and tv_show")
+
+
+class UserTasteProfile(models.Model):
+    """Per-user genre weights built from watchlist and rating activity"""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='taste_profile'
+    )
+    genre_weights = models.JSONField(default=dict, help_text="Genre id to weight")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'user_taste_profiles'
+    
+    def __str__(self):
+        return f"{self.user.username} taste profile"
+
+
+class TrendingBucket(models.Model):
+    """Weighted watchlist and rating activity of one title in one hour"""
+    content_key = models.BigIntegerField(help_text="object_id * 2 + type code, as in search")
+    hour = models.IntegerField(help_text="Hours since the Unix epoch")
+    score = models.FloatField(default=0)
+    
+    class Meta:
+        db_table = 'trending_buckets'
+        constraints = [
+            models.UniqueConstraint(fields=['content_key', 'hour'], name='trending_bucket_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['hour'], name='trending_buckets_hour_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.content_key} @ hour {self.hour}"
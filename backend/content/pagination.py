@@ -0,0 +1,122 @@
+import base64
+import json
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(position):
+    """Encode a JSON serializable position as an opaque cursor string"""
+    data = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by ``encode_cursor``"""
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+class ContentListPagination(PageNumberPagination):
+    """Page number pagination with an opt-in keyset mode.
+
+    Requests that carry a ``cursor`` query parameter (an empty value starts
+    at the top) are paged by keyset on the active ordering plus an ``id``
+    tiebreaker: each page is a ``WHERE (ordering) > (last row)`` range
+    with no ``COUNT(*)`` and no ``OFFSET``, so deep pages cost the same as
+    the first. Requests without it keep the page number behaviour.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.model = queryset.model
+        # values_list() pages hold tuples of these columns instead of instances
+        self.columns = queryset.query.values_select
+        page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            queryset = queryset.filter(self.get_keyset_filter(queryset.model, cursor))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page_rows = rows[:page_size]
+        return self.page_rows
+
+    def get_ordering(self, queryset):
+        """Return the queryset ordering with a matching ``id`` tiebreaker"""
+        ordering = [
+            field for field in queryset.query.order_by or queryset.model._meta.ordering
+            if isinstance(field, str) and field.lstrip('-') not in ('id', 'pk')
+        ]
+        direction = '-' if ordering and ordering[-1].startswith('-') else ''
+        return ordering + [f'{direction}id']
+
+    def get_keyset_filter(self, model, cursor):
+        try:
+            position = decode_cursor(cursor)
+            if position['o'] != self.ordering:
+                raise InvalidCursor('Cursor does not match ordering')
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position['v'], strict=True)
+            ]
+        except (KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # (a, b, id) after (x, y, z) is a > x OR (a = x AND b > y) OR ...
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def get_position(self, row):
+        if self.columns:
+            row = SimpleNamespace(**dict(zip(self.columns, row)))
+        values = []
+        for field in self.ordering:
+            model_field = self.model._meta.get_field(field.lstrip('-'))
+            values.append(model_field.value_to_string(row))
+        return {'o': self.ordering, 'v': values}
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        cursor = encode_cursor(self.get_position(self.page_rows[-1]))
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
@@ -0,0 +1,45 @@
+"""JSON rendering through orjson.
+
+``FastJSONRenderer`` writes the same bytes as DRF's ``JSONRenderer`` with
+its default compact, UTF-8 settings, but encodes with orjson when it is
+installed. Types orjson does not handle the way DRF does (dates, lazy
+strings, decimals and so on) still go through DRF's encoder, and anything
+orjson refuses, such as integers wider than 64 bits, is rendered by
+``JSONRenderer`` itself.
+
+Floats are the exception: orjson spells those below 1e-4 or from 1e16 up
+differently (``1e-6`` for ``1e-06``, ``1e16`` for ``1e+16``) and writes NaN
+as ``null``. Checking every payload for them costs about what orjson
+saves, so ``CONTENT_RENDERERS`` is only given to the content views, whose
+floats are ratings between 0 and 5; search, with its tiny rank scores,
+keeps the default renderers.
+"""
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | \
+        orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` encoding compact responses with orjson when available"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like JSONRenderer does, for JSON embedded in <script> tags
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+CONTENT_RENDERERS = [FastJSONRenderer, BrowsableAPIRenderer]
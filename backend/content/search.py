@@ -0,0 +1,446 @@
+"""Full-text search index for movies and TV shows.
+
+Titles, descriptions, directors/creators and cast members are kept in a
+single inverted index table, ``content_search``. Each row is keyed by
+``object_id * 2 + type code`` so movies and TV shows share one index and a
+lookup never has to touch the content tables. SQLite uses an FTS5 virtual
+table ranked with bm25, PostgreSQL a ``tsvector`` column with a GIN index
+ranked with ``ts_rank_cd``. Other databases fall back to ``icontains``.
+"""
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+INDEX_TABLE = 'content_search'
+
+MOVIE = 0
+TV_SHOW = 1
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def get_type_code(model):
+    """Return the index type code for a Movie or TVShow model"""
+    return TV_SHOW if model._meta.model_name == 'tvshow' else MOVIE
+
+
+def make_key(model, object_id):
+    return object_id * 2 + get_type_code(model)
+
+
+def get_row_key(movie_id, tv_show_id):
+    """Return the key of the title a watchlist entry or rating points at"""
+    if movie_id:
+        return movie_id * 2 + MOVIE
+    return tv_show_id * 2 + TV_SHOW
+
+
+def split_key(key):
+    """Return ``(type_code, object_id)`` for an index key"""
+    return key % 2, key // 2
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query.lower())
+
+
+def get_document(instance):
+    """Return the indexed text of a movie or TV show, highest weight first"""
+    people = getattr(instance, 'director', None) or getattr(instance, 'creator', '')
+    cast = instance.cast if isinstance(instance.cast, list) else []
+    return (
+        instance.title,
+        people,
+        ' '.join(str(member) for member in cast),
+        instance.description,
+    )
+
+
+class SearchBackend(ABC):
+    """Interface shared by the database specific index implementations.
+
+    The index maintenance hooks do nothing by default, for backends that
+    search the content tables directly.
+    """
+
+    def create_index(self, schema_editor):
+        pass
+
+    def drop_index(self, schema_editor):
+        pass
+
+    def index(self, model, instances):
+        pass
+
+    def remove(self, model, object_ids):
+        pass
+
+    def clear(self, model):
+        pass
+
+    @abstractmethod
+    def search(self, query, limit, type_code=None, after=None, offset=0):
+        """Return up to ``limit`` ``(key, score)`` pairs, best first.
+
+        ``after`` is a ``(score, key)`` position; only matches ranked below
+        it are returned, which lets callers page by keyset instead of OFFSET.
+        """
+
+    @abstractmethod
+    def count(self, query, cap, type_code=None):
+        """Return the number of matches, counting no further than ``cap``"""
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 index ranked with bm25"""
+    # bm25 column weights for title, people, cast, description
+    weights = (10.0, 4.0, 3.0, 1.0)
+
+    def create_index(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {INDEX_TABLE} USING fts5("
+            "title, people, cast_members, description, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def drop_index(self, schema_editor):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {INDEX_TABLE}')
+
+    def index(self, model, instances):
+        rows = [
+            (make_key(model, instance.pk), *get_document(instance))
+            for instance in instances
+        ]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s',
+                [(row[0],) for row in rows]
+            )
+            cursor.executemany(
+                f'INSERT INTO {INDEX_TABLE} '
+                '(rowid, title, people, cast_members, description) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                rows
+            )
+
+    def remove(self, model, object_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s',
+                [(make_key(model, object_id),) for object_id in object_ids]
+            )
+
+    def clear(self, model):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {INDEX_TABLE} WHERE rowid %% 2 = %s',
+                [get_type_code(model)]
+            )
+
+    def match(self, query, type_code):
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        sql = f'{INDEX_TABLE} MATCH %s'
+        params = [' '.join(f'"{token}"*' for token in tokens)]
+        if type_code is not None:
+            sql += ' AND rowid %% 2 = %s'
+            params.append(type_code)
+        return sql, params
+
+    def search(self, query, limit, type_code=None, after=None, offset=0):
+        match = self.match(query, type_code)
+        if match is None:
+            return []
+        where, params = match
+        weights = ', '.join(str(weight) for weight in self.weights)
+        sql = (
+            f'SELECT key, score FROM (SELECT rowid AS key, '
+            f'-bm25({INDEX_TABLE}, {weights}) AS score '
+            f'FROM {INDEX_TABLE} WHERE {where})'
+        )
+        if after is not None:
+            sql += ' WHERE score < %s OR (score = %s AND key > %s)'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY score DESC, key LIMIT %s OFFSET %s'
+        params += [limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def count(self, query, cap, type_code=None):
+        match = self.match(query, type_code)
+        if match is None:
+            return 0
+        where, params = match
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM (SELECT 1 FROM {INDEX_TABLE} '
+                f'WHERE {where} LIMIT %s)',
+                params + [cap]
+            )
+            return cursor.fetchone()[0]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector index with a GIN index, ranked with ts_rank_cd"""
+    config = 'english'
+
+    def create_index(self, schema_editor):
+        schema_editor.execute(
+            f'CREATE TABLE {INDEX_TABLE} ('
+            'key bigint PRIMARY KEY, document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX {INDEX_TABLE}_document_gin '
+            f'ON {INDEX_TABLE} USING GIN (document)'
+        )
+
+    def drop_index(self, schema_editor):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {INDEX_TABLE}')
+
+    def index(self, model, instances):
+        rows = [
+            (make_key(model, instance.pk), *get_document(instance))
+            for instance in instances
+        ]
+        if not rows:
+            return
+        vector = ' || '.join(
+            f"setweight(to_tsvector('{self.config}', %s), '{weight}')"
+            for weight in 'ABCD'
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {INDEX_TABLE} (key, document) '
+                f'VALUES (%s, {vector}) '
+                'ON CONFLICT (key) DO UPDATE SET document = EXCLUDED.document',
+                rows
+            )
+
+    def remove(self, model, object_ids):
+        keys = [make_key(model, object_id) for object_id in object_ids]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {INDEX_TABLE} WHERE key = ANY(%s)', [keys]
+            )
+
+    def clear(self, model):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {INDEX_TABLE} WHERE key %% 2 = %s',
+                [get_type_code(model)]
+            )
+
+    def match(self, query, type_code):
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        sql = 'document @@ query'
+        params = [' & '.join(f'{token}:*' for token in tokens)]
+        if type_code is not None:
+            sql += ' AND key %% 2 = %s'
+            params.append(type_code)
+        return sql, params
+
+    def search(self, query, limit, type_code=None, after=None, offset=0):
+        match = self.match(query, type_code)
+        if match is None:
+            return []
+        where, params = match
+        sql = (
+            'SELECT key, score FROM (SELECT key, '
+            'ts_rank_cd(document, query) AS score '
+            f"FROM {INDEX_TABLE}, to_tsquery('{self.config}', %s) query "
+            f'WHERE {where}) matches'
+        )
+        if after is not None:
+            sql += ' WHERE (score, -key) < (%s, %s)'
+            params += [after[0], -after[1]]
+        sql += ' ORDER BY score DESC, key LIMIT %s OFFSET %s'
+        params += [limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def count(self, query, cap, type_code=None):
+        match = self.match(query, type_code)
+        if match is None:
+            return 0
+        where, params = match
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM (SELECT 1 FROM {INDEX_TABLE}, '
+                f"to_tsquery('{self.config}', %s) query WHERE {where} LIMIT %s) matches",
+                params + [cap]
+            )
+            return cursor.fetchone()[0]
+
+
+class FallbackSearchBackend(SearchBackend):
+    """Unranked ``icontains`` scan for databases without a text index"""
+
+    def matches(self, query, type_code):
+        from .models import Movie, TVShow
+
+        tokens = tokenize(query)
+        keys = []
+        for model, people in [(Movie, 'director'), (TVShow, 'creator')]:
+            if not tokens or type_code not in (None, get_type_code(model)):
+                continue
+            condition = Q()
+            for token in tokens:
+                condition &= (
+                    Q(title__icontains=token) |
+                    Q(description__icontains=token) |
+                    Q(**{f'{people}__icontains': token})
+                )
+            ids = model.objects.filter(condition).values_list('id', flat=True)
+            keys.extend(make_key(model, object_id) for object_id in ids)
+        return sorted(keys)
+
+    def search(self, query, limit, type_code=None, after=None, offset=0):
+        keys = self.matches(query, type_code)
+        if after is not None:
+            keys = [key for key in keys if key > after[1]]
+        return [(key, 0.0) for key in keys[offset:offset + limit]]
+
+    def count(self, query, cap, type_code=None):
+        return min(len(self.matches(query, type_code)), cap)
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(vendor=None):
+    return BACKENDS.get(vendor or connection.vendor, FallbackSearchBackend)()
+
+
+def index_instances(model, instances):
+    get_search_backend().index(model, instances)
+
+
+def remove_instances(model, object_ids):
+    get_search_backend().remove(model, object_ids)
+
+
+def rebuild_index(model, chunk_size=2000):
+    """Re-index every row of ``model``, returning the number indexed"""
+    backend = get_search_backend()
+    backend.clear(model)
+    queryset = model.objects.order_by().only(
+        'id', 'title', 'description',
+        'creator' if get_type_code(model) == TV_SHOW else 'director', 'cast'
+    )
+    total = 0
+    batch = []
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        batch.append(instance)
+        if len(batch) == chunk_size:
+            backend.index(model, batch)
+            total += len(batch)
+            batch = []
+    backend.index(model, batch)
+    return total + len(batch)
+
+
+class SearchPage:
+    """One page of a merged movie and TV show search"""
+
+    def __init__(self, matches, count, count_is_capped, next_position):
+        # ``(type_code, object_id, score)`` triples, best first
+        self.matches = matches
+        self.count = count
+        self.count_is_capped = count_is_capped
+        self.next_position = next_position
+
+
+def search_content(query, querysets, page_size, page=1, after=None):
+    """Rank movies and TV shows together against one index query.
+
+    ``querysets`` maps type codes to the (optionally filtered) querysets
+    that may appear in the results. Paging is by ``(score, key)`` keyset
+    when ``after`` is given and by index offset otherwise; filters are
+    only evaluated against matching ids, one batch at a time.
+    """
+    backend = get_search_backend()
+    cap = getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+    type_code = next(iter(querysets)) if len(querysets) == 1 else None
+    filtered = {
+        code: queryset for code, queryset in querysets.items()
+        if queryset.query.has_filters()
+    }
+
+    def allowed(rows):
+        if not filtered:
+            return rows
+        keys_by_type = {}
+        for key, _ in rows:
+            code, object_id = split_key(key)
+            keys_by_type.setdefault(code, []).append(object_id)
+        kept = set()
+        for code, ids in keys_by_type.items():
+            if code not in filtered:
+                kept.update(make_key(querysets[code].model, object_id) for object_id in ids)
+                continue
+            queryset = filtered[code].filter(id__in=ids).order_by()
+            kept.update(
+                make_key(queryset.model, object_id)
+                for object_id in queryset.values_list('id', flat=True)
+            )
+        return [row for row in rows if row[0] in kept]
+
+    # Count the matches, applying filters to at most ``cap`` of them
+    if filtered:
+        count = len(allowed(backend.search(query, cap, type_code)))
+        count_is_capped = backend.count(query, cap + 1, type_code) > cap
+    else:
+        count = backend.count(query, cap + 1, type_code)
+        count_is_capped = count > cap
+        count = min(count, cap)
+
+    # Collect one row more than a page to know whether another page exists
+    wanted = page_size + 1
+    skip = 0 if after is not None else (page - 1) * page_size
+    batch_size = wanted if not filtered else max(wanted * 4, 100)
+    rows = []
+    position = tuple(after) if after is not None else None
+    while len(rows) < wanted:
+        if filtered or position is not None:
+            batch = backend.search(query, batch_size, type_code, after=position)
+        else:
+            batch = backend.search(query, batch_size, type_code, offset=skip)
+            skip = 0
+        if not batch:
+            break
+        position = (batch[-1][1], batch[-1][0])
+        kept = allowed(batch)
+        if skip:
+            dropped = min(skip, len(kept))
+            kept = kept[dropped:]
+            skip -= dropped
+        rows.extend(kept)
+        if len(batch) < batch_size:
+            break
+
+    rows = rows[:wanted]
+    next_position = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_position = (rows[-1][1], rows[-1][0])
+    matches = [(*split_key(key), score) for key, score in rows]
+    return SearchPage(matches, count, count_is_capped, next_position)
+
+
+def fetch_in_order(queryset, ids):
+    """Return the rows of ``queryset`` with the given ids, in ``ids`` order"""
+    rows = queryset.order_by().in_bulk(ids)
+    return [rows[object_id] for object_id in ids if object_id in rows]
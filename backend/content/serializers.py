@@ -1,10 +1,125 @@
 from rest_framework import serializers
+from django.conf import settings
+from django.db.models import Prefetch
 from .models import Movie, TVShow, Genre, UserWatchlist, UserRating
+from .pagination import decode_cursor
+from .search import make_key
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
+class EagerLoadingMixin:
+    """Lets a serializer shape the queryset it is handed.
+
+    Views pass their querysets through ``setup_eager_loading`` so the
+    columns a serializer reads are selected up front and its relations are
+    fetched in a fixed number of queries instead of one query per row.
+    """
+    select_related_fields = []
+    prefetch_related_fields = []
+
+    @classmethod
+    def get_loaded_columns(cls, fields=None):
+        """Return the concrete model columns the serializer reads.
+
+        Columns of a ``select_related`` field whose serializer also uses
+        this mixin are included as ``field__column``.
+        """
+        model = cls.Meta.model
+        concrete = {
+            field.name for field in model._meta.concrete_fields
+        }
+        fields = cls.Meta.fields if fields is None else fields
+        columns = [name for name in fields if name in concrete]
+        for name, nested in cls.get_nested_serializers(fields):
+            columns += [f'{name}__{column}' for column in nested.get_loaded_columns()]
+        return columns
+
+    @classmethod
+    def get_nested_serializers(cls, fields=None):
+        """Yield ``(field, serializer)`` for eager loading related serializers"""
+        declared = getattr(cls, '_declared_fields', {})
+        for name in cls.select_related_fields:
+            if fields is not None and name not in fields:
+                continue
+            nested = declared.get(name)
+            if isinstance(nested, EagerLoadingMixin):
+                yield name, nested
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        """Shape ``queryset`` for the serializer, or for a subset of ``fields``"""
+        queryset = queryset.only(*cls.get_loaded_columns(fields))
+        related = [
+            name for name in cls.select_related_fields
+            if fields is None or name in fields
+        ]
+        if related:
+            queryset = queryset.select_related(*related)
+        prefetches = list(cls.prefetch_related_fields)
+        for name, nested in cls.get_nested_serializers(fields):
+            for lookup in nested.prefetch_related_fields:
+                if isinstance(lookup, Prefetch):
+                    lookup = Prefetch(
+                        f'{name}__{lookup.prefetch_through}', queryset=lookup.queryset
+                    )
+                else:
+                    lookup = f'{name}__{lookup}'
+                prefetches.append(lookup)
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        return queryset
+
+
+class DynamicFieldsMixin:
+    """Lets a ``?fields=a,b`` query parameter trim a serializer to the named
+    top-level fields. Unknown names are ignored."""
+    fields_query_param = 'fields'
+
+    @classmethod
+    def get_requested_fields(cls, request):
+        value = request.query_params.get(cls.fields_query_param) if request else None
+        if not value:
+            return None
+        requested = [name.strip() for name in value.split(',')]
+        requested = [name for name in cls.Meta.fields if name in requested]
+        return requested or None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.get_requested_fields(self.context.get('request'))
+        if requested is not None:
+            for name in set(self.fields) - set(requested):
+                self.fields.pop(name)
+
+
+def get_user_state(library, model, object_id):
+    """Return a user's ``in_watchlist``, ``is_watched`` and ``my_rating``
+    fields for a title, read from their library"""
+    key = make_key(model, object_id)
+    entry = library.get_watchlist_entry(key)
+    return {
+        'in_watchlist': entry is not None,
+        'is_watched': bool(entry and entry[1]),
+        'my_rating': library.get_rating(key),
+    }
+
+
+class UserStateMixin:
+    """Adds the requesting user's ``in_watchlist``, ``is_watched`` and
+    ``my_rating`` to each title when the view puts their ``library`` in
+    the context. The library is one cached lookup for the whole response,
+    so the fields cost no query per row."""
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        library = self.context.get('library')
+        if library is not None:
+            data.update(get_user_state(library, self.Meta.model, instance.pk))
+        return data
+
+
 class GenreSerializer(serializers.ModelSerializer):
     """Serializer for Genre model"""
     class Meta:
@@ -12,8 +127,11 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description']
 
 
-class MovieSerializer(serializers.ModelSerializer):
+class MovieSerializer(UserStateMixin, EagerLoadingMixin, serializers.ModelSerializer):
     """Serializer for Movie model"""
+    prefetch_related_fields = [
+        Prefetch('genres', queryset=Genre.objects.only('id', 'name', 'description').order_by('id'))
+    ]
     genres = GenreSerializer(many=True, read_only=True)
     genre_ids = serializers.PrimaryKeyRelatedField(
         many=True, 
@@ -28,13 +146,19 @@ class MovieSerializer(serializers.ModelSerializer):
             'id', 'title', 'description', 'release_date', 'duration',
             'rating', 'poster_url', 'backdrop_url', 'trailer_url',
             'genres', 'genre_ids', 'director', 'cast', 'tmdb_id',
-            'is_featured', 'is_trending', 'created_at', 'updated_at'
+            'is_featured', 'is_trending', 'average_rating', 'rating_count',
+            'watchlist_count', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'average_rating', 'rating_count', 'watchlist_count', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class TVShowSerializer(serializers.ModelSerializer):
+class TVShowSerializer(UserStateMixin, EagerLoadingMixin, serializers.ModelSerializer):
     """Serializer for TVShow model"""
+    prefetch_related_fields = [
+        Prefetch('genres', queryset=Genre.objects.only('id', 'name', 'description').order_by('id'))
+    ]
     genres = GenreSerializer(many=True, read_only=True)
     genre_ids = serializers.PrimaryKeyRelatedField(
         many=True, 
@@ -50,9 +174,38 @@ class TVShowSerializer(serializers.ModelSerializer):
             'number_of_seasons', 'number_of_episodes', 'rating', 'poster_url',
             'backdrop_url', 'trailer_url', 'genres', 'genre_ids', 'creator',
             'cast', 'tmdb_id', 'is_featured', 'is_trending', 'status',
-            'created_at', 'updated_at'
+            'average_rating', 'rating_count', 'watchlist_count', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'average_rating', 'rating_count', 'watchlist_count', 'created_at', 'updated_at'
+        ]
+
+
+class MovieCardSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    """Card-sized Movie representation for user lists"""
+    prefetch_related_fields = [
+        Prefetch('genres', queryset=Genre.objects.only('id', 'name').order_by('id'))
+    ]
+    genres = serializers.SlugRelatedField(many=True, read_only=True, slug_field='name')
+    
+    class Meta:
+        model = Movie
+        fields = ['id', 'title', 'poster_url', 'release_date', 'duration', 'rating', 'genres']
+
+
+class TVShowCardSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    """Card-sized TVShow representation for user lists"""
+    prefetch_related_fields = [
+        Prefetch('genres', queryset=Genre.objects.only('id', 'name').order_by('id'))
+    ]
+    genres = serializers.SlugRelatedField(many=True, read_only=True, slug_field='name')
+    
+    class Meta:
+        model = TVShow
+        fields = [
+            'id', 'title', 'poster_url', 'first_air_date', 'number_of_seasons',
+            'rating', 'genres'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
 
 
 class UserWatchlistSerializer(serializers.ModelSerializer):
@@ -123,6 +276,81 @@ class UserRatingSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class UserWatchlistListSerializer(DynamicFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    """UserWatchlist list representation with the full content"""
+    select_related_fields = ['movie', 'tv_show']
+    movie = MovieSerializer(read_only=True)
+    tv_show = TVShowSerializer(read_only=True)
+    
+    class Meta:
+        model = UserWatchlist
+        fields = ['id', 'user', 'movie', 'tv_show', 'added_at', 'is_watched', 'watched_at']
+
+
+class UserWatchlistCardSerializer(UserWatchlistListSerializer):
+    """Compact UserWatchlist representation with content cards"""
+    movie = MovieCardSerializer(read_only=True)
+    tv_show = TVShowCardSerializer(read_only=True)
+
+
+class UserRatingListSerializer(DynamicFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    """UserRating list representation with the full content"""
+    select_related_fields = ['movie', 'tv_show']
+    movie = MovieSerializer(read_only=True)
+    tv_show = TVShowSerializer(read_only=True)
+    
+    class Meta:
+        model = UserRating
+        fields = ['id', 'user', 'movie', 'tv_show', 'rating', 'review', 'created_at', 'updated_at']
+
+
+class UserRatingCardSerializer(UserRatingListSerializer):
+    """Compact UserRating representation with content cards"""
+    movie = MovieCardSerializer(read_only=True)
+    tv_show = TVShowCardSerializer(read_only=True)
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    """Base serializer for one operation of a batch write"""
+    movie_id = serializers.IntegerField(min_value=1, required=False)
+    tv_show_id = serializers.IntegerField(min_value=1, required=False)
+    
+    def validate(self, attrs):
+        if not attrs.get('movie_id') and not attrs.get('tv_show_id'):
+            raise serializers.ValidationError("Either movie_id or tv_show_id must be provided")
+        if attrs.get('movie_id') and attrs.get('tv_show_id'):
+            raise serializers.ValidationError("Cannot provide both movie_id and tv_show_id")
+        return attrs
+
+
+class WatchlistOperationSerializer(BatchOperationSerializer):
+    """Serializer for one watchlist batch operation"""
+    op = serializers.ChoiceField(choices=['add', 'remove', 'mark_watched'])
+    is_watched = serializers.BooleanField(required=False)
+
+
+class RatingOperationSerializer(BatchOperationSerializer):
+    """Serializer for one rating batch operation"""
+    op = serializers.ChoiceField(choices=['rate', 'remove'])
+    rating = serializers.IntegerField(min_value=1, max_value=5, required=False)
+    review = serializers.CharField(allow_blank=True, required=False)
+    
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if attrs['op'] == 'rate' and 'rating' not in attrs:
+            raise serializers.ValidationError({'rating': "This field is required."})
+        return attrs
+
+
+class BatchWriteSerializer(serializers.Serializer):
+    """Serializer for a batch write request; operations are validated one by one"""
+    operations = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=getattr(settings, 'BATCH_MAX_OPERATIONS', 500),
+    )
+
+
 class ContentSearchSerializer(serializers.Serializer):
     """Serializer for content search"""
     query = serializers.CharField(max_length=200)
@@ -131,6 +359,14 @@ class ContentSearchSerializer(serializers.Serializer):
     year = serializers.IntegerField(required=False)
     page = serializers.IntegerField(min_value=1, default=1)
     page_size = serializers.IntegerField(min_value=1, max_value=50, default=20)
+    cursor = serializers.CharField(required=False)
+    
+    def validate_cursor(self, value):
+        try:
+            score, key = decode_cursor(value)
+            return float(score), int(key)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError("Invalid cursor")
 
 
 class ContentRecommendationSerializer(serializers.Serializer):
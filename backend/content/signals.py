@@ -0,0 +1,135 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import home, library, search, stats, taste, trending
+from .models import Genre, Movie, TVShow, UserRating, UserWatchlist
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=TVShow)
+def update_search_index(sender, instance, **kwargs):
+    """Keep the full-text index in step with content edits"""
+    search.index_instances(sender, [instance])
+
+
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=TVShow)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_instances(sender, [instance.pk])
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=TVShow)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=TVShow)
+@receiver(post_delete, sender=Genre)
+@receiver(m2m_changed, sender=Movie.genres.through)
+@receiver(m2m_changed, sender=TVShow.genres.through)
+def rebuild_home_rows(sender, **kwargs):
+    """Refresh the precomputed home page rows after catalog edits"""
+    if kwargs.get('action', 'post_').startswith('post_'):
+        home.schedule_rebuild()
+
+
+def get_taste_change(instance, sender):
+    """Return the ``(movie_id, tv_show_id, weight)`` a row adds to a profile"""
+    if sender is UserWatchlist:
+        weight = taste.watchlist_weight(instance.is_watched)
+    else:
+        weight = taste.rating_weight(instance.rating)
+    return (instance.movie_id, instance.tv_show_id, weight)
+
+
+@receiver(pre_save, sender=UserWatchlist)
+@receiver(pre_save, sender=UserRating)
+def remember_taste_contribution(sender, instance, **kwargs):
+    """Keep the stored row's contribution so post_save can apply the difference"""
+    instance._previous_taste_change = None
+    instance._previous_row = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).first()
+        if previous is not None:
+            instance._previous_taste_change = get_taste_change(previous, sender)
+            instance._previous_row = previous
+
+
+@receiver(post_save, sender=UserWatchlist)
+@receiver(post_save, sender=UserRating)
+def update_taste_profile(sender, instance, **kwargs):
+    changes = [get_taste_change(instance, sender)]
+    previous = getattr(instance, '_previous_taste_change', None)
+    if previous is not None:
+        changes.append((previous[0], previous[1], -previous[2]))
+    taste.apply_changes(instance.user_id, changes)
+
+
+@receiver(post_delete, sender=UserWatchlist)
+@receiver(post_delete, sender=UserRating)
+def remove_from_taste_profile(sender, instance, **kwargs):
+    movie_id, tv_show_id, weight = get_taste_change(instance, sender)
+    taste.apply_changes(instance.user_id, [(movie_id, tv_show_id, -weight)])
+
+
+@receiver(post_save, sender=UserWatchlist)
+@receiver(post_save, sender=UserRating)
+@receiver(post_delete, sender=UserWatchlist)
+@receiver(post_delete, sender=UserRating)
+def refresh_user_library(sender, instance, **kwargs):
+    """Write watchlist and rating changes through to the user's cached library"""
+    library.library_changed(instance.user_id)
+
+
+@receiver(post_save, sender=UserWatchlist)
+@receiver(post_save, sender=UserRating)
+@receiver(post_delete, sender=UserWatchlist)
+@receiver(post_delete, sender=UserRating)
+def update_content_stats(sender, instance, **kwargs):
+    """Recompute the rating and watchlist aggregates of the titles a row touched"""
+    targets = {(instance.movie_id, instance.tv_show_id)}
+    previous = getattr(instance, '_previous_taste_change', None)
+    if previous is not None:
+        targets.add(previous[:2])
+    stats.refresh_targets(targets)
+
+
+@receiver(m2m_changed, sender=Movie.genres.through)
+@receiver(m2m_changed, sender=TVShow.genres.through)
+def update_genre_masks(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Keep ``genre_mask`` in step with a title's genres"""
+    content_model = Movie if sender is Movie.genres.through else TVShow
+    if not reverse:
+        if action.startswith('post_'):
+            stats.refresh_genre_masks(content_model, [instance.pk])
+        return
+    # genre.movies.add(...) and friends: the titles are in pk_set, except
+    # on clear, where they have to be read before the rows go
+    if action == 'pre_clear':
+        instance._cleared_content_ids = list(
+            sender.objects.filter(genre_id=instance.pk)
+            .values_list(f'{content_model._meta.model_name}_id', flat=True)
+        )
+    elif action == 'post_clear':
+        stats.refresh_genre_masks(content_model, getattr(instance, '_cleared_content_ids', []))
+    elif action.startswith('post_'):
+        stats.refresh_genre_masks(content_model, pk_set or [])
+
+
+@receiver(post_delete, sender=Genre)
+def remove_genre_from_masks(sender, instance, **kwargs):
+    stats.clear_genre_bit(instance.pk)
+
+
+@receiver(post_save, sender=UserWatchlist)
+def record_watchlist_activity(sender, instance, created, **kwargs):
+    """Count list adds and watches towards trending"""
+    previous = getattr(instance, '_previous_row', None)
+    trending.record_events(trending.get_watchlist_events(
+        instance, created, was_watched=previous is not None and previous.is_watched
+    ))
+
+
+@receiver(post_save, sender=UserRating)
+def record_rating_activity(sender, instance, created, **kwargs):
+    if created:
+        trending.record_events(trending.get_rating_events(instance))
@@ -0,0 +1,235 @@
+"""Item-item collaborative filtering over watchlist entries and ratings.
+
+``build_model`` turns every user's affinity for the titles they saved or
+rated into a sparse user x title matrix, takes the cosine similarity of
+its columns and keeps the ``RECOMMENDATION_NEIGHBORS`` most similar titles
+of each one. Movies and TV shows share one item space, keyed like the
+search index (``object_id * 2 + type code``), so a series can recommend a
+film. The model is three ``.npy`` arrays in a versioned directory under
+``RECOMMENDATION_MODEL_DIR``:
+
+- ``keys``: sorted item keys, ``int64[n]``
+- ``neighbors``: indexes into ``keys``, ``int32[n, k]``, ``-1`` padded
+- ``scores``: matching similarities, ``float32[n, k]``
+
+``get_model`` memory-maps the version named by the ``CURRENT`` file, so
+serving processes share the pages and only touch the rows of the titles a
+user has interacted with.
+"""
+import os
+import shutil
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from scipy import sparse
+
+from . import library, search, taste
+from .models import UserRating, UserWatchlist
+
+CURRENT_FILE = 'CURRENT'
+ARRAYS = ('keys', 'neighbors', 'scores')
+KEEP_VERSIONS = 2
+
+_loaded = {}
+
+
+def get_model_dir():
+    return str(getattr(settings, 'RECOMMENDATION_MODEL_DIR'))
+
+
+def get_affinity_rows(condition):
+    """Yield ``(user_id, key, affinity)`` for watchlist entries and ratings"""
+    for user_id, movie_id, tv_show_id, is_watched in UserWatchlist.objects.filter(
+        condition
+    ).values_list('user_id', 'movie_id', 'tv_show_id', 'is_watched').iterator():
+        yield user_id, search.get_row_key(movie_id, tv_show_id), taste.watchlist_weight(is_watched)
+    for user_id, movie_id, tv_show_id, rating in UserRating.objects.filter(
+        condition
+    ).values_list('user_id', 'movie_id', 'tv_show_id', 'rating').iterator():
+        yield user_id, search.get_row_key(movie_id, tv_show_id), taste.rating_weight(rating)
+
+
+def get_user_affinities(user_id):
+    """Return ``{key: affinity}`` for one user, summed over list and rating"""
+    user_library = library.get_library(user_id)
+    affinities = {
+        key: taste.watchlist_weight(is_watched)
+        for key, (_, is_watched) in user_library.watchlist.items()
+    }
+    for key, (_, rating) in user_library.ratings.items():
+        affinities[key] = affinities.get(key, 0.0) + taste.rating_weight(rating)
+    return affinities
+
+
+def build_matrix():
+    """Return ``(item keys, users x items CSR matrix)`` of positive affinities"""
+    rows = np.fromiter(
+        (value for row in get_affinity_rows(Q()) for value in row),
+        dtype=np.float64
+    ).reshape(-1, 3)
+    if not len(rows):
+        return np.empty(0, dtype=np.int64), sparse.csr_matrix((0, 0))
+    users = rows[:, 0].astype(np.int64)
+    keys = rows[:, 1].astype(np.int64)
+    _, user_index = np.unique(users, return_inverse=True)
+    item_keys, item_index = np.unique(keys, return_inverse=True)
+    # Duplicates (a title both saved and rated) are summed by tocsr()
+    matrix = sparse.coo_matrix(
+        (rows[:, 2], (user_index, item_index)),
+        shape=(user_index.max() + 1, len(item_keys))
+    ).tocsr()
+    # Only titles a user liked say anything about what they would like
+    matrix.data[matrix.data < 0] = 0
+    matrix.eliminate_zeros()
+    return item_keys, matrix
+
+
+def top_neighbors(matrix, neighbors, chunk_size=1000):
+    """Return the ``neighbors`` most cosine-similar columns of every column"""
+    n_items = matrix.shape[1]
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))).ravel()
+    norms[norms == 0] = 1
+    normalized = (matrix @ sparse.diags(1 / norms)).tocsc()
+    transposed = normalized.T.tocsr()
+
+    indexes = np.full((n_items, neighbors), -1, dtype=np.int32)
+    scores = np.zeros((n_items, neighbors), dtype=np.float32)
+    for start in range(0, n_items, chunk_size):
+        similarity = (transposed[start:start + chunk_size] @ normalized).tocsr()
+        for offset in range(similarity.shape[0]):
+            begin, end = similarity.indptr[offset], similarity.indptr[offset + 1]
+            columns = similarity.indices[begin:end]
+            values = similarity.data[begin:end]
+            # A title is not its own neighbor
+            other = columns != start + offset
+            columns, values = columns[other], values[other]
+            if len(values) > neighbors:
+                best = np.argpartition(-values, neighbors - 1)[:neighbors]
+                columns, values = columns[best], values[best]
+            order = np.argsort(-values, kind='stable')
+            indexes[start + offset, :len(order)] = columns[order]
+            scores[start + offset, :len(order)] = values[order]
+    return indexes, scores
+
+
+def write_model(keys, neighbors, scores, directory=None):
+    """Save the arrays as a new version and point ``CURRENT`` at it"""
+    directory = directory or get_model_dir()
+    version = f'{time.time_ns():020d}'
+    path = os.path.join(directory, version)
+    os.makedirs(path)
+    for name, array in zip(ARRAYS, (keys, neighbors, scores)):
+        np.save(os.path.join(path, f'{name}.npy'), array)
+
+    pointer = os.path.join(directory, f'{CURRENT_FILE}.tmp')
+    with open(pointer, 'w') as handle:
+        handle.write(version)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+    # Readers may still have the previous version mapped, so keep it around
+    versions = sorted(
+        name for name in os.listdir(directory)
+        if os.path.isdir(os.path.join(directory, name))
+    )
+    for name in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return path
+
+
+def build_model(neighbors=None, chunk_size=1000, directory=None):
+    """Build and save the similarity model, returning ``(path, item count)``"""
+    neighbors = neighbors or getattr(settings, 'RECOMMENDATION_NEIGHBORS', 50)
+    keys, matrix = build_matrix()
+    if len(keys):
+        indexes, scores = top_neighbors(matrix, neighbors, chunk_size)
+    else:
+        indexes = np.empty((0, neighbors), dtype=np.int32)
+        scores = np.empty((0, neighbors), dtype=np.float32)
+    return write_model(keys, indexes, scores, directory), len(keys)
+
+
+def get_model():
+    """Return the current ``{keys, neighbors, scores}`` arrays, or ``None``.
+
+    Arrays are memory-mapped once per version and reused until a rebuild
+    moves ``CURRENT``.
+    """
+    directory = get_model_dir()
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as handle:
+            version = handle.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(directory, version)
+    model = _loaded.get(directory)
+    if model is None or model['path'] != path:
+        try:
+            model = {
+                name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                for name in ARRAYS
+            }
+        except FileNotFoundError:
+            return None
+        model['path'] = path
+        _loaded[directory] = model
+    return model
+
+
+def recommend(model, affinities, type_code, limit=None):
+    """Return up to ``limit`` object ids of ``type_code``, best first.
+
+    Each title the user has an affinity for adds its neighbors' similarity
+    times that affinity, so disliked titles pull their neighbors down.
+    Titles the user already has are never returned; ``limit=None``
+    returns every candidate.
+    """
+    keys = model['keys']
+    if not affinities or not len(keys):
+        return []
+    seeds = np.fromiter(affinities, dtype=np.int64)
+    weights = np.fromiter(affinities.values(), dtype=np.float32)
+    rows = np.searchsorted(keys, seeds)
+    known = rows < len(keys)
+    known[known] = keys[rows[known]] == seeds[known]
+    if not known.any():
+        return []
+    rows, weights = rows[known], weights[known]
+
+    neighbors = np.asarray(model['neighbors'][rows]).ravel()
+    scores = (np.asarray(model['scores'][rows]) * weights[:, None]).ravel()
+    valid = neighbors >= 0
+    candidates = keys[neighbors[valid]]
+    scores = scores[valid]
+    keep = (candidates % 2 == type_code) & ~np.isin(candidates, seeds)
+    candidates, inverse = np.unique(candidates[keep], return_inverse=True)
+    totals = np.bincount(inverse, weights=scores[keep], minlength=len(candidates))
+
+    # Highest score first, newest title first among equals
+    order = np.lexsort((-candidates, -totals))
+    order = order[totals[order] > 0]
+    return [int(key) // 2 for key in candidates[order[:limit]]]
+
+
+def keep_existing(model, ids, limit, genre_ids=None, chunk_size=500):
+    """Keep the first ``limit`` of the ranked ``ids`` that still exist.
+
+    The model is built offline, so titles deleted since are dropped here
+    rather than after slicing. With ``genre_ids`` only titles in one of
+    them are kept, read from the genre through table alone.
+    """
+    if genre_ids is None:
+        queryset = model.objects.order_by()
+        fk = 'id'
+    else:
+        fk = f'{model._meta.model_name}_id'
+        queryset = model.genres.through.objects.filter(genre_id__in=genre_ids)
+    kept = []
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        matching = set(queryset.filter(**{f'{fk}__in': chunk}).values_list(fk, flat=True))
+        kept += [object_id for object_id in chunk if object_id in matching]
+        if len(kept) >= limit:
+            break
+    return kept[:limit]
@@ -0,0 +1,135 @@
+"""Denormalized genre masks and audience aggregates on movies and TV shows.
+
+Every title stores a ``genre_mask`` with bit ``genre_id - 1`` set for each
+of its genres, plus the average and number of its ratings and the number
+of watchlist entries pointing at it. Genre filters become a bitwise test
+on the content row and popularity sorts read an indexed column, so
+neither joins the genre, rating or watchlist tables at request time.
+
+Signals keep single-row writes in step; bulk paths (the importer and the
+batch endpoints) call ``refresh_genre_masks`` and ``refresh_counts``
+themselves, and ``reconcile`` recomputes everything from the source tables.
+"""
+from collections import defaultdict
+
+from django.db.models import Avg, Count, F, FloatField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Genre, Movie, TVShow, UserRating, UserWatchlist
+
+# The mask is a signed 64 bit integer, so genre ids 1-63 get a bit; titles
+# in genres past that are still filtered through the genre table
+MAX_MASK_GENRE_ID = 63
+
+
+def get_content_field(model):
+    return 'movie' if model is Movie else 'tv_show'
+
+
+def genre_bit(genre_id):
+    """Return the mask bit of a genre, or 0 when the id has none"""
+    if 1 <= genre_id <= MAX_MASK_GENRE_ID:
+        return 1 << (genre_id - 1)
+    return 0
+
+
+def get_genre_mask(genre_ids):
+    """Return the mask matching any of ``genre_ids``, or ``None`` if one has no bit"""
+    mask = 0
+    for genre_id in genre_ids:
+        bit = genre_bit(genre_id)
+        if not bit:
+            return None
+        mask |= bit
+    return mask
+
+
+def filter_by_genres(queryset, genre_ids):
+    """Keep the titles of ``queryset`` in any of ``genre_ids``"""
+    genre_ids = list(genre_ids)
+    if not genre_ids:
+        return queryset.none()
+    mask = get_genre_mask(genre_ids)
+    if mask is None:
+        return queryset.filter(genres__in=genre_ids).distinct()
+    return queryset.alias(genre_match=F('genre_mask').bitand(mask)).exclude(genre_match=0)
+
+
+def filter_by_genre_name(queryset, name):
+    """Keep the titles of ``queryset`` in a genre whose name contains ``name``"""
+    genre_ids = Genre.objects.filter(name__icontains=name).values_list('id', flat=True)
+    return filter_by_genres(queryset, genre_ids)
+
+
+def refresh_genre_masks(model, ids):
+    """Recompute ``genre_mask`` of the titles ``ids`` from the genre table"""
+    ids = list(ids)
+    if not ids:
+        return
+    through = model.genres.through
+    fk = f'{model._meta.model_name}_id'
+    masks = defaultdict(int)
+    for object_id, genre_id in through.objects.filter(
+        **{f'{fk}__in': ids}
+    ).values_list(fk, 'genre_id'):
+        masks[object_id] |= genre_bit(genre_id)
+    model.objects.bulk_update(
+        [model(pk=object_id, genre_mask=masks[object_id]) for object_id in ids],
+        ['genre_mask'], batch_size=500
+    )
+
+
+def clear_genre_bit(genre_id):
+    """Drop a deleted genre's bit from every title"""
+    bit = genre_bit(genre_id)
+    if bit:
+        for model in (Movie, TVShow):
+            model.objects.alias(genre_match=F('genre_mask').bitand(bit)).exclude(
+                genre_match=0
+            ).update(genre_mask=F('genre_mask').bitand(~bit))
+
+
+def refresh_counts(model, ids):
+    """Recompute the rating and watchlist aggregates of ``ids`` in one UPDATE"""
+    ids = list(ids)
+    if not ids:
+        return
+    field = get_content_field(model)
+    ratings = UserRating.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    watchlist = UserWatchlist.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    model.objects.filter(pk__in=ids).update(
+        average_rating=Coalesce(
+            Subquery(ratings.annotate(value=Avg('rating')).values('value')),
+            Value(0.0), output_field=FloatField()
+        ),
+        rating_count=Coalesce(
+            Subquery(ratings.annotate(value=Count('id')).values('value')),
+            Value(0), output_field=IntegerField()
+        ),
+        watchlist_count=Coalesce(
+            Subquery(watchlist.annotate(value=Count('id')).values('value')),
+            Value(0), output_field=IntegerField()
+        ),
+    )
+
+
+def refresh_targets(targets):
+    """Recompute the aggregates of ``(movie_id, tv_show_id)`` pairs"""
+    targets = list(targets)
+    for model, index in [(Movie, 0), (TVShow, 1)]:
+        refresh_counts(model, {target[index] for target in targets if target[index]})
+
+
+def reconcile(model, chunk_size=1000):
+    """Recompute masks and aggregates of every title, returning the count"""
+    count = 0
+    ids = model.objects.order_by('id').values_list('id', flat=True)
+    last = 0
+    while True:
+        chunk = list(ids.filter(id__gt=last)[:chunk_size])
+        if not chunk:
+            return count
+        refresh_genre_masks(model, chunk)
+        refresh_counts(model, chunk)
+        count += len(chunk)
+        last = chunk[-1]
@@ -0,0 +1,554 @@
+"""Synthetic datasets at production scale for performance work.
+
+``generate`` fills the database with a catalog and with users, their
+watchlist entries, ratings and taste profiles, shaped like real traffic
+rather than uniform noise:
+
+- Title popularity follows a Zipf law, so a few hundred titles collect
+  most of the activity and the long tail is barely touched.
+- Activity per user is log-normal: most users save and rate a few dozen
+  titles, some several hundred.
+- Every user favours one to three genres, picks most titles from them and
+  rates those higher. Genres are themselves Zipf-popular, and titles have
+  one to three of them.
+- Activity is denser in recent weeks, so trending has a window to score.
+
+The same seed and scale produce the same rows whatever the number of
+workers. The parent writes the catalog, then worker processes build the
+users in chunks. On PostgreSQL each worker COPYs its chunks over its own
+connection; other databases take one writer at a time, so there the
+workers only build rows and the parent inserts them.
+
+Rows are written as plain column values, so model signals do not run.
+Taste profiles are computed with the rows, and ``finish`` rebuilds the
+title aggregates, search index and trending scores afterwards.
+"""
+import csv
+import io
+import json
+import multiprocessing
+from collections import namedtuple
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import home, search, stats, taste, trending
+from .models import Genre, Movie, TVShow, UserRating, UserTasteProfile, UserWatchlist
+
+User = get_user_model()
+
+# Most popular first
+GENRE_NAMES = [
+    'Drama', 'Comedy', 'Action', 'Thriller', 'Romance', 'Crime', 'Adventure',
+    'Horror', 'Sci-Fi', 'Family', 'Fantasy', 'Animation', 'Documentary',
+]
+WORDS = [
+    'night', 'last', 'city', 'love', 'dark', 'house', 'war', 'secret', 'life', 'blood',
+    'star', 'king', 'girl', 'road', 'summer', 'fire', 'dead', 'world', 'lost', 'game',
+    'heart', 'river', 'shadow', 'winter', 'family', 'story', 'island', 'ghost', 'storm',
+    'dream', 'hunter', 'empire', 'silent', 'broken', 'wild', 'golden', 'final', 'black',
+    'stranger', 'kingdom', 'moon', 'brother', 'sister', 'crown', 'ocean', 'legend',
+    'machine', 'planet', 'escape', 'promise', 'midnight', 'echo', 'garden', 'witness',
+    'detective', 'mission', 'journey', 'truth', 'revenge', 'spirit', 'signal', 'frontier',
+    'paradise', 'hollow', 'harbor', 'outlaw', 'memory', 'lesson', 'wedding', 'danger',
+    'forest', 'mountain', 'desert', 'circle', 'code', 'doctor', 'angel', 'mirror',
+    'monster', 'robot', 'pirate', 'school', 'summit', 'border', 'prison', 'chase',
+]
+FIRST_NAMES = [
+    'Ava', 'Ben', 'Chloe', 'Daniel', 'Elena', 'Felix', 'Grace', 'Hugo', 'Isla', 'Jonas',
+    'Kira', 'Leo', 'Maya', 'Noah', 'Olivia', 'Pablo', 'Quinn', 'Rosa', 'Sam', 'Tara',
+    'Umar', 'Vera', 'Wei', 'Ximena', 'Yusuf', 'Zoe', 'Amir', 'Bea', 'Carlos', 'Dara',
+]
+LAST_NAMES = [
+    'Adams', 'Bauer', 'Costa', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Hughes', 'Ito',
+    'Jensen', 'Khan', 'Lopez', 'Moreau', 'Nakamura', 'Okafor', 'Park', 'Quinn', 'Rossi',
+    'Silva', 'Tanaka', 'Usman', 'Varga', 'Walsh', 'Xu', 'Young', 'Zhang', 'Novak', 'Berg',
+]
+CERTIFICATIONS = (['G', 'PG', 'PG-13', 'R', 'NC-17'], [0.08, 0.22, 0.35, 0.30, 0.05])
+STATUSES = (['ongoing', 'ended', 'cancelled'], [0.35, 0.5, 0.15])
+PLANS = (['basic', 'standard', 'premium'], [0.5, 0.35, 0.15])
+PASSWORD = 'synthetic-password'
+
+# name: (titles, users, ratings, mean watchlist entries per user)
+SCALES = {
+    'small': (10_000, 2_000, 100_000, 60),
+    'medium': (50_000, 10_000, 1_000_000, 120),
+    'large': (200_000, 50_000, 10_000_000, 200),
+}
+MOVIE_SHARE = 0.7
+# Share of a user's ratings given to titles already on their list
+RATED_FROM_WATCHLIST = 0.3
+WATCHED_SHARE = 0.25
+REVIEW_SHARE = 0.05
+NULL = r'\N'
+
+Options = namedtuple(
+    'Options', 'seed titles users ratings watchlist popularity affinity days chunk_size'
+)
+# A chunk of users: its index, first user id, and watchlist and rating counts
+Job = namedtuple('Job', 'index first_user_id watchlist_counts rating_counts')
+
+
+def zipf_weights(count, exponent):
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+def format_times(seconds):
+    """Format Unix timestamps as the naive UTC text both SQLite and
+    PostgreSQL (in Django's UTC sessions) read as datetimes"""
+    moments = np.asarray(seconds * 1e6, dtype=np.int64).astype('datetime64[us]')
+    return np.char.replace(np.datetime_as_string(moments, unit='us'), 'T', ' ').tolist()
+
+
+def format_dates(days):
+    """Format days since the Unix epoch as ISO dates"""
+    return np.datetime_as_string(np.asarray(days, dtype=np.int64).astype('datetime64[D]')).tolist()
+
+
+def get_columns(model, fields):
+    return [model._meta.get_field(field).column for field in fields]
+
+
+def copy_rows(cursor, table, columns, rows):
+    sql = f'COPY {table} ({columns}) FROM STDIN'
+    if hasattr(cursor, 'copy_expert'):
+        # psycopg2
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            [NULL if value is None else value for value in row] for row in rows
+        )
+        buffer.seek(0)
+        cursor.copy_expert(f"{sql} WITH (FORMAT csv, NULL '{NULL}')", buffer)
+    else:
+        with cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def write_rows(model, fields, rows):
+    """Insert tuples of plain values into ``fields`` of ``model``'s table,
+    with COPY on PostgreSQL"""
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = ', '.join(quote(column) for column in get_columns(model, fields))
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            copy_rows(cursor, table, columns, rows)
+        else:
+            placeholders = ', '.join(['%s'] * len(fields))
+            cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', rows)
+
+
+def write_tables(tables):
+    """Write ``{model: (fields, rows)}`` in one transaction"""
+    with transaction.atomic():
+        for model, (fields, rows) in tables.items():
+            write_rows(model, fields, rows)
+
+
+def get_user_rows(users):
+    """Return the fields and rows of ``users``, dicts of the values the
+    generator sets. Every other concrete User field takes its default, and
+    automatic timestamps take the join time"""
+    fields = User._meta.concrete_fields
+    defaults = [field.get_default() for field in fields]
+    stamped = [
+        getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False) for field in fields
+    ]
+    rows = [
+        tuple(
+            user[field.name] if field.name in user else user['date_joined'] if is_stamped else default
+            for field, default, is_stamped in zip(fields, defaults, stamped)
+        )
+        for user in users
+    ]
+    return [field.name for field in fields], rows
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+
+class Catalog:
+    """Ids, popularity, quality and genres of the generated titles.
+
+    Movies and TV shows share one item index; items below ``movies`` are
+    movies. Sampling is by popularity, overall or within a genre.
+    """
+
+    def __init__(self, movies, tv_shows, genre_ids, seed, exponent):
+        rng = np.random.default_rng([seed, 0])
+        count = movies + tv_shows
+        self.movies = movies
+        first_movie, first_tv_show = next_id(Movie), next_id(TVShow)
+        self.object_ids = np.concatenate([
+            np.arange(first_movie, first_movie + movies),
+            np.arange(first_tv_show, first_tv_show + tv_shows),
+        ])
+        self.genre_ids = np.array(genre_ids)
+        self.genre_popularity = zipf_weights(len(genre_ids), 1.0)
+        # Popularity rank is independent of the id
+        self.ranks = rng.permutation(count)
+        popularity = 1.0 / (self.ranks + 1.0) ** exponent
+        self.cumulative = np.cumsum(popularity)
+        self.quality = rng.normal(0, 0.6, count)
+
+        # One to three distinct genres per title, drawn by popularity
+        # (Gumbel top-k)
+        keys = np.log(self.genre_popularity) + rng.gumbel(size=(count, len(genre_ids)))
+        top = np.argsort(-keys, axis=1)[:, :3]
+        chosen = np.arange(3) < rng.choice([1, 2, 3], count, p=[0.35, 0.45, 0.2])[:, None]
+        self.genres = np.zeros((count, len(genre_ids)), dtype=bool)
+        self.genres[np.nonzero(chosen)[0], top[chosen]] = True
+        self.by_genre = []
+        for genre in range(len(genre_ids)):
+            items = np.flatnonzero(self.genres[:, genre])
+            self.by_genre.append((items, np.cumsum(popularity[items])))
+
+    def __len__(self):
+        return len(self.ranks)
+
+    def sample(self, rng, size, genre=None):
+        items, cumulative = (None, self.cumulative) if genre is None else self.by_genre[genre]
+        picks = np.searchsorted(cumulative, rng.random(size) * cumulative[-1], side='right')
+        picks = np.minimum(picks, len(cumulative) - 1)
+        return picks if items is None else items[picks]
+
+    def pick(self, rng, favourites, size, affinity):
+        """Return up to ``size`` distinct items, about ``affinity`` of them
+        from the ``favourites`` genres"""
+        size = min(size, len(self))
+        picked = np.empty(0, dtype=np.int64)
+        for _ in range(8):
+            missing = size - len(picked)
+            if missing <= 0:
+                break
+            draws = missing + missing // 2 + 8
+            genres = rng.choice(favourites, rng.binomial(draws, affinity))
+            candidates = [self.sample(rng, draws - len(genres))]
+            for genre in favourites:
+                wanted = int((genres == genre).sum())
+                if len(self.by_genre[genre][0]):
+                    candidates.append(self.sample(rng, wanted, genre))
+                else:
+                    candidates.append(self.sample(rng, wanted))
+            candidates = np.concatenate(candidates)
+            rng.shuffle(candidates)
+            candidates = np.concatenate([picked, candidates])
+            _, first = np.unique(candidates, return_index=True)
+            picked = candidates[np.sort(first)][:size]
+        return picked
+
+    def split(self, items):
+        """Return ``(movie_id, tv_show_id)`` pairs of items"""
+        return [
+            (object_id, None) if item < self.movies else (None, object_id)
+            for item, object_id in zip(items.tolist(), self.object_ids[items].tolist())
+        ]
+
+
+class Plan:
+    """Everything the workers need, inherited when they fork"""
+
+    def __init__(self, options, catalog, now, parallel_writes):
+        self.options = options
+        self.catalog = catalog
+        self.now = now
+        self.parallel_writes = parallel_writes
+        self.password = make_password(PASSWORD)
+
+
+_plan = None
+
+
+def set_plan(plan):
+    global _plan
+    _plan = plan
+
+
+def draw_counts(rng, size, mean, cap, spread=1.0):
+    """Log-normal activity per user averaging about ``mean``"""
+    counts = rng.lognormal(0, spread, size)
+    counts *= mean / counts.mean()
+    return np.clip(np.rint(counts), 1, max(1, cap)).astype(np.int64)
+
+
+def get_jobs(options, first_user_id, catalog_size):
+    rng = np.random.default_rng([options.seed, 1])
+    watchlist = draw_counts(rng, options.users, options.watchlist, catalog_size)
+    ratings = draw_counts(rng, options.users, options.ratings / options.users, catalog_size)
+    return [
+        Job(index, first_user_id + start, watchlist[start:start + options.chunk_size],
+            ratings[start:start + options.chunk_size])
+        for index, start in enumerate(range(0, options.users, options.chunk_size))
+    ]
+
+
+def pick_words(rng, counts, exponent=1.1):
+    """Return a string of Zipf-popular words for each count"""
+    words = np.array(WORDS)[
+        rng.choice(len(WORDS), int(counts.sum()), p=zipf_weights(len(WORDS), exponent))
+    ].tolist()
+    phrases = []
+    start = 0
+    for count in counts.tolist():
+        phrases.append(' '.join(words[start:start + count]))
+        start += count
+    return phrases
+
+
+def pick_names(rng, size):
+    first = rng.choice(len(FIRST_NAMES), size, p=zipf_weights(len(FIRST_NAMES), 0.8))
+    last = rng.choice(len(LAST_NAMES), size, p=zipf_weights(len(LAST_NAMES), 0.8))
+    return [f'{FIRST_NAMES[i]} {LAST_NAMES[j]}' for i, j in zip(first.tolist(), last.tolist())]
+
+
+def build_titles(plan, model, items):
+    """Return ``{model: (fields, rows)}`` of titles and their genres"""
+    rng = np.random.default_rng(
+        [plan.options.seed, 2, search.get_type_code(model), int(items[0])]
+    )
+    catalog = plan.catalog
+    size = len(items)
+    ids = catalog.object_ids[items].tolist()
+    titles = [title.title() for title in pick_words(rng, rng.integers(1, 5, size))]
+    genres = [np.flatnonzero(row).tolist() for row in catalog.genres[items]]
+    genre_names = [' '.join(GENRE_NAMES[genre].lower() for genre in row) for row in genres]
+    masks = [
+        sum(stats.genre_bit(int(catalog.genre_ids[genre])) for genre in row) for row in genres
+    ]
+    descriptions = [
+        f'{words} {genres}.'.capitalize()
+        for words, genres in zip(pick_words(rng, rng.integers(15, 35, size)), genre_names)
+    ]
+    today = int(plan.now // 86400)
+    # Skewed to recent releases, over up to 80 years
+    released = today - np.minimum(rng.exponential(3650, size), 80 * 365).astype(np.int64)
+    cast = pick_names(rng, size * 6)
+    cast_sizes = rng.integers(3, 7, size).tolist()
+    people = pick_names(rng, size)
+    certifications = rng.choice(CERTIFICATIONS[0], size, p=CERTIFICATIONS[1]).tolist()
+    ranks = catalog.ranks[items]
+    featured = (ranks < max(10, len(catalog) // 500)).tolist()
+    trending_flags = ((ranks < max(20, len(catalog) // 200)) & (rng.random(size) < 0.5)).tolist()
+    stamp = format_times(np.full(size, plan.now))
+    common = [
+        (
+            object_id, titles[i], descriptions[i], certifications[i],
+            f'https://example.com/posters/{object_id}.jpg',
+            f'https://example.com/backdrops/{object_id}.jpg', '',
+            json.dumps(cast[i * 6:i * 6 + cast_sizes[i]]), None, featured[i], trending_flags[i],
+            masks[i], 0.0, 0, 0, 0.0, stamp[i], stamp[i],
+        )
+        for i, object_id in enumerate(ids)
+    ]
+    fields = [
+        'id', 'title', 'description', 'rating', 'poster_url', 'backdrop_url', 'trailer_url',
+        'cast', 'tmdb_id', 'is_featured', 'is_trending', 'genre_mask', 'average_rating',
+        'rating_count', 'watchlist_count', 'trending_score', 'created_at', 'updated_at',
+    ]
+    if model is Movie:
+        fields += ['release_date', 'duration', 'director']
+        extra = zip(
+            format_dates(released), rng.integers(75, 181, size).tolist(), people
+        )
+    else:
+        seasons = np.minimum(rng.geometric(0.35, size), 20)
+        statuses = rng.choice(STATUSES[0], size, p=STATUSES[1])
+        last_aired = np.minimum(released + seasons * 365, today)
+        fields += [
+            'first_air_date', 'last_air_date', 'number_of_seasons', 'number_of_episodes',
+            'status', 'creator',
+        ]
+        extra = zip(
+            format_dates(released),
+            [None if status == 'ongoing' else date
+             for status, date in zip(statuses.tolist(), format_dates(last_aired))],
+            seasons.tolist(), (seasons * rng.integers(6, 25, size)).tolist(),
+            statuses.tolist(), people,
+        )
+    through = model.genres.through
+    genre_rows = [
+        (object_id, int(catalog.genre_ids[genre]))
+        for object_id, row in zip(ids, genres)
+        for genre in row
+    ]
+    return {
+        model: (fields, [row + more for row, more in zip(common, extra)]),
+        through: ([model._meta.model_name, 'genre'], genre_rows),
+    }
+
+
+def build_users(plan, job):
+    """Return ``{model: (fields, rows)}`` of a chunk of users and their
+    watchlist entries, ratings and taste profiles"""
+    options = plan.options
+    catalog = plan.catalog
+    rng = np.random.default_rng([options.seed, 3, job.index])
+    size = len(job.watchlist_counts)
+    user_ids = range(job.first_user_id, job.first_user_id + size)
+    window = options.days * 86400
+    joined = format_times(plan.now - rng.uniform(0, window * 2, size))
+    plans = rng.choice(PLANS[0], size, p=PLANS[1]).tolist()
+    users = [
+        {
+            'id': user_id, 'password': plan.password, 'username': f'synthetic{user_id}',
+            'email': f'synthetic{user_id}@example.com', 'date_joined': joined[i],
+            'subscription_plan': plans[i],
+        }
+        for i, user_id in enumerate(user_ids)
+    ]
+    watchlist = []
+    ratings = []
+    profiles = []
+    now = format_times(np.array([plan.now]))[0]
+    for user_id, watchlist_count, rating_count in zip(
+        user_ids, job.watchlist_counts.tolist(), job.rating_counts.tolist()
+    ):
+        favourites = rng.choice(
+            len(catalog.genre_ids), rng.integers(1, 4), replace=False, p=catalog.genre_popularity
+        )
+        overlap = rng.binomial(min(watchlist_count, rating_count), RATED_FROM_WATCHLIST)
+        picked = catalog.pick(
+            rng, favourites, watchlist_count + rating_count - overlap, options.affinity
+        )
+        saved = picked[:watchlist_count]
+        rated = picked[max(0, len(saved) - overlap):][:rating_count]
+
+        # Recent weeks are busiest
+        added = plan.now - np.minimum(rng.exponential(window / 4, len(saved)), window)
+        # Rated titles from the list were watched
+        watched = rng.random(len(saved)) < WATCHED_SHARE
+        watched[len(saved) - overlap:] = True
+        watched_at = added + rng.uniform(0, 1, len(saved)) * (plan.now - added)
+        added_text = format_times(added)
+        watched_text = format_times(watched_at)
+        for i, (movie_id, tv_show_id) in enumerate(catalog.split(saved)):
+            watchlist.append((
+                user_id, movie_id, tv_show_id, added_text[i], bool(watched[i]),
+                watched_text[i] if watched[i] else None,
+            ))
+
+        in_favourites = catalog.genres[rated][:, favourites].any(axis=1)
+        scores = np.clip(np.rint(
+            3 + catalog.quality[rated] + 0.8 * in_favourites + rng.normal(0, 0.4)
+            + rng.normal(0, 0.9, len(rated))
+        ), 1, 5).astype(np.int64)
+        created = format_times(plan.now - np.minimum(rng.exponential(window / 4, len(rated)), window))
+        reviewed = rng.random(len(rated)) < REVIEW_SHARE
+        reviews = iter(pick_words(rng, rng.integers(8, 25, int(reviewed.sum()))))
+        for i, (movie_id, tv_show_id) in enumerate(catalog.split(rated)):
+            ratings.append((
+                user_id, movie_id, tv_show_id, int(scores[i]),
+                next(reviews).capitalize() + '.' if reviewed[i] else '', created[i], created[i],
+            ))
+
+        # As taste.rebuild_profile would compute it from these rows
+        weights = catalog.genres[saved].T @ np.where(
+            watched, taste.WATCHED_WEIGHT, taste.WATCHLIST_WEIGHT
+        ) + catalog.genres[rated].T @ (scores - taste.NEUTRAL_RATING).astype(float)
+        profiles.append((user_id, json.dumps({
+            str(catalog.genre_ids[genre]): float(weights[genre])
+            for genre in np.flatnonzero(np.abs(weights) >= 1e-9)
+        }), now))
+
+    return {
+        User: get_user_rows(users),
+        UserWatchlist: (
+            ['user', 'movie', 'tv_show', 'added_at', 'is_watched', 'watched_at'], watchlist
+        ),
+        UserRating: (
+            ['user', 'movie', 'tv_show', 'rating', 'review', 'created_at', 'updated_at'], ratings
+        ),
+        UserTasteProfile: (['user', 'genre_weights', 'updated_at'], profiles),
+    }
+
+
+def count_rows(tables):
+    return {model: len(rows) for model, (_, rows) in tables.items()}
+
+
+def run_job(job):
+    tables = build_users(_plan, job)
+    if not _plan.parallel_writes:
+        return tables
+    write_tables(tables)
+    return count_rows(tables)
+
+
+def generate(options, workers=1, on_chunk=None):
+    """Write a synthetic dataset, returning the number of rows per model.
+
+    ``on_chunk`` is called with the running totals after every chunk.
+    """
+    genre_ids = [Genre.objects.get_or_create(name=name)[0].pk for name in GENRE_NAMES]
+    movies = round(options.titles * MOVIE_SHARE)
+    catalog = Catalog(
+        movies, options.titles - movies, genre_ids, options.seed, options.popularity
+    )
+    parallel_writes = workers > 1 and connection.vendor == 'postgresql'
+    plan = Plan(options, catalog, timezone.now().timestamp(), parallel_writes)
+    totals = {}
+
+    def add(counts):
+        for model, count in counts.items():
+            totals[model] = totals.get(model, 0) + count
+        if on_chunk:
+            on_chunk(totals)
+
+    for model, items in [
+        (Movie, np.arange(movies)), (TVShow, np.arange(movies, options.titles)),
+    ]:
+        for start in range(0, len(items), options.chunk_size * 10):
+            tables = build_titles(plan, model, items[start:start + options.chunk_size * 10])
+            write_tables(tables)
+            add(count_rows(tables))
+
+    jobs = get_jobs(options, next_id(User), len(catalog))
+    if workers > 1:
+        # Children must open connections of their own
+        connections.close_all()
+        # Workers inherit the plan rather than unpickling it
+        context = multiprocessing.get_context('fork')
+        with context.Pool(workers, initializer=set_plan, initargs=(plan,)) as pool:
+            for result in pool.imap(run_job, jobs):
+                if not parallel_writes:
+                    write_tables(result)
+                    result = count_rows(result)
+                add(result)
+    else:
+        set_plan(plan)
+        for job in jobs:
+            tables = run_job(job)
+            write_tables(tables)
+            add(count_rows(tables))
+
+    # Explicit ids leave PostgreSQL sequences behind
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Movie, TVShow, User]):
+            cursor.execute(sql)
+    return totals
+
+
+def finish(chunk_size=1000):
+    """Rebuild what signals would have kept current as the rows were written.
+
+    Genre masks are written with the titles, so only the rating and
+    watchlist aggregates are recomputed.
+    """
+    for model in (Movie, TVShow):
+        ids = list(model.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(ids), chunk_size):
+            stats.refresh_counts(model, ids[start:start + chunk_size])
+        search.rebuild_index(model)
+    trending.rebuild_buckets()
+    trending.compute_scores()
+    home.schedule_rebuild()
@@ -0,0 +1,164 @@
+"""Per-user taste profiles and the recommendation scoring built on them.
+
+A profile maps genre ids to weights. Every watchlist entry and rating
+contributes its weight to each genre of the title it points at: a
+watchlist entry counts once (more once watched) and a rating counts by how
+far it sits from a neutral three stars, so a one star rating pushes its
+genres down. Writes apply the difference between a row's old and new
+contribution, so a profile never has to be rebuilt from history.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from . import library, search
+from .models import Movie, TVShow, UserRating, UserTasteProfile, UserWatchlist
+
+WATCHLIST_WEIGHT = 1.0
+WATCHED_WEIGHT = 1.5
+NEUTRAL_RATING = 3
+
+
+def watchlist_weight(is_watched):
+    return WATCHED_WEIGHT if is_watched else WATCHLIST_WEIGHT
+
+
+def rating_weight(rating):
+    return float(rating - NEUTRAL_RATING)
+
+
+def get_genre_ids(model, object_ids):
+    """Return ``{object_id: [genre_id, ...]}`` from the genre through table"""
+    through = model.genres.through
+    fk = f'{model._meta.model_name}_id'
+    genres = defaultdict(list)
+    rows = through.objects.filter(**{f'{fk}__in': object_ids}).values_list(fk, 'genre_id')
+    for object_id, genre_id in rows:
+        genres[object_id].append(genre_id)
+    return genres
+
+
+def genre_deltas(changes):
+    """Turn ``(movie_id, tv_show_id, weight)`` changes into genre deltas"""
+    deltas = defaultdict(float)
+    for model, index in [(Movie, 0), (TVShow, 1)]:
+        weights = defaultdict(float)
+        for change in changes:
+            if change[index]:
+                weights[change[index]] += change[2]
+        if not weights:
+            continue
+        for object_id, genre_ids in get_genre_ids(model, list(weights)).items():
+            for genre_id in genre_ids:
+                deltas[genre_id] += weights[object_id]
+    return deltas
+
+
+def merge_weights(weights, deltas):
+    for genre_id, delta in deltas.items():
+        key = str(genre_id)
+        value = weights.get(key, 0.0) + delta
+        if abs(value) < 1e-9:
+            weights.pop(key, None)
+        else:
+            weights[key] = value
+    return weights
+
+
+def apply_changes(user_id, changes):
+    """Add ``(movie_id, tv_show_id, weight)`` contributions to a profile.
+
+    Users without a profile are skipped; their profile is built from
+    scratch the first time it is read.
+    """
+    deltas = genre_deltas(changes)
+    if not deltas:
+        return
+    with transaction.atomic():
+        profile = UserTasteProfile.objects.select_for_update().filter(user_id=user_id).first()
+        if profile is None:
+            return
+        merge_weights(profile.genre_weights, deltas)
+        profile.save(update_fields=['genre_weights', 'updated_at'])
+
+
+def collect_changes(user_id):
+    """Return the contribution of every watchlist entry and rating of a user"""
+    changes = [
+        (movie_id, tv_show_id, watchlist_weight(is_watched))
+        for movie_id, tv_show_id, is_watched in UserWatchlist.objects.filter(
+            user_id=user_id
+        ).values_list('movie_id', 'tv_show_id', 'is_watched')
+    ]
+    changes += [
+        (movie_id, tv_show_id, rating_weight(rating))
+        for movie_id, tv_show_id, rating in UserRating.objects.filter(
+            user_id=user_id
+        ).values_list('movie_id', 'tv_show_id', 'rating')
+    ]
+    return changes
+
+
+def rebuild_profile(user_id):
+    weights = merge_weights({}, genre_deltas(collect_changes(user_id)))
+    profile, _ = UserTasteProfile.objects.update_or_create(
+        user_id=user_id, defaults={'genre_weights': weights}
+    )
+    return profile
+
+
+def get_weights(user_id):
+    """Return ``{genre_id: weight}`` for a user, building the profile if needed"""
+    profile = UserTasteProfile.objects.filter(user_id=user_id).first()
+    if profile is None:
+        profile = rebuild_profile(user_id)
+    return {int(genre_id): weight for genre_id, weight in profile.genre_weights.items()}
+
+
+def get_seen_ids(user_id, model):
+    """Return the ids of titles a user already has on their list or rated"""
+    return library.get_library(user_id).get_ids(search.get_type_code(model))
+
+
+def recommend(user_id, model, limit, weights, genre_ids=None):
+    """Return up to ``limit`` title ids ranked by the user's genre weights.
+
+    Candidates are the most recently added titles in ``genre_ids`` (the
+    user's best genres by default). They are read from the genre through
+    table alone and scored in Python by the summed weight of their
+    matching genres, so no content table is joined. An empty
+    ``genre_ids`` matches nothing.
+    """
+    if genre_ids is not None and not genre_ids:
+        return []
+    seen = get_seen_ids(user_id, model)
+    if genre_ids is None:
+        liked = sorted(
+            (genre_id for genre_id, weight in weights.items() if weight > 0),
+            key=lambda genre_id: -weights[genre_id]
+        )
+        genre_ids = liked[:getattr(settings, 'RECOMMENDATION_TOP_GENRES', 5)]
+        if not genre_ids:
+            # No history yet: newest titles the user has not seen
+            return list(
+                model.objects.exclude(id__in=seen).values_list('id', flat=True)[:limit]
+            )
+
+    through = model.genres.through
+    fk = f'{model._meta.model_name}_id'
+    pool = getattr(settings, 'RECOMMENDATION_CANDIDATES', 1000)
+    rows = (
+        through.objects.filter(genre_id__in=genre_ids)
+        .order_by(f'-{fk}').values_list(fk, 'genre_id')[:pool]
+    )
+    # Titles matching an explicitly requested genre still need a score
+    # above zero to be ranked
+    scores = defaultdict(float)
+    for object_id, genre_id in rows:
+        if object_id not in seen:
+            scores[object_id] += weights.get(genre_id, 0.0) + 1e-3
+
+    # Highest score first, newest title first among equals
+    ranked = sorted(scores, key=lambda object_id: (-scores[object_id], -object_id))
+    return ranked[:limit]
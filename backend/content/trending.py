@@ -0,0 +1,157 @@
+"""Trending scores built from hourly buckets of watchlist and rating activity.
+
+Every watchlist add, watch and rating adds its weight to the bucket of its
+title and hour as it happens, so a bucket table holds the last
+``TRENDING_WINDOW_HOURS`` of activity already aggregated. ``compute_scores``
+decays each bucket by its age (halving every ``TRENDING_HALF_LIFE_HOURS``),
+sums them per title into ``trending_score`` and drops buckets that left the
+window. It reads only the window's buckets, so it can run every few minutes
+from ``compute_trending``, and requests read the top titles off the
+``trending_score`` index.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import search
+from .models import Movie, TrendingBucket, TVShow, UserRating, UserWatchlist
+
+ADDED_WEIGHT = 1.0
+WATCHED_WEIGHT = 2.0
+RATED_WEIGHT = 1.5
+
+
+def get_window():
+    return getattr(settings, 'TRENDING_WINDOW_HOURS', 168)
+
+
+def get_half_life():
+    return getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24)
+
+
+def get_hour(moment):
+    """Return the bucket of a timestamp: whole hours since the Unix epoch"""
+    return int(moment.timestamp() // 3600)
+
+
+def hour_start(hour):
+    return datetime.fromtimestamp(hour * 3600, tz=dt_timezone.utc)
+
+
+def record_events(events):
+    """Add ``(content key, timestamp, weight)`` events to their hourly buckets"""
+    buckets = defaultdict(float)
+    for key, moment, weight in events:
+        buckets[key, get_hour(moment or timezone.now())] += weight
+    if not buckets:
+        return
+    table = TrendingBucket._meta.db_table
+    with connection.cursor() as cursor:
+        # Concurrent writers add to the same bucket, so this has to be an
+        # upsert that sums rather than bulk_create's overwrite
+        cursor.executemany(
+            f'INSERT INTO {table} (content_key, hour, score) VALUES (%s, %s, %s) '
+            'ON CONFLICT (content_key, hour) DO UPDATE SET score = '
+            f'{table}.score + excluded.score',
+            [(key, hour, score) for (key, hour), score in buckets.items()]
+        )
+
+
+def get_watchlist_events(row, created, was_watched=False):
+    """Return the events of a saved watchlist row"""
+    key = search.get_row_key(row.movie_id, row.tv_show_id)
+    events = []
+    if created:
+        events.append((key, row.added_at, ADDED_WEIGHT))
+    if row.is_watched and not was_watched:
+        events.append((key, row.watched_at, WATCHED_WEIGHT))
+    return events
+
+
+def get_rating_events(row):
+    return [(search.get_row_key(row.movie_id, row.tv_show_id), row.created_at, RATED_WEIGHT)]
+
+
+def decay(age, half_life):
+    """Return the weight left after ``age`` hours"""
+    return 0.5 ** (age / half_life)
+
+
+def compute_scores(now=None):
+    """Recompute ``trending_score`` of every title, returning how many trend"""
+    now = (now or timezone.now()).timestamp() / 3600
+    start = int(now) - get_window()
+    half_life = get_half_life()
+    # Every bucket of an hour decays alike, so work the factors out once
+    factors = {hour: decay(now - hour, half_life) for hour in range(start, int(now) + 1)}
+    scores = defaultdict(float)
+    with transaction.atomic():
+        TrendingBucket.objects.filter(hour__lt=start).delete()
+        for key, hour, score in TrendingBucket.objects.values_list(
+            'content_key', 'hour', 'score'
+        ).iterator(chunk_size=5000):
+            factor = factors.get(hour)
+            if factor is None:
+                factor = decay(now - hour, half_life)
+            scores[key] += score * factor
+
+        for model in (Movie, TVShow):
+            type_code = search.get_type_code(model)
+            model.objects.filter(trending_score__gt=0).update(trending_score=0)
+            # Keys of deleted titles match no row and are skipped
+            model.objects.bulk_update(
+                [
+                    model(pk=key // 2, trending_score=score)
+                    for key, score in scores.items() if key % 2 == type_code
+                ],
+                ['trending_score'], batch_size=500
+            )
+    return sum(1 for score in scores.values() if score > 0)
+
+
+def rebuild_buckets(now=None, chunk_size=5000):
+    """Refill the window's buckets from the watchlist and rating tables"""
+    start = hour_start(get_hour(now or timezone.now()) - get_window())
+    with transaction.atomic():
+        TrendingBucket.objects.all().delete()
+        sources = [
+            (UserWatchlist, 'added_at', ADDED_WEIGHT),
+            (UserWatchlist, 'watched_at', WATCHED_WEIGHT),
+            (UserRating, 'created_at', RATED_WEIGHT),
+        ]
+        for model, field, weight in sources:
+            rows = model.objects.filter(**{f'{field}__gte': start}).values_list(
+                'movie_id', 'tv_show_id', field
+            ).iterator(chunk_size=chunk_size)
+            batch = []
+            for movie_id, tv_show_id, moment in rows:
+                batch.append((search.get_row_key(movie_id, tv_show_id), moment, weight))
+                if len(batch) == chunk_size:
+                    record_events(batch)
+                    batch = []
+            record_events(batch)
+
+
+def get_trending(queryset, limit):
+    """Return the first ``limit`` rows of ``queryset``, most trending first.
+
+    Until scores have been computed the titles flagged ``is_trending`` are
+    returned instead.
+    """
+    titles = list(queryset.filter(trending_score__gt=0).order_by('-trending_score', '-id')[:limit])
+    if not titles:
+        titles = list(queryset.filter(is_trending=True)[:limit])
+    return titles
+
+
+async def aget_trending(queryset, limit):
+    titles = [
+        title async for title in
+        queryset.filter(trending_score__gt=0).order_by('-trending_score', '-id')[:limit]
+    ]
+    if not titles:
+        titles = [title async for title in queryset.filter(is_trending=True)[:limit]]
+    return titles
@@ -1,34 +1,55 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'content'
 
+# ASGI deployments serve the read-only endpoints from async views
+if getattr(settings, 'CONTENT_ASYNC_VIEWS', False):
+    from . import async_views
+    movie_detail = async_views.movie_detail
+    tv_show_detail = async_views.tv_show_detail
+    featured_content = async_views.featured_content
+    new_releases = async_views.new_releases
+    trending_content = async_views.trending_content
+    content_search = async_views.content_search
+else:
+    movie_detail = views.MovieDetailView.as_view()
+    tv_show_detail = views.TVShowDetailView.as_view()
+    featured_content = views.FeaturedContentView.as_view()
+    new_releases = views.new_releases_view
+    trending_content = views.trending_content_view
+    content_search = views.ContentSearchView.as_view()
+
 urlpatterns = [
     # Genres
     path('genres/', views.GenreListView.as_view(), name='genre-list'),
     
     # Movies
     path('movies/', views.MovieListView.as_view(), name='movie-list'),
-    path('movies/<int:pk>/', views.MovieDetailView.as_view(), name='movie-detail'),
+    path('movies/<int:pk>/', movie_detail, name='movie-detail'),
     
     # TV Shows
     path('tv-shows/', views.TVShowListView.as_view(), name='tv-show-list'),
-    path('tv-shows/<int:pk>/', views.TVShowDetailView.as_view(), name='tv-show-detail'),
+    path('tv-shows/<int:pk>/', tv_show_detail, name='tv-show-detail'),
     
     # Featured and trending content
-    path('featured/', views.FeaturedContentView.as_view(), name='featured-content'),
-    path('new-releases/', views.new_releases_view, name='new-releases'),
-    path('trending/', views.trending_content_view, name='trending-content'),
+    path('home/', views.HomeRowsView.as_view(), name='home-rows'),
+    path('featured/', featured_content, name='featured-content'),
+    path('new-releases/', new_releases, name='new-releases'),
+    path('trending/', trending_content, name='trending-content'),
     
     # Search and recommendations
-    path('search/', views.ContentSearchView.as_view(), name='content-search'),
+    path('search/', content_search, name='content-search'),
     path('recommendations/', views.ContentRecommendationView.as_view(), name='content-recommendations'),
     
     # User watchlist
     path('watchlist/', views.UserWatchlistView.as_view(), name='user-watchlist'),
+    path('watchlist/batch/', views.UserWatchlistBatchView.as_view(), name='user-watchlist-batch'),
     path('watchlist/<int:pk>/', views.UserWatchlistDetailView.as_view(), name='user-watchlist-detail'),
     
     # User ratings
     path('ratings/', views.UserRatingView.as_view(), name='user-ratings'),
+    path('ratings/batch/', views.UserRatingBatchView.as_view(), name='user-ratings-batch'),
     path('ratings/<int:pk>/', views.UserRatingDetailView.as_view(), name='user-rating-detail'),
 ] 
\ No newline at end of file
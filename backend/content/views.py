@@ -1,18 +1,29 @@
 from django.shortcuts import render
 from rest_framework import status, generics, permissions, filters
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.http import HttpResponse, HttpResponseNotModified
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from datetime import datetime
 
 from .models import Movie, TVShow, Genre, UserWatchlist, UserRating
+from . import batch, compiled, conditional, library, search, similarity, stats, taste, trending
+from .filters import MovieFilter, TVShowFilter
+from backend.instrumentation import span
+
+from .home import get_home_rows
+from .pagination import ContentListPagination, encode_cursor
+from .renderers import CONTENT_RENDERERS
 from .serializers import (
     MovieSerializer, TVShowSerializer, GenreSerializer,
     UserWatchlistSerializer, UserRatingSerializer,
-    ContentSearchSerializer, ContentRecommendationSerializer
+    ContentSearchSerializer, ContentRecommendationSerializer, BatchWriteSerializer,
+    UserWatchlistListSerializer, UserWatchlistCardSerializer,
+    UserRatingListSerializer, UserRatingCardSerializer
 )
 
 
@@ -21,16 +32,58 @@ class GenreListView(generics.ListAPIView):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = [permissions.AllowAny]
+    renderer_classes = CONTENT_RENDERERS
+    
+    def list(self, request, *args, **kwargs):
+        # The validators always cover the genre table
+        return conditional.respond(
+            request, 'genres', [], lambda: super(GenreListView, self).list(request, *args, **kwargs)
+        )
+
+
+def get_user_state_context(request):
+    """Return serializer context adding per-title state for signed-in users"""
+    if request.user.is_authenticated:
+        return {'request': request, 'library': library.get_library(request.user.id)}
+    return {'request': request}
+
+
+class UserStateContextMixin:
+    """Gives content serializers the authenticated user's cached library"""
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context.update(get_user_state_context(self.request))
+        return context
+
+
+class CompiledListMixin:
+    """Shapes and serializes list pages through ``compiled.prepare``, so pages
+    are built from column tuples when fast serialization is on"""
+    
+    def list(self, request, *args, **kwargs):
+        queryset, serialize = compiled.prepare(
+            self.get_serializer_class(), self.filter_queryset(self.get_queryset())
+        )
+        context = self.get_serializer_context()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize(page, context))
+        return Response(serialize(queryset, context))
 
 
-class MovieListView(generics.ListAPIView):
+class MovieListView(CompiledListMixin, UserStateContextMixin, generics.ListAPIView):
     """View for listing movies with filtering and search"""
     serializer_class = MovieSerializer
+    pagination_class = ContentListPagination
     permission_classes = [permissions.AllowAny]
+    renderer_classes = CONTENT_RENDERERS
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['genres', 'rating', 'is_featured', 'is_trending']
+    filterset_class = MovieFilter
     search_fields = ['title', 'description', 'director']
-    ordering_fields = ['title', 'release_date', 'duration']
+    ordering_fields = [
+        'title', 'release_date', 'duration', 'average_rating', 'rating_count', 'watchlist_count'
+    ]
     ordering = ['-release_date']
     
     def get_queryset(self):
@@ -44,26 +97,48 @@ class MovieListView(generics.ListAPIView):
         # Filter by genre name
         genre_name = self.request.query_params.get('genre_name', None)
         if genre_name:
-            queryset = queryset.filter(genres__name__icontains=genre_name)
+            queryset = stats.filter_by_genre_name(queryset, genre_name)
         
         return queryset
 
 
-class MovieDetailView(generics.RetrieveAPIView):
+class ConditionalRetrieveMixin:
+    """Answers detail requests with 304 while the title is unchanged"""
+    
+    def retrieve(self, request, *args, **kwargs):
+        versions = conditional.get_versions(
+            self.queryset.model.objects.filter(pk=kwargs[self.lookup_field])
+        )
+        if not versions:
+            return super().retrieve(request, *args, **kwargs)
+        return conditional.respond(request, 'detail', [versions], self.retrieve_title)
+    
+    def retrieve_title(self):
+        with span('serializer'):
+            return super().retrieve(self.request, *self.args, **self.kwargs)
+
+
+class MovieDetailView(ConditionalRetrieveMixin, UserStateContextMixin, generics.RetrieveAPIView):
     """View for getting movie details"""
-    queryset = Movie.objects.all()
+    queryset = MovieSerializer.setup_eager_loading(Movie.objects.all())
     serializer_class = MovieSerializer
     permission_classes = [permissions.AllowAny]
+    renderer_classes = CONTENT_RENDERERS
 
 
-class TVShowListView(generics.ListAPIView):
+class TVShowListView(CompiledListMixin, UserStateContextMixin, generics.ListAPIView):
     """View for listing TV shows with filtering and search"""
     serializer_class = TVShowSerializer
+    pagination_class = ContentListPagination
     permission_classes = [permissions.AllowAny]
+    renderer_classes = CONTENT_RENDERERS
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['genres', 'rating', 'is_featured', 'is_trending', 'status']
+    filterset_class = TVShowFilter
     search_fields = ['title', 'description', 'creator']
-    ordering_fields = ['title', 'first_air_date', 'number_of_seasons']
+    ordering_fields = [
+        'title', 'first_air_date', 'number_of_seasons', 'average_rating', 'rating_count',
+        'watchlist_count'
+    ]
     ordering = ['-first_air_date']
     
     def get_queryset(self):
@@ -77,91 +152,177 @@ class TVShowListView(generics.ListAPIView):
         # Filter by genre name
         genre_name = self.request.query_params.get('genre_name', None)
         if genre_name:
-            queryset = queryset.filter(genres__name__icontains=genre_name)
+            queryset = stats.filter_by_genre_name(queryset, genre_name)
         
         return queryset
 
 
-class TVShowDetailView(generics.RetrieveAPIView):
+class TVShowDetailView(ConditionalRetrieveMixin, UserStateContextMixin, generics.RetrieveAPIView):
     """View for getting TV show details"""
-    queryset = TVShow.objects.all()
+    queryset = TVShowSerializer.setup_eager_loading(TVShow.objects.all())
     serializer_class = TVShowSerializer
     permission_classes = [permissions.AllowAny]
+    renderer_classes = CONTENT_RENDERERS
 
 
 class FeaturedContentView(APIView):
     """View for getting featured content"""
     permission_classes = [permissions.AllowAny]
+    renderer_classes = CONTENT_RENDERERS
     
     def get(self, request):
-        featured_movies = Movie.objects.filter(is_featured=True)[:5]
-        featured_tv_shows = TVShow.objects.filter(is_featured=True)[:5]
-        trending_movies = Movie.objects.filter(is_trending=True)[:5]
-        trending_tv_shows = TVShow.objects.filter(is_trending=True)[:5]
-        
-        return Response({
-            'featured_movies': MovieSerializer(featured_movies, many=True).data,
-            'featured_tv_shows': TVShowSerializer(featured_tv_shows, many=True).data,
-            'trending_movies': MovieSerializer(trending_movies, many=True).data,
-            'trending_tv_shows': TVShowSerializer(trending_tv_shows, many=True).data,
-        })
+        rows = {
+            'featured_movies': conditional.get_versions(Movie.objects.filter(is_featured=True), 5),
+            'featured_tv_shows': conditional.get_versions(TVShow.objects.filter(is_featured=True), 5),
+            'trending_movies': trending.get_trending(
+                Movie.objects.values_list(*conditional.VERSION_FIELDS), 5
+            ),
+            'trending_tv_shows': trending.get_trending(
+                TVShow.objects.values_list(*conditional.VERSION_FIELDS), 5
+            ),
+        }
+        return conditional.respond(
+            request, 'featured', list(rows.values()), lambda: serialize_rows(request, rows)
+        )
+
+
+def serialize_titles(serializer_class, ids, context=None):
+    """Return ``{id: serialized title}`` for those of ``ids`` that exist"""
+    queryset, serialize = compiled.prepare(
+        serializer_class, serializer_class.Meta.model.objects.filter(pk__in=ids)
+    )
+    return {data['id']: data for data in serialize(queryset, context)}
+
+
+def serialize_rows(request, rows):
+    """Serialize ``{name: version rows}`` lists of movies or TV shows.
+
+    Lists of one model share one fetch, so overlapping rows load once.
+    """
+    context = get_user_state_context(request)
+    data = {}
+    for model, serializer_class in [(Movie, MovieSerializer), (TVShow, TVShowSerializer)]:
+        names = [name for name in rows if ('movies' in name) == (model is Movie)]
+        ids = {object_id for name in names for object_id in conditional.get_ids(rows[name])}
+        titles = serialize_titles(serializer_class, ids, context) if ids else {}
+        for name in names:
+            data[name] = [
+                titles[object_id] for object_id in conditional.get_ids(rows[name])
+                if object_id in titles
+            ]
+    return Response(data)
+
+
+class HomeRowsView(APIView):
+    """View for the precomputed home page rows in a single payload"""
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        entry = get_home_rows()
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if entry['etag'] in etags or '*' in etags:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(entry['body'], content_type='application/json')
+        response['ETag'] = entry['etag']
+        patch_cache_control(response, public=True, max_age=conditional.get_lifetime('home'))
+        return response
+
+
+def run_search(data):
+    """Run a search from validated ``ContentSearchSerializer`` data"""
+    content_type = data.get('content_type')
+    genre = data.get('genre')
+    year = data.get('year')
+    
+    querysets = {}
+    genre_ids = None
+    if genre:
+        genre_ids = list(
+            Genre.objects.filter(name__icontains=genre).values_list('id', flat=True)
+        )
+    
+    # Search movies
+    if not content_type or content_type == 'movie':
+        movies = Movie.objects.all()
+        if genre:
+            movies = stats.filter_by_genres(movies, genre_ids)
+        if year:
+            movies = movies.filter(release_date__year=year)
+        querysets[search.MOVIE] = movies
+    
+    # Search TV shows
+    if not content_type or content_type == 'tv_show':
+        tv_shows = TVShow.objects.all()
+        if genre:
+            tv_shows = stats.filter_by_genres(tv_shows, genre_ids)
+        if year:
+            tv_shows = tv_shows.filter(first_air_date__year=year)
+        querysets[search.TV_SHOW] = tv_shows
+    
+    return search.search_content(
+        data['query'], querysets, data.get('page_size', 20),
+        page=data.get('page', 1), after=data.get('cursor')
+    )
+
+
+SEARCH_TYPES = {
+    search.MOVIE: ('movie', MovieSerializer),
+    search.TV_SHOW: ('tv_show', TVShowSerializer),
+}
+
+
+def get_search_payload(result_page, serialized):
+    """Return the search response for a page and its ``{(type code, id): data}``"""
+    return {
+        'count': result_page.count,
+        'count_is_capped': result_page.count_is_capped,
+        'next_cursor': (
+            encode_cursor(result_page.next_position)
+            if result_page.next_position else None
+        ),
+        'results': [
+            {
+                'content_type': SEARCH_TYPES[type_code][0],
+                'score': score,
+                'content': serialized[type_code, object_id],
+            }
+            for type_code, object_id, score in result_page.matches
+            if (type_code, object_id) in serialized
+        ],
+    }
 
 
 class ContentSearchView(APIView):
-    """View for searching content"""
+    """View for searching movies and TV shows as one ranked result set"""
     permission_classes = [permissions.AllowAny]
     
     def post(self, request):
         serializer = ContentSearchSerializer(data=request.data)
         if serializer.is_valid():
-            query = serializer.validated_data['query']
-            content_type = serializer.validated_data.get('content_type')
-            genre = serializer.validated_data.get('genre')
-            year = serializer.validated_data.get('year')
-            page = serializer.validated_data.get('page', 1)
-            page_size = serializer.validated_data.get('page_size', 20)
-            
-            # Build search query
-            search_query = Q(title__icontains=query) | Q(description__icontains=query)
-            
-            results = {}
-            
-            # Search movies
-            if not content_type or content_type == 'movie':
-                movies = Movie.objects.filter(search_query)
-                if genre:
-                    movies = movies.filter(genres__name__icontains=genre)
-                if year:
-                    movies = movies.filter(release_date__year=year)
-                
-                start = (page - 1) * page_size
-                end = start + page_size
-                results['movies'] = {
-                    'count': movies.count(),
-                    'results': MovieSerializer(movies[start:end], many=True).data
-                }
-            
-            # Search TV shows
-            if not content_type or content_type == 'tv_show':
-                tv_shows = TVShow.objects.filter(search_query)
-                if genre:
-                    tv_shows = tv_shows.filter(genres__name__icontains=genre)
-                if year:
-                    tv_shows = tv_shows.filter(first_air_date__year=year)
-                
-                start = (page - 1) * page_size
-                end = start + page_size
-                results['tv_shows'] = {
-                    'count': tv_shows.count(),
-                    'results': TVShowSerializer(tv_shows[start:end], many=True).data
-                }
-            
-            return Response(results, status=status.HTTP_200_OK)
+            result_page = run_search(serializer.validated_data)
+            serialized = self.serialize_matches(
+                result_page.matches, get_user_state_context(request)
+            )
+            return Response(get_search_payload(result_page, serialized), status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    def serialize_matches(self, matches, context=None):
+        """Load and serialize each content type in one pass, returning
+        ``{(type code, id): data}``"""
+        serialized = {}
+        for type_code, (name, serializer_class) in SEARCH_TYPES.items():
+            ids = [object_id for code, object_id, _ in matches if code == type_code]
+            if not ids:
+                continue
+            titles = serialize_titles(serializer_class, ids, context)
+            serialized.update(((type_code, object_id), data) for object_id, data in titles.items())
+        return serialized
 
 
 class ContentRecommendationView(APIView):
-    """View for getting content recommendations"""
+    """View for getting content recommendations ranked by item similarity,
+    topped up from the user's taste profile"""
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request):
@@ -172,62 +333,110 @@ class ContentRecommendationView(APIView):
             limit = serializer.validated_data.get('limit', 10)
             
             recommendations = {}
-            
-            # Get user's watch history
-            user_watchlist = UserWatchlist.objects.filter(user=request.user)
-            watched_movies = user_watchlist.filter(movie__isnull=False).values_list('movie__genres__name', flat=True)
-            watched_tv_shows = user_watchlist.filter(tv_show__isnull=False).values_list('tv_show__genres__name', flat=True)
+            self.similarity_model = similarity.get_model()
+            self.affinities = None
+            self.weights = None
+            genre_ids = None
+            if genre:
+                genre_ids = list(
+                    Genre.objects.filter(name__icontains=genre).values_list('id', flat=True)
+                )
             
             # Recommend movies
             if not content_type or content_type == 'movie':
-                movie_recommendations = Movie.objects.exclude(
-                    id__in=user_watchlist.filter(movie__isnull=False).values_list('movie_id', flat=True)
-                )
-                
-                if genre:
-                    movie_recommendations = movie_recommendations.filter(genres__name__icontains=genre)
-                elif watched_movies:
-                    # Recommend based on user's preferred genres
-                    movie_recommendations = movie_recommendations.filter(
-                        genres__name__in=watched_movies
-                    ).distinct()
-                
-                recommendations['movies'] = MovieSerializer(
-                    movie_recommendations[:limit], many=True
-                ).data
+                movie_ids = self.get_recommended_ids(Movie, limit, genre_ids)
+                with span('serializer'):
+                    recommendations['movies'] = MovieSerializer(
+                        search.fetch_in_order(
+                            MovieSerializer.setup_eager_loading(Movie.objects.all()), movie_ids
+                        ),
+                        many=True
+                    ).data
             
             # Recommend TV shows
             if not content_type or content_type == 'tv_show':
-                tv_recommendations = TVShow.objects.exclude(
-                    id__in=user_watchlist.filter(tv_show__isnull=False).values_list('tv_show_id', flat=True)
-                )
-                
-                if genre:
-                    tv_recommendations = tv_recommendations.filter(genres__name__icontains=genre)
-                elif watched_tv_shows:
-                    # Recommend based on user's preferred genres
-                    tv_recommendations = tv_recommendations.filter(
-                        genres__name__in=watched_tv_shows
-                    ).distinct()
-                
-                recommendations['tv_shows'] = TVShowSerializer(
-                    tv_recommendations[:limit], many=True
-                ).data
+                tv_show_ids = self.get_recommended_ids(TVShow, limit, genre_ids)
+                with span('serializer'):
+                    recommendations['tv_shows'] = TVShowSerializer(
+                        search.fetch_in_order(
+                            TVShowSerializer.setup_eager_loading(TVShow.objects.all()), tv_show_ids
+                        ),
+                        many=True
+                    ).data
             
             return Response(recommendations, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    def get_recommended_ids(self, model, limit, genre_ids):
+        user_id = self.request.user.id
+        ids = []
+        if self.similarity_model is not None:
+            if self.affinities is None:
+                self.affinities = similarity.get_user_affinities(user_id)
+            ids = similarity.recommend(
+                self.similarity_model, self.affinities, search.get_type_code(model)
+            )
+            ids = similarity.keep_existing(model, ids, limit, genre_ids)
+        
+        # Titles nobody has paired with the user's yet come from their profile
+        if len(ids) < limit:
+            if self.weights is None:
+                self.weights = taste.get_weights(user_id)
+            chosen = set(ids)
+            ids += [
+                object_id
+                for object_id in taste.recommend(user_id, model, limit, self.weights, genre_ids)
+                if object_id not in chosen
+            ][:limit - len(ids)]
+        return ids
+
+
+class CompactListMixin:
+    """Lists that serve content cards instead of the full content on request.
+
+    GET requests are serialized with ``list_serializer_class``, which keeps
+    the full nested content, or with ``card_serializer_class`` when
+    ``?view=card`` is passed, and ``?fields=`` trims the top-level fields.
+    The queryset is shaped to load only what the chosen representation
+    reads.
+    """
+    list_serializer_class = None
+    card_serializer_class = None
+    
+    def get_serializer_class(self):
+        if self.request.method != 'GET':
+            return super().get_serializer_class()
+        if self.request.query_params.get('view') == 'card':
+            return self.card_serializer_class
+        return self.list_serializer_class
+    
+    def list(self, request, *args, **kwargs):
+        with span('serializer'):
+            return super().list(request, *args, **kwargs)
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        serializer_class = self.get_serializer_class()
+        return serializer_class.setup_eager_loading(
+            queryset, fields=serializer_class.get_requested_fields(self.request)
+        )
 
 
-class UserWatchlistView(generics.ListCreateAPIView):
+class UserWatchlistView(CompactListMixin, generics.ListCreateAPIView):
     """View for user watchlist management"""
+    queryset = UserWatchlist.objects.all()
     serializer_class = UserWatchlistSerializer
+    list_serializer_class = UserWatchlistListSerializer
+    card_serializer_class = UserWatchlistCardSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return UserWatchlist.objects.filter(user=self.request.user)
+        return super().get_queryset().filter(user_id=self.request.user.id).order_by('-added_at', '-id')
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user_id=self.request.user.id)
 
 
 class UserWatchlistDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -236,19 +445,42 @@ class UserWatchlistDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return UserWatchlist.objects.filter(user=self.request.user)
+        return UserWatchlist.objects.filter(user_id=self.request.user.id)
+
+
+class BatchWriteView(APIView):
+    """Base view applying a batch of operations with per-item results"""
+    permission_classes = [permissions.IsAuthenticated]
+    writer_class = None
+    
+    def post(self, request):
+        serializer = BatchWriteSerializer(data=request.data)
+        if serializer.is_valid():
+            results = self.writer_class(request.user.id).run(
+                serializer.validated_data['operations']
+            )
+            return Response({'results': results}, status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserRatingView(generics.ListCreateAPIView):
+class UserWatchlistBatchView(BatchWriteView):
+    """View for adding, removing and marking watched many watchlist items at once"""
+    writer_class = batch.WatchlistBatchWriter
+
+
+class UserRatingView(CompactListMixin, generics.ListCreateAPIView):
     """View for user ratings"""
+    queryset = UserRating.objects.all()
     serializer_class = UserRatingSerializer
+    list_serializer_class = UserRatingListSerializer
+    card_serializer_class = UserRatingCardSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return UserRating.objects.filter(user=self.request.user)
+        return super().get_queryset().filter(user_id=self.request.user.id).order_by('-updated_at', '-id')
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user_id=self.request.user.id)
 
 
 class UserRatingDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -257,33 +489,51 @@ class UserRatingDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return UserRating.objects.filter(user=self.request.user)
+        return UserRating.objects.filter(user_id=self.request.user.id)
+
+
+class UserRatingBatchView(BatchWriteView):
+    """View for rating and removing ratings of many titles at once"""
+    writer_class = batch.RatingBatchWriter
 
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@renderer_classes(CONTENT_RENDERERS)
 def new_releases_view(request):
     """View for getting new releases"""
     # Get movies and TV shows from the last 30 days
     thirty_days_ago = timezone.now().date() - timezone.timedelta(days=30)
-    
-    new_movies = Movie.objects.filter(release_date__gte=thirty_days_ago)[:10]
-    new_tv_shows = TVShow.objects.filter(first_air_date__gte=thirty_days_ago)[:10]
-    
-    return Response({
-        'new_movies': MovieSerializer(new_movies, many=True).data,
-        'new_tv_shows': TVShowSerializer(new_tv_shows, many=True).data,
-    })
+    rows = {
+        'new_movies': conditional.get_versions(
+            Movie.objects.filter(release_date__gte=thirty_days_ago), 10
+        ),
+        'new_tv_shows': conditional.get_versions(
+            TVShow.objects.filter(first_air_date__gte=thirty_days_ago), 10
+        ),
+    }
+    return conditional.respond(
+        request, 'new_releases', list(rows.values()), lambda: serialize_rows(request, rows)
+    )
 
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@renderer_classes(CONTENT_RENDERERS)
 def trending_content_view(request):
-    """View for getting trending content"""
-    trending_movies = Movie.objects.filter(is_trending=True)[:10]
-    trending_tv_shows = TVShow.objects.filter(is_trending=True)[:10]
-    
-    return Response({
-        'trending_movies': MovieSerializer(trending_movies, many=True).data,
-        'trending_tv_shows': TVShowSerializer(trending_tv_shows, many=True).data,
-    })
+    """View for getting trending content, optionally in one genre (``?genre_name=``)"""
+    movies = Movie.objects.values_list(*conditional.VERSION_FIELDS)
+    tv_shows = TVShow.objects.values_list(*conditional.VERSION_FIELDS)
+    genre_name = request.query_params.get('genre_name')
+    if genre_name:
+        movies = stats.filter_by_genre_name(movies, genre_name)
+        tv_shows = stats.filter_by_genre_name(tv_shows, genre_name)
+    rows = {
+        'trending_movies': trending.get_trending(movies, 10),
+        'trending_tv_shows': trending.get_trending(tv_shows, 10),
+    }
+    return conditional.respond(
+        request, 'trending', list(rows.values()), lambda: serialize_rows(request, rows)
+    )
+
+
@@ -135,6 +135,8 @@ export const contentAPI = {
     is_featured?: boolean;
     is_trending?: boolean;
     page?: number;
+    cursor?: string;
+    ordering?: string;
   }) => {
     const response = await api.get("/content/movies/", { params });
     return response.data;
@@ -154,6 +156,8 @@ export const contentAPI = {
     is_trending?: boolean;
     status?: string;
     page?: number;
+    cursor?: string;
+    ordering?: string;
   }) => {
     const response = await api.get("/content/tv-shows/", { params });
     return response.data;
@@ -165,6 +169,11 @@ export const contentAPI = {
   },
 
   // Featured and trending content
+  getHomeRows: async () => {
+    const response = await api.get("/content/home/");
+    return response.data;
+  },
+
   getFeaturedContent: async () => {
     const response = await api.get("/content/featured/");
     return response.data;
@@ -188,6 +197,7 @@ export const contentAPI = {
     year?: number;
     page?: number;
     page_size?: number;
+    cursor?: string;
   }) => {
     const response = await api.post("/content/search/", searchData);
     return response.data;
@@ -224,6 +234,18 @@ export const contentAPI = {
     return response.data;
   },
 
+  batchWatchlist: async (
+    operations: {
+      op: "add" | "remove" | "mark_watched";
+      movie_id?: number;
+      tv_show_id?: number;
+      is_watched?: boolean;
+    }[]
+  ) => {
+    const response = await api.post("/content/watchlist/batch/", { operations });
+    return response.data;
+  },
+
   // Ratings
   getRatings: async () => {
     const response = await api.get("/content/ratings/");
@@ -252,6 +274,19 @@ export const contentAPI = {
     const response = await api.delete(`/content/ratings/${id}/`);
     return response.data;
   },
+
+  batchRatings: async (
+    operations: {
+      op: "rate" | "remove";
+      movie_id?: number;
+      tv_show_id?: number;
+      rating?: number;
+      review?: string;
+    }[]
+  ) => {
+    const response = await api.post("/content/ratings/batch/", { operations });
+    return response.data;
+  },
 };
 
 // Auth utilities